@@ -38,7 +38,7 @@ import WarningIcon from '@mui/icons-material/Warning';
 import CheckCircleIcon from '@mui/icons-material/CheckCircle';
 import ErrorIcon from '@mui/icons-material/Error';
 import { getOrganizationPublicKeys, deletePublicKey } from '../../services/publicKeyService';
-import { getOrganizationStatusListCredentials, deleteStatusListCredential, OrganizationStatusListCredential } from '../../services/statusListCredentialService';
+import { getOrganizationStatusListCredentials, getStatusListCredentialDocument, deleteStatusListCredential, OrganizationStatusListCredential } from '../../services/statusListCredentialService';
 import VisibilityIcon from '@mui/icons-material/Visibility';
 import ListAltIcon from '@mui/icons-material/ListAlt';
 
@@ -356,6 +356,7 @@ function StatusListDetailDialog({ statusList, open, onClose }: StatusListDetailD
   };
 
   const formatCredential = (credential: any) => {
+    if (credential === undefined) return 'Loading…';
     try {
       return JSON.stringify(credential, null, 2);
     } catch {
@@ -612,9 +613,21 @@ export default function MyAccount() {
     setDeleteStatusListDialog({ open: false, statusList: null });
   };
 
-  const handleViewStatusList = (statusList: OrganizationStatusListCredential) => {
+  const handleViewStatusList = async (statusList: OrganizationStatusListCredential) => {
     setSelectedStatusList(statusList);
     setStatusListDetailDialogOpen(true);
+
+    // The listing omits full_credential; fetch the document only when it is viewed
+    if (statusList.full_credential || !organizationId) return;
+    try {
+      const fullCredential = await getStatusListCredentialDocument(organizationId, statusList.status_list_id);
+      setSelectedStatusList((current) =>
+        current && current.status_list_id === statusList.status_list_id ? { ...current, full_credential: fullCredential } : current
+      );
+    } catch (error: any) {
+      console.error('Failed to load status list credential:', error);
+      showToast('Failed to load status list credential document.', 'error');
+    }
   };
 
   const handleCloseStatusListDetail = () => {
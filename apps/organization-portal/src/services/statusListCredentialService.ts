@@ -8,7 +8,7 @@ export interface OrganizationStatusListCredential {
   version: number;
   issuance_date?: string | null;
   encoded_list_hash: string;
-  full_credential: any;
+  full_credential?: any;
   created_at: string;
   updated_at: string;
 }
@@ -93,6 +93,21 @@ class StatusListCredentialService {
     return response.json();
   }
 
+  async getStatusListCredentialDocument(organizationId: string, statusListId: string): Promise<any> {
+    const params = new URLSearchParams({ organization_id: organizationId, status_list_id: statusListId });
+
+    const response = await this.fetchWithAuth(`${this.baseUrl}/status-list-credentials/download/?${params.toString()}`, {
+      method: 'GET',
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.error || errorData.detail || `Failed to fetch status list credential: ${response.statusText}`);
+    }
+
+    return response.json();
+  }
+
   async deleteStatusListCredential(statusListId: string): Promise<void> {
     const encodedId = encodeURIComponent(statusListId);
     const response = await this.fetchWithAuth(`${this.baseUrl}/status-list-credentials/${encodedId}/`, {
@@ -111,6 +126,9 @@ const statusListCredentialService = new StatusListCredentialService();
 export const getOrganizationStatusListCredentials = (organizationId?: string) =>
   statusListCredentialService.getOrganizationStatusListCredentials(organizationId);
 
+export const getStatusListCredentialDocument = (organizationId: string, statusListId: string) =>
+  statusListCredentialService.getStatusListCredentialDocument(organizationId, statusListId);
+
 export const deleteStatusListCredential = (statusListId: string) =>
   statusListCredentialService.deleteStatusListCredential(statusListId);
 
@@ -21,7 +21,7 @@ import { InjiPortalIcon } from '@inji-offline-verify/shared-ui/src/components/Cu
 import { useAuth } from './context/AuthContext.tsx';
 import { login } from './services/authService';
 import { WorkerCacheService } from './services/WorkerCacheService';
-import { NetworkManager } from './network/NetworkManager';
+import { OfflineBundleService } from './services/OfflineBundleService';
 import { warmUpZXingModule } from '@mosip/react-inji-verify-sdk';
 
 const Card = styled(MuiCard)(({ theme }) => ({
@@ -414,31 +414,5 @@ export default function SignIn(props: {
 
 // Build a CacheBundle for SDK from backend endpoints
 async function buildServerCacheBundle(organizationId: string) {
-  // Fetch contexts
-  const ctxRes = await NetworkManager.fetch(`/organization/api/contexts/?organization_id=${encodeURIComponent(organizationId)}`, { method: 'GET' });
-  if (!ctxRes.ok) throw new Error(`Failed to fetch contexts (${ctxRes.status})`);
-  const ctxJson = await ctxRes.json();
-  const contexts = Array.isArray(ctxJson?.contexts)
-    ? ctxJson.contexts.map((c: any) => ({ url: c.url, document: c.document }))
-    : [];
-
-  // Fetch public keys
-  const pkRes = await NetworkManager.fetch(`/organization/api/public-keys/?organization_id=${encodeURIComponent(organizationId)}`, { method: 'GET' });
-  if (!pkRes.ok) throw new Error(`Failed to fetch public keys (${pkRes.status})`);
-  const pkJson = await pkRes.json();
-  const publicKeys = Array.isArray(pkJson?.keys)
-    ? pkJson.keys.map((k: any) => ({
-        key_id: k.key_id,
-        key_type: k.key_type,
-        public_key_multibase: k.public_key_multibase,
-        public_key_hex: k.public_key_hex,
-        public_key_jwk: k.public_key_jwk,
-        controller: k.controller,
-        purpose: k.purpose,
-        is_active: k.is_active,
-        organization_id: organizationId,
-      }))
-    : [];
-
-  return { publicKeys, contexts } as any;
+  return OfflineBundleService.fetchCacheBundle(organizationId);
 }
@@ -1,7 +1,7 @@
 import { useState } from 'react';
 import { login } from '../services/authService';
 import { WorkerCacheService } from '../services/WorkerCacheService';
-import { NetworkManager } from '../network/NetworkManager';
+import { OfflineBundleService } from '../services/OfflineBundleService';
 
 export default function Login() {
   const [orgName, setOrgName] = useState('Acme Corp1');
@@ -59,31 +59,5 @@ export default function Login() {
 
 // Build a CacheBundle for SDK from backend endpoints
 async function buildServerCacheBundle(organizationId: string) {
-  // Fetch contexts
-  const ctxRes = await NetworkManager.fetch(`/organization/api/contexts/?organization_id=${encodeURIComponent(organizationId)}`, { method: 'GET' });
-  if (!ctxRes.ok) throw new Error(`Failed to fetch contexts (${ctxRes.status})`);
-  const ctxJson = await ctxRes.json();
-  const contexts = Array.isArray(ctxJson?.contexts)
-    ? ctxJson.contexts.map((c: any) => ({ url: c.url, document: c.document }))
-    : [];
-
-  // Fetch public keys
-  const pkRes = await NetworkManager.fetch(`/organization/api/public-keys/?organization_id=${encodeURIComponent(organizationId)}`, { method: 'GET' });
-  if (!pkRes.ok) throw new Error(`Failed to fetch public keys (${pkRes.status})`);
-  const pkJson = await pkRes.json();
-  const publicKeys = Array.isArray(pkJson?.keys)
-    ? pkJson.keys.map((k: any) => ({
-        key_id: k.key_id,
-        key_type: k.key_type,
-        public_key_multibase: k.public_key_multibase,
-        public_key_hex: k.public_key_hex,
-        public_key_jwk: k.public_key_jwk,
-        controller: k.controller,
-        purpose: k.purpose,
-        is_active: k.is_active,
-        organization_id: organizationId,
-      }))
-    : [];
-
-  return { publicKeys, contexts } as any;
+  return OfflineBundleService.fetchCacheBundle(organizationId);
 }
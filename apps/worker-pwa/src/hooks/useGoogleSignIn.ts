@@ -19,7 +19,8 @@ declare global {
 }
 
 interface UseGoogleSignInProps {
-  onSuccess: (accessToken: string) => void;
+  // Receives a Google ID token; the server verifies it locally, with no call to Google
+  onSuccess: (idToken: string) => void;
   onError?: (error: any) => void;
   clientId?: string;
 }
@@ -29,7 +30,7 @@ export const useGoogleSignIn = ({
   onError,
   clientId = '831736850065-asmq8g1kj6ht2n3pj2hj0j1sg6cfk5dh.apps.googleusercontent.com' // Default client ID for development
 }: UseGoogleSignInProps) => {
-  const tokenClientRef = useRef<any>(null);
+  const initializedRef = useRef(false);
 
   useEffect(() => {
     if (window.google) {
@@ -50,24 +51,24 @@ export const useGoogleSignIn = ({
   const initializeGoogleSignIn = () => {
     if (!window.google || !clientId) return;
 
-    tokenClientRef.current = window.google.accounts.oauth2.initTokenClient({
+    window.google.accounts.id.initialize({
       client_id: clientId,
-      scope: 'email profile',
       callback: (response: any) => {
-        if (response.access_token) {
-          onSuccess(response.access_token);
+        if (response.credential) {
+          onSuccess(response.credential);
         } else {
           onError?.(response);
         }
       },
     });
+    initializedRef.current = true;
   };
 
   const signIn = useCallback(() => {
-    if (tokenClientRef.current) {
-      tokenClientRef.current.requestAccessToken();
+    if (initializedRef.current) {
+      window.google?.accounts.id.prompt();
     }
   }, []);
 
-  return { signIn, isReady: !!tokenClientRef.current };
+  return { signIn, isReady: initializedRef.current };
 };
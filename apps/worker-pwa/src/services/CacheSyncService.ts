@@ -7,7 +7,8 @@ import { SDKCacheManager } from '../../../../packages/inji-verify-sdk/src/servic
 import type { CacheBundle } from '../../../../packages/inji-verify-sdk/src/services/offline-verifier/cache/utils/OrgResolver';
 import { NetworkService } from './NetworkService';
 import type { NetworkStatusListener } from './NetworkService';
-import { NetworkManager } from '../network/NetworkManager';
+import { OfflineBundleService } from './OfflineBundleService';
+import { ChangeStreamService } from './ChangeStreamService';
 
 export interface SyncItemsUpdated {
   publicKeys: number;
@@ -41,6 +42,8 @@ export class CacheSyncService implements NetworkStatusListener {
   private syncQueue: Set<string> = new Set(); // Organization IDs to sync
   private lastSyncMetadata: Map<string, SyncMetadata> = new Map();
   private syncInterval: number | null = null;
+  private changeWatch: AbortController | null = null;
+  private changeSeqs: Map<string, number> = new Map(); // Bundle change_seq each organization is synced to
 
   private constructor() {
     this.networkService = NetworkService.getInstance();
@@ -130,6 +133,7 @@ export class CacheSyncService implements NetworkStatusListener {
    */
   public onOnline(): void {
     this.startPeriodicSync();
+    this.startChangeWatch();
     
     // Force sync current organization immediately when network comes back
     const currentOrgId = this.getCurrentOrganizationId();
@@ -147,10 +151,12 @@ export class CacheSyncService implements NetworkStatusListener {
    */
   public onOffline(): void {
     this.stopPeriodicSync();
+    this.stopChangeWatch();
   }
 
   /**
-   * Start periodic synchronization (every 10 minutes when online)
+   * Start periodic synchronization (every 10 minutes when online).
+   * Changes are normally pushed through the change stream; this is the safety net.
    */
   private startPeriodicSync(): void {
     if (this.syncInterval) return;
@@ -159,7 +165,7 @@ export class CacheSyncService implements NetworkStatusListener {
       if (this.networkService.getIsOnline()) {
         this.syncAllOrganizations();
       }
-    }, 90 * 1000); // 90 seconds
+    }, 10 * 60 * 1000); // 10 minutes
   }
 
   /**
@@ -172,6 +178,46 @@ export class CacheSyncService implements NetworkStatusListener {
     }
   }
 
+  /**
+   * Long-poll the server for changes to the current organization's bundle and sync as soon as one lands
+   */
+  private startChangeWatch(): void {
+    if (this.changeWatch) return;
+    this.changeWatch = new AbortController();
+    this.watchChanges(this.changeWatch.signal);
+  }
+
+  private stopChangeWatch(): void {
+    if (this.changeWatch) {
+      this.changeWatch.abort();
+      this.changeWatch = null;
+    }
+  }
+
+  private async watchChanges(signal: AbortSignal): Promise<void> {
+    const pause = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+    while (!signal.aborted) {
+      const orgId = this.getCurrentOrganizationId();
+      const since = orgId ? this.changeSeqs.get(orgId) : undefined;
+      if (!orgId || since === undefined) {
+        // Nothing synced yet; the reconnect sync records where to start from
+        await pause(5000);
+        continue;
+      }
+      try {
+        const notice = await ChangeStreamService.waitForChange(orgId, since, signal);
+        if (notice.changed && !signal.aborted) {
+          await this.forceSyncOrganization(orgId);
+        }
+      } catch (error) {
+        if (signal.aborted) return;
+        console.warn('[CacheSyncService] Change stream interrupted, retrying:', error);
+        // Jittered backoff so devices do not reconnect in lockstep
+        await pause(5000 + Math.random() * 10000);
+      }
+    }
+  }
+
   /**
    * Queue an organization for synchronization
    */
@@ -255,6 +301,7 @@ export class CacheSyncService implements NetworkStatusListener {
 
       // Update the cache with new data using sync method (replaces instead of adds)
       await SDKCacheManager.syncFromServer(bundle, organizationId);
+      this.rememberChangeSeq(organizationId, bundle);
 
       // Update sync metadata
       this.recordSyncMetadata(organizationId, result, now);
@@ -288,6 +335,7 @@ export class CacheSyncService implements NetworkStatusListener {
       
       // Update the cache with new data using sync method (replaces instead of adds)
       await SDKCacheManager.syncFromServer(bundle, organizationId);
+      this.rememberChangeSeq(organizationId, bundle);
 
       // Update sync metadata
       const now = Date.now();
@@ -318,60 +366,13 @@ export class CacheSyncService implements NetworkStatusListener {
    * Fetch organization data from server (same as login flow)
    */
   private async fetchOrganizationData(organizationId: string): Promise<CacheBundle> {
-    // Fetch contexts
-    const ctxRes = await NetworkManager.fetch(`/organization/api/contexts/?organization_id=${encodeURIComponent(organizationId)}`, { method: 'GET' });
-    if (!ctxRes.ok) throw new Error(`Failed to fetch contexts (${ctxRes.status})`);
-    const ctxJson = await ctxRes.json();
-    const contexts = Array.isArray(ctxJson?.contexts)
-      ? ctxJson.contexts.map((c: any) => ({ url: c.url, document: c.document }))
-      : [];
-
-    // Fetch public keys
-    const pkRes = await NetworkManager.fetch(`/organization/api/public-keys/?organization_id=${encodeURIComponent(organizationId)}`, { method: 'GET' });
-    if (!pkRes.ok) throw new Error(`Failed to fetch public keys (${pkRes.status})`);
-    const pkJson = await pkRes.json();
-    const publicKeys = Array.isArray(pkJson?.keys)
-      ? pkJson.keys.map((k: any) => ({
-          key_id: k.key_id,
-          key_type: k.key_type,
-          public_key_multibase: k.public_key_multibase,
-          public_key_hex: k.public_key_hex,
-          public_key_jwk: k.public_key_jwk,
-          controller: k.controller,
-          purpose: k.purpose,
-          is_active: k.is_active,
-          organization_id: organizationId,
-        }))
-      : [];
-    
-      // Fetch status list credentials (optional endpoint)
-      let statusListCredentials: any[] = [];
-      try {
-        const slRes = await NetworkManager.fetch(`/organization/api/status-list-credentials/?organization_id=${encodeURIComponent(organizationId)}`, { method: 'GET' });
-        if (slRes.ok) {
-          const slJson = await slRes.json();
-          if (Array.isArray(slJson?.status_list_credentials)) {
-            statusListCredentials = slJson.status_list_credentials.map((c: any) => ({
-              status_list_id: c.status_list_id || c.statusListId || c.id,
-              issuer: c.issuer,
-              status_purpose: c.status_purpose || c.statusPurpose || c.credentialSubject?.statusPurpose || 'revocation',
-              full_credential: c.full_credential || c.fullCredential || c.credential || c,
-              organization_id: organizationId
-            })).filter((c: any) => !!c.status_list_id);
-          }
-        } else {
-          console.log('[CacheSyncService] Status list credentials endpoint returned', slRes.status);
-        }
-      } catch (e) {
-        console.warn('[CacheSyncService] Failed to fetch status list credentials (non-fatal):', e);
-      }
+    // Contexts, public keys and status list credentials in one round trip
+    return OfflineBundleService.fetchCacheBundle(organizationId);
+  }
 
-      // Return extended bundle including status list credentials for SDKCacheManager
-      return {
-        publicKeys,
-        contexts,
-        statusListCredentials
-      } as any;
+  private rememberChangeSeq(organizationId: string, bundle: CacheBundle): void {
+    const changeSeq = (bundle as any).changeSeq;
+    if (typeof changeSeq === 'number') this.changeSeqs.set(organizationId, changeSeq);
   }
 
   /**
@@ -449,6 +450,7 @@ export class CacheSyncService implements NetworkStatusListener {
    */
   public destroy(): void {
     this.stopPeriodicSync();
+    this.stopChangeWatch();
     this.networkService.removeListener(this);
   }
 }
\ No newline at end of file
@@ -0,0 +1,36 @@
+import { NetworkManager } from '../network/NetworkManager';
+
+export interface ChangeNotice {
+  changed: boolean;
+  changeSeq: number;
+  /** The server cannot resume from our sequence; a full bundle download is needed */
+  reset: boolean;
+}
+
+/**
+ * Long-polls /organization/api/changes/stream/, which answers as soon as the
+ * organization's offline bundle moves past `since` (or after `timeout` seconds
+ * with changed=false). Used instead of short periodic polling so revocations reach
+ * devices within seconds.
+ */
+export class ChangeStreamService {
+  static readonly TIMEOUT_SECONDS = 25;
+
+  static async waitForChange(organizationId: string, since: number, signal?: AbortSignal): Promise<ChangeNotice> {
+    const params = new URLSearchParams({
+      organization_id: organizationId,
+      since: String(since),
+      timeout: String(ChangeStreamService.TIMEOUT_SECONDS),
+    });
+    try {
+      const res = await NetworkManager.fetch(`/organization/api/changes/stream/?${params}`, { method: 'GET', retry: 0, signal });
+      const json = await res.json();
+      return { changed: !!json?.changed, changeSeq: Number(json?.change_seq) || since, reset: false };
+    } catch (e) {
+      if (e instanceof Error && e.message === 'HTTP 410') {
+        return { changed: true, changeSeq: since, reset: true };
+      }
+      throw e;
+    }
+  }
+}
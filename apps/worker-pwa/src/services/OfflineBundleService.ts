@@ -0,0 +1,55 @@
+import { NetworkManager } from '../network/NetworkManager';
+
+export interface OfflineBundleHashes {
+  contexts: string;
+  public_keys: string;
+  status_list_credentials: string;
+}
+
+/**
+ * Fetches everything a worker caches for offline verification (contexts, public keys,
+ * status list credentials) from /organization/api/offline-bundle/ in one request and
+ * maps it to the CacheBundle shape SDKCacheManager expects.
+ */
+export class OfflineBundleService {
+  static async fetchCacheBundle(organizationId: string) {
+    const res = await NetworkManager.fetch(`/organization/api/offline-bundle/?organization_id=${encodeURIComponent(organizationId)}`, { method: 'GET' });
+    if (!res.ok) throw new Error(`Failed to fetch offline bundle (${res.status})`);
+    const json = await res.json();
+
+    const contexts = Array.isArray(json?.contexts)
+      ? json.contexts.map((c: any) => ({ url: c.url, document: c.document }))
+      : [];
+    const publicKeys = Array.isArray(json?.public_keys)
+      ? json.public_keys.map((k: any) => ({
+          key_id: k.key_id,
+          key_type: k.key_type,
+          public_key_multibase: k.public_key_multibase,
+          public_key_hex: k.public_key_hex,
+          public_key_jwk: k.public_key_jwk,
+          controller: k.controller,
+          purpose: k.purpose,
+          is_active: k.is_active,
+          organization_id: organizationId,
+        }))
+      : [];
+    const statusListCredentials = Array.isArray(json?.status_list_credentials)
+      ? json.status_list_credentials.map((c: any) => ({
+          status_list_id: c.status_list_id,
+          issuer: c.issuer,
+          status_purpose: (Array.isArray(c.purposes) && c.purposes[0]) || 'revocation',
+          full_credential: c.full_credential,
+          organization_id: organizationId,
+        })).filter((c: any) => !!c.status_list_id)
+      : [];
+
+    return {
+      publicKeys,
+      contexts,
+      statusListCredentials,
+      hashes: json?.hashes as OfflineBundleHashes | undefined,
+      bundleHash: json?.bundle_hash as string | undefined,
+      changeSeq: typeof json?.change_seq === 'number' ? json.change_seq as number : undefined,
+    } as any;
+  }
+}
@@ -75,7 +75,7 @@ export async function loginorg(payload: { username: string; password: string; or
   return data;
 }
 
-export async function googleLogin(payload: { access_token: string; org_name: string }): Promise<LoginResponse> {
+export async function googleLogin(payload: { id_token?: string; access_token?: string; org_name: string }): Promise<LoginResponse> {
   const res = await fetch(getWorkerApiUrl('/google-login/'), {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import VerificationLog
+from .models import OutboundEmail, VerificationLog
 
 
 
@@ -9,4 +9,12 @@ from .models import VerificationLog
 class VerificationLogAdmin(admin.ModelAdmin):
     list_display = ("verification_status", "verified_at", "organization", "synced_at")
     list_filter = ("verification_status",)
-    search_fields = ("vc_hash", "organization__name")
\ No newline at end of file
+    search_fields = ("vc_hash", "organization__name")
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("kind", "to", "status", "attempts", "created_at", "sent_at", "next_attempt_at")
+    list_filter = ("status", "kind")
+    search_fields = ("subject",)
+    readonly_fields = ("created_at", "sent_at", "attempts", "last_error")
@@ -1,6 +1,14 @@
-from django.core.management.base import BaseCommand, CommandError
-from api.models import JsonLdContext
-import requests
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from organization.context_closure import build_context_closure
+from organization.context_fetcher import (
+    DEFAULT_RETRIES, DEFAULT_TIMEOUT, DEFAULT_WORKERS, FAILED, FETCHED, ContextFetcher,
+)
+from organization.models import (
+    JsonLdContext, JsonLdContextSource, JsonLdDocument, Organization, OrganizationChange,
+)
 
 
 DEFAULT_URLS = [
@@ -11,25 +19,91 @@ DEFAULT_URLS = [
 
 
 class Command(BaseCommand):
-    help = 'Fetch official JSON-LD context documents from source URLs and store/update in DB.'
+    help = (
+        'Fetch JSON-LD context documents from their source URLs and update every organization '
+        'context that references them. Unchanged documents are skipped via ETag/Last-Modified.'
+    )
 
     def add_arguments(self, parser):
-        parser.add_argument('--urls', nargs='*', default=DEFAULT_URLS, help='Context URLs to fetch')
-        parser.add_argument('--timeout', type=int, default=15)
+        parser.add_argument(
+            '--urls', nargs='*',
+            help='Context URLs to fetch (default: every URL organizations reference, or the W3C defaults)',
+        )
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+        parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT)
+        parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES)
+        parser.add_argument('--force', action='store_true', help='Ignore stored validators and refetch every document')
+        parser.add_argument('--allow-private-hosts', action='store_true',
+                            help='Fetch contexts from private/loopback addresses (local testing only)')
 
     def handle(self, *args, **options):
-        urls = options['urls']
-        timeout = options['timeout']
-        updated = 0
-        for url in urls:
-            self.stdout.write(f'Fetching {url} ...')
-            try:
-                r = requests.get(url, timeout=timeout, headers={'Accept': 'application/ld+json, application/json'})
-                r.raise_for_status()
-                doc = r.json()
-                JsonLdContext.objects.update_or_create(url=url, defaults={'document': doc})
-                updated += 1
-                self.stdout.write(self.style.SUCCESS(f'✔ Stored {url}'))
-            except Exception as e:
-                self.stderr.write(self.style.ERROR(f'✖ Failed {url}: {e}'))
-        self.stdout.write(self.style.SUCCESS(f'Done. Updated {updated}/{len(urls)} contexts.'))
+        with ContextFetcher(
+            timeout=options['timeout'], retries=options['retries'], max_workers=options['workers'],
+            allow_private_hosts=options['allow_private_hosts'],
+        ) as fetcher:
+            self.refresh(fetcher, options['urls'], options['force'])
+
+    def refresh(self, fetcher, urls=None, force=False):
+        if not urls:
+            urls = sorted(
+                set(JsonLdContext.objects.values_list('url', flat=True).distinct())
+                | set(JsonLdContextSource.objects.values_list('url', flat=True))
+            ) or DEFAULT_URLS
+        JsonLdContextSource.objects.bulk_create(
+            [JsonLdContextSource(url=url) for url in urls], ignore_conflicts=True,
+        )
+        sources = {s.url: s for s in JsonLdContextSource.objects.filter(url__in=urls)}
+        results = fetcher.fetch_many(
+            (s.url, '' if force else s.etag, '' if force else s.last_modified) for s in sources.values()
+        )
+
+        now = timezone.now()
+        counts = {'changed': 0, 'unchanged': 0, 'failed': 0}
+        changed_urls = []
+        contexts_updated = 0
+        for url, result in results.items():
+            source = sources[url]
+            if result.outcome == FAILED:
+                source.last_error = result.error
+                counts['failed'] += 1
+                self.stderr.write(self.style.ERROR(f'✖ {url}: {result.error}'))
+                continue
+            source.last_error = ''
+            source.fetched_at = now
+            source.etag, source.last_modified = result.etag, result.last_modified
+            with transaction.atomic():
+                if result.outcome == FETCHED:
+                    content = JsonLdDocument.objects.intern(result.document)
+                    if content.content_hash != source.content_id:
+                        source.content = content
+                        source.changed_at = now
+                if source.content_id is None:
+                    continue
+                # One UPDATE points every organization's entry for this URL at the fetched document
+                stale = JsonLdContext.objects.filter(url=url).exclude(content_id=source.content_id)
+                org_ids = list(stale.values_list('organization_id', flat=True))
+                fanned_out = stale.update(content_id=source.content_id, updated_at=now)
+                for org_id in org_ids:
+                    OrganizationChange.objects.record(org_id, 'contexts', [url])
+            contexts_updated += fanned_out
+            if source.changed_at == now:
+                counts['changed'] += 1
+                changed_urls.append(url)
+                self.stdout.write(self.style.SUCCESS(f'✔ {url} changed ({fanned_out} organization contexts updated)'))
+            else:
+                counts['unchanged'] += 1
+                self.stdout.write(f'= {url} unchanged')
+
+        JsonLdContextSource.objects.bulk_update(
+            list(sources.values()),
+            ['content', 'etag', 'last_modified', 'fetched_at', 'changed_at', 'last_error'],
+        )
+        # A changed document may import contexts the organizations do not hold yet
+        for org in Organization.objects.filter(contexts__url__in=changed_urls).distinct():
+            build_context_closure(org, fetcher)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. {counts['changed']} changed, {counts['unchanged']} unchanged, {counts['failed']} failed; "
+            f'{contexts_updated} organization contexts updated.'
+        ))
+        return counts, contexts_updated
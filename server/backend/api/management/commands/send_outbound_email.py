@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.outbox import send_pending_emails
+
+
+class Command(BaseCommand):
+    help = (
+        'Deliver queued OutboundEmail rows in batches, retrying failures with backoff. '
+        'Sends everything due and exits by default; use --loop to keep polling.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Emails claimed per batch')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new emails')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between polls when idle (with --loop)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total_sent = total_failed = 0
+        while True:
+            try:
+                sent, failed = send_pending_emails(batch_size=batch_size)
+            except Exception as e:
+                if not options['loop']:
+                    raise
+                # e.g. the database is not migrated yet or briefly unavailable
+                self.stderr.write(f'Outbox pass failed: {e}')
+                close_old_connections()
+                sent = failed = 0
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f'Sent {sent}, failed {failed}')
+            # A full batch means more may be due; otherwise wait for new rows
+            if sent + failed < batch_size:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Done. {total_sent} sent, {total_failed} failed.'))
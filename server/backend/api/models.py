@@ -67,4 +67,38 @@ class VerificationLog(models.Model):
     class Meta:
         ordering = ['-verified_at']
         verbose_name = "Verification Log"
-        verbose_name_plural = "Verification Logs"
\ No newline at end of file
+        verbose_name_plural = "Verification Logs"
+
+class OutboundEmail(models.Model):
+    """
+    An email queued by a request and delivered by the send_outbound_email worker.
+    Requests only insert rows; delivery, retries and failures are recorded here.
+    """
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        SENT = "SENT", "Sent"
+        FAILED = "FAILED", "Failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # What the email is for (e.g. organization_otp, password_reset), for filtering and metrics
+    kind = models.CharField(max_length=40)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Due time for PENDING rows; a worker pushes it forward while it holds the row
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} to {', '.join(self.to)} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='api_outbound_due_idx')]
+        verbose_name = "Outbound Email"
+        verbose_name_plural = "Outbound Emails"
@@ -0,0 +1,102 @@
+# server/api/outbox.py
+"""Durable email outbox.
+
+Request handlers call ``enqueue_email``, which inserts an OutboundEmail row
+in the caller's transaction and returns. The ``send_outbound_email``
+management command drains the table with ``send_pending_emails``. It claims
+up to ``batch_size`` due rows by pushing their ``next_attempt_at`` forward
+by ``LEASE_SECONDS``, then sends them over one backend connection and
+records the outcome of each. A failed send is retried with exponential
+backoff until ``MAX_ATTEMPTS`` is reached. A worker that dies mid-batch
+leaves its rows due again once the lease expires.
+"""
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection, transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+LEASE_SECONDS = 300
+
+
+def enqueue_email(kind, subject, body, to, from_email=None):
+    """Queue one email for delivery; returns the OutboundEmail row."""
+    return OutboundEmail.objects.create(
+        kind=kind,
+        subject=subject,
+        body=body,
+        to=list(to),
+        from_email=from_email or getattr(settings, 'DEFAULT_FROM_EMAIL', 'no-reply@example.com'),
+        next_attempt_at=timezone.now(),
+    )
+
+
+def backoff_delay(attempts):
+    """Seconds to wait after the ``attempts``-th failure: doubling from the base, capped, with jitter."""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _claim(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        due = OutboundEmail.objects.filter(status=OutboundEmail.Status.PENDING, next_attempt_at__lte=now)
+        if db_connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        rows = list(due.order_by('next_attempt_at')[:batch_size])
+        for row in rows:
+            row.attempts += 1
+            row.next_attempt_at = now + timedelta(seconds=LEASE_SECONDS)
+        OutboundEmail.objects.bulk_update(rows, ['attempts', 'next_attempt_at'])
+    return rows
+
+
+def send_pending_emails(batch_size=50):
+    """Send one batch of due emails; returns (sent, failed) counts for the batch."""
+    rows = _claim(batch_size)
+    if not rows:
+        return 0, 0
+    sent = failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.warning('Opening the email connection failed: %s', e)
+        connection = None
+    try:
+        for row in rows:
+            try:
+                if connection is None:
+                    raise ConnectionError('email backend unavailable')
+                message = EmailMessage(row.subject, row.body, row.from_email, row.to, connection=connection)
+                delivered = connection.send_messages([message]) == 1
+                error = '' if delivered else 'backend accepted no messages'
+            except Exception as e:
+                delivered, error = False, f'{type(e).__name__}: {e}'
+            now = timezone.now()
+            if delivered:
+                row.status, row.sent_at, row.last_error = OutboundEmail.Status.SENT, now, ''
+                sent += 1
+            else:
+                row.last_error = error[:2000]
+                if row.attempts >= MAX_ATTEMPTS:
+                    row.status = OutboundEmail.Status.FAILED
+                    logger.error('Giving up on %s email %s after %s attempts: %s', row.kind, row.pk, row.attempts, error)
+                else:
+                    row.next_attempt_at = now + timedelta(seconds=backoff_delay(row.attempts))
+                failed += 1
+    finally:
+        if connection is not None:
+            connection.close()
+    OutboundEmail.objects.bulk_update(rows, ['status', 'sent_at', 'last_error', 'next_attempt_at'])
+    return sent, failed
@@ -1,19 +1,20 @@
 # server/api/serializers.py
 from rest_framework import serializers
 from .models import VerificationLog
-from worker.models import OrganizationMember, EmailLoginCode
+from worker.models import OrganizationMember, EmailLoginCode, users_with_email
 from organization.models import Organization
+from organization.memberships import default_organization_id
 from organization.serializers import OrganizationSerializer
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
-from rest_framework_simplejwt.tokens import RefreshToken
+from .outbox import enqueue_email
+from .tokens import OrganizationRefreshToken
 from datetime import datetime, timedelta, timezone as dt_timezone
 import random, string
 from urllib.parse import urljoin, urlparse
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
 from django.conf import settings
 
 
@@ -73,15 +74,13 @@ class VerificationLogSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         request = self.context.get('request')
-        org = None
+        org_id = None
         user = None
         if request and request.user and request.user.is_authenticated:
             user = request.user
             # Pick the first organization membership; later we can support header-based org selection
-            membership = OrganizationMember.objects.filter(user=request.user).first()
-            if membership:
-                org = membership.organization
-        validated_data['organization'] = org
+            org_id = default_organization_id(request)
+        validated_data['organization_id'] = org_id
         validated_data['verified_by'] = user
         return super().create(validated_data)
 
@@ -94,16 +93,21 @@ class EmailLoginCodeRequestSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
     def validate_email(self, value):
-        if not User.objects.filter(email__iexact=value).exists():
+        if not users_with_email(value).exists():
             raise serializers.ValidationError('User with this email not found')
         return value
 
     def create(self, validated_data):
-        user = User.objects.filter(email__iexact=validated_data['email']).first()
+        user = users_with_email(validated_data['email']).first()
         code = ''.join(random.choices(string.digits, k=6))
         expires_at = datetime.now(dt_timezone.utc) + timedelta(minutes=10)
         EmailLoginCode.objects.create(user=user, code=code, expires_at=expires_at)
-        # Real implementation would email the code. For now we return it for testing.
+        enqueue_email(
+            'login_code', 'Your INJI Offline Verifier login code',
+            f"Your login code is: {code}\n\nIt expires in 10 minutes. If you did not request it, please ignore this email.",
+            [user.email],
+        )
+        # Also returned for testing until clients read it from the email.
         return {'email': user.email, 'code': code, 'expires_at': expires_at}
 
 
@@ -112,7 +116,7 @@ class EmailLoginCodeVerifySerializer(serializers.Serializer):
     code = serializers.CharField(max_length=12)
 
     def validate(self, attrs):
-        user = User.objects.filter(email__iexact=attrs['email']).first()
+        user = users_with_email(attrs['email']).first()
         if not user:
             raise serializers.ValidationError('Invalid code or email')
         record = EmailLoginCode.objects.filter(user=user, code=attrs['code']).order_by('-created_at').first()
@@ -127,7 +131,7 @@ class EmailLoginCodeVerifySerializer(serializers.Serializer):
         record.consumed_at = datetime.now(dt_timezone.utc)
         record.save(update_fields=['consumed_at'])
         user = validated_data['user']
-        jwt = RefreshToken.for_user(user)
+        jwt = OrganizationRefreshToken.for_user(user)
         # Attempt to include first org membership context if exists
         membership = OrganizationMember.objects.filter(user=user).first()
         org_data = OrganizationSerializer(membership.organization).data if membership else None
@@ -147,7 +151,7 @@ class PasswordResetRequestSerializer(serializers.Serializer):
     reset_path = serializers.CharField(required=False, allow_blank=True)
 
     def validate_email(self, value):
-        if not User.objects.filter(email__iexact=value).exists():
+        if not users_with_email(value).exists():
             raise serializers.ValidationError('User with this email not found')
         return value
 
@@ -158,8 +162,8 @@ class PasswordResetRequestSerializer(serializers.Serializer):
         return value
 
     def create(self, validated_data):
-        """Generate password reset token and send email (console backend in dev)."""
-        users = User.objects.filter(email__iexact=validated_data['email'])
+        """Generate password reset token and queue the email."""
+        users = users_with_email(validated_data['email'])
         payloads = []
         reset_base = self._resolve_reset_base(validated_data)
         reset_path = validated_data.get('reset_path') or '/reset-password'
@@ -173,10 +177,7 @@ class PasswordResetRequestSerializer(serializers.Serializer):
             link = self._build_reset_link(link_base, reset_path, uid, token)
             subject = 'Password Reset Request'
             message = f"Use the following link to reset your password: {link}"
-            try:
-                send_mail(subject, message, getattr(settings, 'DEFAULT_FROM_EMAIL', 'no-reply@example.com'), [user.email])
-            except Exception:
-                pass  # Silent fail for now
+            enqueue_email('password_reset', subject, message, [user.email])
             payloads.append({'uid': uid, 'token': token})
         # Return first for convenience in testing (avoid exposing multiple)
         return {'status': 'password reset email sent', 'debug': payloads[0] if payloads else None}
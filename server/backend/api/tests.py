@@ -1,3 +1,60 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import outbox
+from .models import OutboundEmail
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboundEmailTests(TestCase):
+    """Requests only queue emails; the sender command delivers and retries them."""
+
+    def _register(self, n):
+        return self.client.post('/organization/api/register/', {
+            'org_name': f'Outbox Org {n}', 'admin_username': f'outbox-admin-{n}',
+            'admin_password': 'pw12345678', 'admin_email': f'admin{n}@example.org',
+        }, content_type='application/json')
+
+    def test_requests_queue_and_sender_delivers_in_batches(self):
+        for n in range(5):
+            self.assertEqual(self._register(n).status_code, 201)
+        User.objects.create_user(username='reset-me', email='reset@example.org')
+        self.assertEqual(self.client.post('/api/auth/password-reset/request/', {'email': 'reset@example.org'},
+                                          content_type='application/json').status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.Status.PENDING).count(), 6)
+
+        with mock.patch.object(EmailBackend, 'open', autospec=True, side_effect=EmailBackend.open) as opened:
+            call_command('send_outbound_email', '--batch-size', '4', stdout=StringIO())
+        self.assertEqual(opened.call_count, 2)  # one connection per batch
+        self.assertEqual(len(mail.outbox), 6)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox)[-1], 'reset@example.org')
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.Status.SENT).exists())
+        self.assertEqual(OutboundEmail.objects.filter(kind='organization_otp', attempts=1).count(), 5)
+
+    def test_failures_back_off_then_give_up(self):
+        email = outbox.enqueue_email('password_reset', 'Subject', 'Body', ['fail@example.org'])
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=ConnectionError('provider down')):
+            self.assertEqual(outbox.send_pending_emails(), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), (OutboundEmail.Status.PENDING, 1))
+            self.assertIn('provider down', email.last_error)
+            self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=20))
+            # Not due yet
+            self.assertEqual(outbox.send_pending_emails(), (0, 0))
+
+            with self.assertLogs('api.outbox', 'ERROR'):
+                for _ in range(outbox.MAX_ATTEMPTS - 1):
+                    OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+                    outbox.send_pending_emails()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.Status.FAILED, outbox.MAX_ATTEMPTS))
+        self.assertEqual(len(mail.outbox), 0)
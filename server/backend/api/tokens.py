@@ -0,0 +1,107 @@
+# server/api/tokens.py
+"""JWTs that carry the user's organization memberships as signed claims.
+
+Tokens minted by OrganizationRefreshToken (and the access tokens derived
+from them) include ``orgs``: organization id -> role, in membership order.
+The first entry is the user's default organization. Refreshing a token
+recomputes the claim, so a role change or removal takes effect within one
+access-token lifetime. That lifetime is kept short, which is what makes
+stateless authorization safe.
+
+JWTClaimsAuthentication trusts the signature and builds a ClaimsUser from
+the token without touching the database. Hot read endpoints use it with
+``claimed_memberships`` to authorize requests with zero queries. Tokens minted
+before the claim existed carry no memberships, and views fall back to
+querying OrganizationMember for them.
+"""
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+MEMBERSHIPS_CLAIM = 'orgs'
+STAFF_CLAIM = 'is_staff'
+
+
+def membership_claims(user) -> dict:
+    from worker.models import OrganizationMember
+
+    rows = OrganizationMember.objects.filter(user=user).order_by('created_at').values_list('organization_id', 'role')
+    return {str(org_id): role for org_id, role in rows}
+
+
+def set_membership_claims(token, user):
+    token[MEMBERSHIPS_CLAIM] = membership_claims(user)
+    # TokenUser reads is_staff from this claim
+    token[STAFF_CLAIM] = bool(user.is_staff)
+
+
+class OrganizationRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        set_membership_claims(token, user)
+        return token
+
+
+def tokens_for_user(user) -> dict:
+    """Access/refresh pair with membership claims, as returned by the login endpoints."""
+    refresh = OrganizationRefreshToken.for_user(user)
+    return {'access': str(refresh.access_token), 'refresh': str(refresh)}
+
+
+class OrganizationTokenRefreshSerializer(TokenRefreshSerializer):
+    """Token refresh that re-reads the user's memberships into the new tokens."""
+    token_class = OrganizationRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        set_membership_claims(refresh, user)
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:  # token_blacklist app not installed
+                    pass
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+        return data
+
+
+class ClaimsUser(TokenUser):
+    """Request user backed only by a validated token.
+
+    ``memberships`` is None for tokens minted without the claim.
+    """
+
+    @cached_property
+    def memberships(self):
+        claim = self.token.get(MEMBERSHIPS_CLAIM)
+        return dict(claim) if isinstance(claim, dict) else None
+
+
+class JWTClaimsAuthentication(JWTStatelessUserAuthentication):
+    """Bearer-token authentication that never loads the User row."""
+
+    def get_user(self, validated_token):
+        super().get_user(validated_token)  # rejects tokens without a user id
+        return ClaimsUser(validated_token)
+
+
+def claimed_memberships(user):
+    """organization id -> role from the user's token claims, or None when the claims are unavailable."""
+    return getattr(user, 'memberships', None) if isinstance(user, ClaimsUser) else None
+
@@ -91,7 +91,8 @@ AUTHENTICATION_BACKENDS = [
 """Email configuration: defaults to console backend if SMTP vars not provided."""
 
 # And REPLACE it with this:
-EMAIL_BACKEND = "anymail.backends.sendgrid.EmailBackend"
+# Overridable (docker-compose passes EMAIL_BACKEND) so load tests can use a console/SMTP stand-in
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='') or "anymail.backends.sendgrid.EmailBackend"
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='no-reply@example.com')
 EMAIL_HOST = config('EMAIL_HOST', default='')
 EMAIL_PORT = config('EMAIL_PORT', cast=int, default=587)
@@ -109,6 +110,8 @@ MIDDLEWARE = [
     # Serve static files efficiently in production (and dev with collected files)
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    # Published status list files, answered before sessions, auth and the ORM
+    'organization.middleware.PublishedFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -150,6 +153,22 @@ DATABASES = {
     )
 }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Let concurrent writers queue on SQLite's lock instead of failing fast, and use an
+    # on-disk test database so threaded tests see real locking (not shared-cache table locks).
+    DATABASES['default'].setdefault('OPTIONS', {}).update({'transaction_mode': 'IMMEDIATE', 'timeout': 20})
+    DATABASES['default'].setdefault('TEST', {}).setdefault('NAME', os.path.join(BASE_DIR, 'test_db.sqlite3'))
+
+# Membership roles and member stats are cached and dropped on write. With REDIS_URL
+# (needs `pip install redis`) the cache is shared, so every process sees the drop.
+# Without it each process has its own cache and only the one handling the write
+# drops its entry; the others may serve a revoked or changed role for up to
+# MEMBERSHIP_CACHE_SECONDS, so that window stays short.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}}
+MEMBERSHIP_CACHE_SECONDS = config('MEMBERSHIP_CACHE_SECONDS', default=300 if REDIS_URL else 5, cast=int)
+
 
 
 # Password validation
@@ -196,6 +215,12 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # Use compressed manifest storage for long-term caching and cache-busting
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Status list credentials are published here as content-hashed files after every change
+# (organization.status_list_publisher). Point nginx/a CDN at the directory, or let
+# PublishedFilesMiddleware serve it. An empty root disables publishing.
+STATUS_LIST_PUBLISH_ROOT = config('STATUS_LIST_PUBLISH_ROOT', default=str(BASE_DIR / 'published'))
+STATUS_LIST_PUBLISH_URL = config('STATUS_LIST_PUBLISH_URL', default='/published/')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -220,7 +245,9 @@ REST_AUTH = {
 
 # JWT Configuration for offline PWA support
 SIMPLE_JWT = {
-    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),  # 1 hour access token
+    # Access tokens carry organization/role claims that hot read endpoints trust without a
+    # database check (api.tokens); a short lifetime bounds how long a revoked role lingers
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=2),     # 2 days refresh token for offline support
     'ROTATE_REFRESH_TOKENS': True,                   # Generate new refresh token on each refresh
     'BLACKLIST_AFTER_ROTATION': True,               # Blacklist old refresh tokens
@@ -236,8 +263,16 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=60),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=2),
+    # Refreshing re-reads memberships into the claims
+    'TOKEN_REFRESH_SERIALIZER': 'api.tokens.OrganizationTokenRefreshSerializer',
 }
 
+# Google sign-in: ID tokens are verified locally (worker.google_id_token) against
+# Google's signing certificates, cached for as long as their Cache-Control allows.
+# Tokens must be issued to one of these OAuth client ids (comma-separated).
+GOOGLE_OAUTH_CLIENT_IDS = [c.strip() for c in config('GOOGLE_OAUTH_CLIENT_IDS', default='').split(',') if c.strip()]
+GOOGLE_OAUTH_CERTS_URL = config('GOOGLE_OAUTH_CERTS_URL', default='https://www.googleapis.com/oauth2/v1/certs')
+
 # CORS configuration
 CORS_ALLOW_CREDENTIALS = True
 _base_cors = [
@@ -33,6 +33,29 @@ PY
 echo "[backend] Applying migrations..."
 python backend/manage.py migrate --noinput || { echo "Migration failed"; exit 1; }
 
+echo "[backend] Publishing status lists..."
+python backend/manage.py publish_status_lists || echo "Publishing status lists failed; they are republished on the next write"
+
+if [ "${RUN_EMAIL_SENDER:-1}" = "1" ]; then
+  echo "[backend] Starting outbound email sender..."
+  (
+    while true; do
+      python backend/manage.py send_outbound_email --loop || echo "Email sender exited; restarting in 5s"
+      sleep 5
+    done
+  ) &
+fi
+
+if [ "${RUN_KEY_SWEEP:-1}" = "1" ]; then
+  echo "[backend] Starting public key sweep..."
+  (
+    while true; do
+      python backend/manage.py sweep_public_keys --loop --interval "${KEY_SWEEP_INTERVAL:-300}" || echo "Key sweep exited; restarting in 5s"
+      sleep 5
+    done
+  ) &
+fi
+
 PORT="${PORT:-8000}"
 echo "[backend] Starting Uvicorn on 0.0.0.0:${PORT}..."
 exec uvicorn backend.asgi:application --host 0.0.0.0 --port "${PORT}"
\ No newline at end of file
@@ -1,23 +1,43 @@
 from django.contrib import admin
 from .models import (
     Organization,
+    OrganizationChange,
     OrganizationDID,
     PublicKey,
+    PublicKeySweep,
     PendingOrganizationRegistration,
     JsonLdContext,
+    JsonLdContextSource,
+    JsonLdDocument,
+    OfflineBundle,
     StatusListCredential,
     StatusListCredentialHistory,
 )
 
 @admin.register(JsonLdContext)
 class JsonLdContextAdmin(admin.ModelAdmin):
-    list_display = ("url", "created_at", "updated_at")
+    list_display = ("url", "organization", "origin", "content", "created_at", "updated_at")
+    list_filter = ("origin",)
+    search_fields = ("url", "content__content_hash")
+    raw_id_fields = ("content",)
+
+
+@admin.register(JsonLdDocument)
+class JsonLdDocumentAdmin(admin.ModelAdmin):
+    list_display = ("content_hash", "size", "created_at")
+    search_fields = ("content_hash",)
+
+
+@admin.register(JsonLdContextSource)
+class JsonLdContextSourceAdmin(admin.ModelAdmin):
+    list_display = ("url", "content", "fetched_at", "changed_at", "last_error")
     search_fields = ("url",)
+    raw_id_fields = ("content",)
 
     
 @admin.register(Organization)
 class OrganizationAdmin(admin.ModelAdmin):
-    list_display = ("name", "id", "created_at")
+    list_display = ("name", "id", "keys_changed_at", "created_at")
     search_fields = ("name",)
 
 
@@ -30,11 +50,17 @@ class OrganizationDIDAdmin(admin.ModelAdmin):
 
 @admin.register(PublicKey)
 class PublicKeyAdmin(admin.ModelAdmin):
-    list_display = ("key_id", "organization", "controller", "key_type", "is_active")
-    list_filter = ("is_active", "key_type")
+    list_display = ("key_id", "organization", "controller", "key_type", "algorithm", "is_active")
+    list_filter = ("is_active", "key_type", "algorithm")
     search_fields = ("key_id", "controller", "organization__name")
 
 
+@admin.register(PublicKeySweep)
+class PublicKeySweepAdmin(admin.ModelAdmin):
+    list_display = ("started_at", "finished_at", "expired_count", "revoked_count", "organizations_affected")
+    readonly_fields = ("started_at", "finished_at", "expired_count", "revoked_count", "organizations_affected")
+
+
 @admin.register(PendingOrganizationRegistration)
 class PendingOrganizationRegistrationAdmin(admin.ModelAdmin):
     list_display = ("org_name", "admin_username", "admin_email", "created_at", "consumed_at")
@@ -44,10 +70,10 @@ class PendingOrganizationRegistrationAdmin(admin.ModelAdmin):
 
 @admin.register(StatusListCredential)
 class StatusListCredentialAdmin(admin.ModelAdmin):
-    list_display = ("status_list_id", "organization", "issuer", "purposes_display", "version", "encoded_list_hash_short", "updated_at")
+    list_display = ("status_list_id", "organization", "issuer", "purposes_display", "version", "set_bit_count", "encoded_list_hash_short", "updated_at")
     list_filter = ("organization", "issuer")
     search_fields = ("status_list_id", "issuer", "organization__name")
-    readonly_fields = ("version", "encoded_list_hash", "issuance_date", "created_at", "updated_at")
+    readonly_fields = ("version", "encoded_list_hash", "issuance_date", "bit_length", "set_bit_count", "changed_bit_count", "created_at", "updated_at")
 
     def purposes_display(self, obj):
         return ", ".join(obj.purposes or [])
@@ -62,4 +88,19 @@ class StatusListCredentialAdmin(admin.ModelAdmin):
 class StatusListCredentialHistoryAdmin(admin.ModelAdmin):
     list_display = ("status_list_id", "organization", "version", "archived_at", "issuance_date")
     search_fields = ("status_list_id", "organization__name")
-    readonly_fields = ("status_list_current", "organization", "status_list_id", "issuer", "purposes", "version", "issuance_date", "encoded_list_hash", "full_credential", "archived_at")
+    readonly_fields = ("status_list_current", "organization", "status_list_id", "issuer", "purposes", "version", "issuance_date", "encoded_list_hash", "bit_length", "set_bit_count", "changed_bit_count", "full_credential", "archived_at")
+
+
+@admin.register(OrganizationChange)
+class OrganizationChangeAdmin(admin.ModelAdmin):
+    list_display = ("organization", "seq", "section", "item_key", "created_at")
+    list_filter = ("section",)
+    search_fields = ("item_key", "organization__name")
+
+
+@admin.register(OfflineBundle)
+class OfflineBundleAdmin(admin.ModelAdmin):
+    list_display = ("organization", "bundle_hash", "change_seq", "size", "gzip_size", "br_size", "stale", "built_at")
+    list_filter = ("stale",)
+    exclude = ("body", "gzip_body", "br_body")
+    readonly_fields = ("organization", "bundle_hash", "change_seq", "size", "gzip_size", "br_size", "stale", "built_at")
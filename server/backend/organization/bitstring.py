@@ -0,0 +1,149 @@
+# server/organization/bitstring.py
+"""Helpers for BitstringStatusList ``encodedList`` values.
+
+An encoded list is a multibase (base64url ``u`` or base58btc ``z``) string of a
+GZIP-compressed bitstring. Decoding mirrors the SDK's BitstringExpansion so the
+server and devices agree on what a list contains.
+"""
+import base64
+import zlib
+
+# Refuse lists that inflate beyond this (W3C lists are 16 KB minimum, typically far below this)
+MAX_BITSTRING_BYTES = 16 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+_B58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+
+def _b58decode(value: str) -> bytes:
+    num = 0
+    for char in value:
+        idx = _B58_ALPHABET.find(char)
+        if idx < 0:
+            raise ValueError('Invalid base58 character')
+        num = num * 58 + idx
+    body = num.to_bytes((num.bit_length() + 7) // 8, 'big') if num else b''
+    pad = len(value) - len(value.lstrip('1'))
+    return b'\x00' * pad + body
+
+
+def encode_base58btc(data: bytes) -> str:
+    """Encode bytes as a ``z``-prefixed (base58btc) multibase string."""
+    num = int.from_bytes(data, 'big')
+    out = []
+    while num:
+        num, rem = divmod(num, 58)
+        out.append(_B58_ALPHABET[rem])
+    pad = len(data) - len(data.lstrip(b'\x00'))
+    return 'z' + '1' * pad + ''.join(reversed(out))
+
+
+def _b64url_decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+
+
+def decode_multibase(encoded: str) -> bytes:
+    """Decode a multibase string; unprefixed values are read as base64url like the SDK does."""
+    if not encoded or not isinstance(encoded, str):
+        raise ValueError('Encoded status list missing')
+    try:
+        if encoded[0] == 'z':
+            return _b58decode(encoded[1:])
+        if encoded[0] == 'u':
+            return _b64url_decode(encoded[1:])
+        return _b64url_decode(encoded)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Invalid multibase encoding for status list: {e}')
+
+
+def iter_bitstring(encoded: str, chunk_size: int = CHUNK_SIZE):
+    """Yield the decompressed bitstring in chunks without inflating it all at once."""
+    compressed = decode_multibase(encoded)
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    total = 0
+    try:
+        for offset in range(0, len(compressed), chunk_size):
+            data = compressed[offset:offset + chunk_size]
+            while data:
+                out = inflater.decompress(data, chunk_size)
+                data = inflater.unconsumed_tail
+                total += len(out)
+                if total > MAX_BITSTRING_BYTES:
+                    raise ValueError('Status list exceeds maximum supported size')
+                if out:
+                    yield out
+        tail = inflater.flush()
+    except zlib.error as e:
+        raise ValueError(f'Invalid GZIP data in status list: {e}')
+    if total + len(tail) > MAX_BITSTRING_BYTES:
+        raise ValueError('Status list exceeds maximum supported size')
+    if tail:
+        yield tail
+
+
+def decode_bitstring(encoded: str) -> bytearray:
+    """Inflate a whole list into a mutable bytearray (bit i is byte i // 8, most significant bit first)."""
+    bits = bytearray()
+    for chunk in iter_bitstring(encoded):
+        bits += chunk
+    return bits
+
+
+def encode_bitstring(bits) -> str:
+    """GZIP and base64url-encode a bitstring as a ``u``-prefixed multibase string."""
+    deflater = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    compressed = deflater.compress(bytes(bits)) + deflater.flush()
+    return 'u' + base64.urlsafe_b64encode(compressed).decode('ascii').rstrip('=')
+
+
+def _fixed_blocks(chunks, size):
+    """Re-chunk an iterator of bytes into blocks of exactly ``size`` (last may be shorter)."""
+    buf = b''
+    for chunk in chunks:
+        buf += chunk
+        while len(buf) >= size:
+            yield buf[:size]
+            buf = buf[size:]
+    if buf:
+        yield buf
+
+
+def _popcount(block: bytes) -> int:
+    return int.from_bytes(block, 'big').bit_count()
+
+
+def bitstring_stats(encoded: str, previous_encoded: str = None) -> dict:
+    """Count set bits and total size of a list, plus bits flipped since ``previous_encoded``.
+
+    Both lists are streamed side by side, so memory stays at a couple of chunks
+    regardless of list size. ``changed_bit_count`` is None without a predecessor.
+    """
+    bit_length = 0
+    set_bits = 0
+    changed = None
+    if previous_encoded is None:
+        for block in iter_bitstring(encoded):
+            bit_length += len(block) * 8
+            set_bits += _popcount(block)
+    else:
+        changed = 0
+        current_blocks = _fixed_blocks(iter_bitstring(encoded), CHUNK_SIZE)
+        previous_blocks = _fixed_blocks(iter_bitstring(previous_encoded), CHUNK_SIZE)
+        while True:
+            block = next(current_blocks, None)
+            prev = next(previous_blocks, None)
+            if block is None and prev is None:
+                break
+            block = block or b''
+            prev = prev or b''
+            if block:
+                bit_length += len(block) * 8
+                set_bits += _popcount(block)
+            width = max(len(block), len(prev))
+            diff = int.from_bytes(block.ljust(width, b'\x00'), 'big') ^ int.from_bytes(prev.ljust(width, b'\x00'), 'big')
+            changed += diff.bit_count()
+    return {
+        'bit_length': bit_length,
+        'set_bit_count': set_bits,
+        'changed_bit_count': changed,
+    }
@@ -0,0 +1,115 @@
+# server/organization/change_stream.py
+"""Push an organization's change_seq to connected workers as it advances.
+
+One ChangeBroadcaster per process serves every waiting connection on the
+event loop. Each connection is a coroutine, not a thread. While anyone is
+waiting, a single background task reads change_seq for all watched
+organizations in one query, every ``POLL_INTERVAL`` seconds. Commits made
+in this process (``OrganizationChange.objects.record``) wake it right away,
+so local writes are pushed without waiting for the next poll. Writes made by
+other processes are picked up on the next poll.
+"""
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0
+
+
+class _Channel:
+    __slots__ = ('seq', 'event', 'listeners')
+
+    def __init__(self, seq):
+        self.seq = seq
+        self.event = asyncio.Event()
+        self.listeners = 0
+
+
+class ChangeBroadcaster:
+    """Fan-out of organization change_seq advances to asyncio waiters."""
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self._loop = None
+        self._channels = {}
+        self._wake = None
+        self._task = None
+        self._lock = threading.Lock()
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # First use, or a new event loop (tests run each request on its own loop)
+            with self._lock:
+                self._loop = loop
+                self._wake = asyncio.Event()
+            self._channels = {}
+            self._task = None
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    async def _poll(self):
+        from .models import Organization
+
+        org_ids = list(self._channels)
+        rows = Organization.objects.filter(pk__in=org_ids).values_list('pk', 'change_seq')
+        async for org_id, seq in rows:
+            channel = self._channels.get(str(org_id))
+            if channel is not None and seq > channel.seq:
+                channel.seq = seq
+                channel.event.set()
+                channel.event = asyncio.Event()
+
+    async def _run(self):
+        while self._channels:
+            self._wake.clear()
+            try:
+                await self._poll()
+            except Exception:
+                logger.exception('Polling organization change sequences failed')
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def wait_for_change(self, organization_id, since, timeout):
+        """Return the organization's change_seq once it is past ``since``, or None after ``timeout`` seconds."""
+        self._bind()
+        key = str(organization_id)
+        channel = self._channels.get(key)
+        if channel is None:
+            channel = self._channels[key] = _Channel(since)
+        channel.listeners += 1
+        try:
+            deadline = self._loop.time() + timeout
+            while channel.seq <= since:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    return None
+                try:
+                    await asyncio.wait_for(channel.event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    return None
+            return channel.seq
+        finally:
+            channel.listeners -= 1
+            if not channel.listeners:
+                self._channels.pop(key, None)
+
+    def wake(self):
+        """Poll now instead of at the next interval; safe to call from any thread."""
+        with self._lock:
+            loop, wake = self._loop, self._wake
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wake.set)
+
+    def stats(self):
+        return {
+            'organizations': len(self._channels),
+            'connections': sum(channel.listeners for channel in self._channels.values()),
+        }
+
+
+broadcaster = ChangeBroadcaster()
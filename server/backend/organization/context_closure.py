@@ -0,0 +1,151 @@
+# server/organization/context_closure.py
+"""Compute the transitive closure of an organization's JSON-LD contexts.
+
+Uploaded contexts often point at other contexts: ``@context`` strings or
+arrays, ``@import``, and scoped contexts inside term definitions. The
+closure builder follows all of these. It looks for each dependency in
+documents the server already holds (fetched sources, other organizations'
+contexts) and, when given a ContextFetcher, fetches whatever is left. The
+closure is stored as DEPENDENCY rows in the organization's contexts, so the
+regular contexts listing ships everything a worker needs to verify offline.
+"""
+from urllib.parse import urldefrag, urljoin
+
+from django.db import transaction
+from django.utils import timezone
+
+from .context_fetcher import FETCHED
+from .models import (
+    JsonLdContext, JsonLdContextSource, JsonLdDocument, OfflineBundle, Organization, OrganizationChange,
+)
+
+MAX_CLOSURE_SIZE = 200
+
+
+def context_references(document, base_url=''):
+    """Absolute http(s) URLs of the contexts a JSON-LD document refers to, in document order."""
+    refs = []
+
+    def add(ref):
+        url = urldefrag(urljoin(base_url, ref))[0]
+        if url.startswith(('http://', 'https://')) and url not in refs:
+            refs.append(url)
+
+    def visit(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key in ('@context', '@import'):
+                    for item in value if isinstance(value, list) else [value]:
+                        if isinstance(item, str):
+                            add(item)
+                        else:
+                            visit(item)
+                else:
+                    visit(value)
+        elif isinstance(node, list):
+            for item in node:
+                visit(item)
+
+    visit(document)
+    return refs
+
+
+def _locate(urls):
+    """Map the URLs the server already holds a document for to that JsonLdDocument."""
+    found = {
+        source.url: source.content
+        for source in JsonLdContextSource.objects.filter(url__in=urls, content__isnull=False).select_related('content')
+    }
+    rest = [url for url in urls if url not in found]
+    if rest:
+        for ctx in JsonLdContext.objects.filter(url__in=rest).select_related('content').order_by('-updated_at'):
+            found.setdefault(ctx.url, ctx.content)
+    return found
+
+
+def _fetch(fetcher, urls):
+    """Fetch and intern documents for URLs nobody holds yet, recording them as sources."""
+    found = {}
+    now = timezone.now()
+    for url, result in fetcher.fetch_many((url, '', '') for url in urls).items():
+        if result.outcome != FETCHED:
+            continue
+        with transaction.atomic():
+            content = JsonLdDocument.objects.intern(result.document)
+            JsonLdContextSource.objects.update_or_create(url=url, defaults={
+                'content': content, 'etag': result.etag, 'last_modified': result.last_modified,
+                'fetched_at': now, 'changed_at': now, 'last_error': '',
+            })
+        found[url] = content
+    return found
+
+
+def build_context_closure(organization, fetcher=None):
+    """Store the dependency closure of an organization's uploaded contexts.
+
+    Without a fetcher only documents already on the server are used; anything
+    else is recorded in ``Organization.missing_context_urls``. References come
+    from admin-supplied documents, so request handlers must not pass a
+    fetcher; the fetcher refuses non-public hosts for the management command. Returns a dict
+    of added/updated/removed URLs and the missing ones.
+    """
+    contexts = {
+        ctx.url: ctx for ctx in JsonLdContext.objects.filter(organization=organization).select_related('content')
+    }
+    uploaded = {url: ctx.content for url, ctx in contexts.items() if ctx.origin == 'UPLOADED'}
+
+    closure, missing = {}, []
+    seen = set(uploaded)
+    frontier = list(uploaded.items())
+    while frontier and len(closure) < MAX_CLOSURE_SIZE:
+        # One breadth-first level at a time, so lookups and fetches are batched
+        refs = []
+        for url, content in frontier:
+            for ref in context_references(content.document, url):
+                if ref not in seen:
+                    seen.add(ref)
+                    refs.append(ref)
+        found = _locate(refs) if refs else {}
+        unknown = [ref for ref in refs if ref not in found]
+        if unknown and fetcher is not None:
+            found.update(_fetch(fetcher, unknown))
+        frontier = []
+        for ref in refs:
+            if ref in found and len(closure) < MAX_CLOSURE_SIZE:
+                closure[ref] = found[ref]
+                frontier.append((ref, found[ref]))
+            elif ref not in found:
+                missing.append(ref)
+
+    dependencies = {url: ctx for url, ctx in contexts.items() if ctx.origin == 'DEPENDENCY'}
+    added = [url for url in closure if url not in contexts]
+    updated = [
+        dependencies[url] for url, content in closure.items()
+        if url in dependencies and dependencies[url].content_id != content.content_hash
+    ]
+    removed = [url for url in dependencies if url not in closure]
+    now = timezone.now()
+    with transaction.atomic():
+        JsonLdContext.objects.bulk_create([
+            JsonLdContext(organization=organization, url=url, content=closure[url], origin='DEPENDENCY')
+            for url in added
+        ], ignore_conflicts=True)
+        for ctx in updated:
+            ctx.content = closure[ctx.url]
+            ctx.updated_at = now
+        JsonLdContext.objects.bulk_update(updated, ['content', 'updated_at'])
+        if removed:
+            JsonLdContext.objects.filter(
+                organization=organization, origin='DEPENDENCY', url__in=removed,
+            ).delete()
+        if missing != organization.missing_context_urls:
+            Organization.objects.filter(pk=organization.pk).update(missing_context_urls=missing)
+            OfflineBundle.mark_stale(organization.pk)
+        OrganizationChange.objects.record(organization.pk, 'contexts', added + [ctx.url for ctx in updated] + removed)
+    organization.missing_context_urls = missing
+    return {
+        'added': added,
+        'updated': [ctx.url for ctx in updated],
+        'removed': removed,
+        'missing': missing,
+    }
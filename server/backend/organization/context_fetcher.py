@@ -0,0 +1,147 @@
+# server/organization/context_fetcher.py
+"""Fetch JSON-LD context documents from their source URLs.
+
+URLs are fetched concurrently through a bounded thread pool on one pooled
+session, with retry and backoff on transient failures. Requests are
+conditional: the ETag and Last-Modified validators from the previous fetch
+are sent back, so an unchanged document costs a 304 and no body.
+
+The URLs come from documents organization admins upload, so every host is
+checked with ``check_public_host`` before it is contacted, and redirects are
+followed by hand (at most MAX_REDIRECTS) so each hop is checked as well.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .did_resolver import DIDResolutionError, check_public_host
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 15
+DEFAULT_RETRIES = 2
+DEFAULT_WORKERS = 8
+MAX_DOCUMENT_BYTES = 2 * 1024 * 1024
+MAX_REDIRECTS = 5
+
+FETCHED = 'fetched'
+NOT_MODIFIED = 'not_modified'
+FAILED = 'failed'
+
+
+@dataclass
+class ContextFetchResult:
+    url: str
+    outcome: str
+    document: dict = None
+    etag: str = ''
+    last_modified: str = ''
+    error: str = ''
+
+
+class ContextFetcher:
+    """Fetch many context URLs concurrently with conditional requests.
+
+    ``allow_private_hosts`` only exists so tests can serve contexts from localhost.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, max_workers=DEFAULT_WORKERS,
+                 allow_private_hosts=False):
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.allow_private_hosts = allow_private_hosts
+        retry = Retry(
+            total=retries, connect=retries, read=retries,
+            backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']), raise_on_status=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Accept'] = 'application/ld+json, application/json'
+
+    def fetch(self, url, etag='', last_modified=''):
+        """Fetch one URL, sending the stored validators. Never raises."""
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        target = url
+        for _ in range(MAX_REDIRECTS + 1):
+            error = self._check_host(target)
+            if error:
+                return ContextFetchResult(url, FAILED, error=error)
+            try:
+                resp = self.session.get(target, headers=headers, timeout=self.timeout, allow_redirects=False)
+            except requests.RequestException as e:
+                return ContextFetchResult(url, FAILED, error=f'Fetching {target} failed: {e}')
+            if not resp.is_redirect:
+                break
+            target = urljoin(target, resp.headers['Location'])
+        else:
+            return ContextFetchResult(url, FAILED, error=f'Fetching {url} was redirected too many times')
+        if resp.status_code == 304:
+            return ContextFetchResult(
+                url, NOT_MODIFIED,
+                etag=resp.headers.get('ETag', etag), last_modified=resp.headers.get('Last-Modified', last_modified),
+            )
+        if resp.status_code != 200:
+            return ContextFetchResult(url, FAILED, error=f'Fetching {url} returned HTTP {resp.status_code}')
+        if len(resp.content) > MAX_DOCUMENT_BYTES:
+            return ContextFetchResult(url, FAILED, error=f'Context document at {url} is too large')
+        try:
+            document = resp.json()
+        except ValueError:
+            return ContextFetchResult(url, FAILED, error=f'Context document at {url} is not valid JSON')
+        if not isinstance(document, dict):
+            return ContextFetchResult(url, FAILED, error=f'Context document at {url} is not a JSON object')
+        return ContextFetchResult(
+            url, FETCHED, document=document,
+            etag=resp.headers.get('ETag', ''), last_modified=resp.headers.get('Last-Modified', ''),
+        )
+
+    def _check_host(self, url):
+        """Why ``url`` must not be fetched, or '' when it may be."""
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            return f'Refusing to fetch {url}: not an http(s) URL'
+        if self.allow_private_hosts:
+            return ''
+        try:
+            check_public_host(parts.hostname, parts.port)
+        except ValueError:
+            return f'Refusing to fetch {url}: invalid port'
+        except DIDResolutionError as e:
+            return f'Refusing to fetch {url}: {e}'
+        return ''
+
+    def _fetch_one(self, args):
+        try:
+            return self.fetch(*args)
+        except Exception as e:  # keep one bad URL from failing the batch
+            logger.exception('Unexpected error fetching %s', args[0])
+            return ContextFetchResult(args[0], FAILED, error=f'Unexpected error: {e}')
+
+    def fetch_many(self, items):
+        """Fetch ``(url, etag, last_modified)`` triples concurrently. Returns {url: ContextFetchResult}."""
+        items = list(items)
+        if not items:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            return {result.url: result for result in pool.map(self._fetch_one, items)}
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,335 @@
+# server/organization/did_resolver.py
+"""Resolve did:web, did:key and did:jwk identifiers into PublicKey field dicts.
+
+did:key and did:jwk are decoded locally. did:web documents are fetched
+concurrently through a bounded thread pool, with one pooled session per host
+(connection reuse), per-request timeouts and retry with backoff on transient
+failures. did:web hosts are submitted by organizations, so hosts that resolve
+to private, loopback or otherwise non-public addresses are refused and
+redirects are not followed. Each resolved key is a dict shaped like the PublicKey model fields,
+ready for ``PublicKey.objects.bulk_upsert``.
+"""
+import base64
+import ipaddress
+import json
+import logging
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from .bitstring import decode_multibase
+from .key_material import InvalidKeyMaterial, normalize_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_RETRIES = 2
+DEFAULT_WORKERS = 8
+MAX_DOCUMENT_BYTES = 1024 * 1024
+
+# Multicodec prefixes (unsigned varint) of the public key types did:key supports here
+_MULTICODEC_KEYS = {
+    b'\xed\x01': ('Ed25519VerificationKey2020', 'Ed25519', None),
+    b'\xe7\x01': ('EcdsaSecp256k1VerificationKey2019', 'secp256k1', ec.SECP256K1),
+    b'\x80\x24': ('JsonWebKey2020', 'P-256', ec.SECP256R1),
+    b'\x81\x24': ('JsonWebKey2020', 'P-384', ec.SECP384R1),
+}
+
+
+class DIDResolutionError(Exception):
+    """A DID could not be resolved to any usable verification method."""
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64url_decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+
+
+def _ec_key_material(curve_cls, crv: str, point: bytes):
+    """Uncompressed hex and JWK for a (possibly compressed) EC point."""
+    try:
+        key = ec.EllipticCurvePublicKey.from_encoded_point(curve_cls(), point)
+    except ValueError as e:
+        raise DIDResolutionError(f'Invalid {crv} public key: {e}')
+    numbers = key.public_numbers()
+    size = (key.curve.key_size + 7) // 8
+    x = numbers.x.to_bytes(size, 'big')
+    y = numbers.y.to_bytes(size, 'big')
+    return (b'\x04' + x + y).hex(), {'kty': 'EC', 'crv': crv, 'x': _b64url(x), 'y': _b64url(y)}
+
+
+def resolve_did_key(did: str):
+    """Expand a did:key into its single verification method."""
+    identifier = did[len('did:key:'):]
+    if not identifier.startswith('z'):
+        raise DIDResolutionError('did:key identifier must be base58btc multibase')
+    try:
+        decoded = decode_multibase(identifier)
+    except ValueError as e:
+        raise DIDResolutionError(str(e))
+    codec = _MULTICODEC_KEYS.get(decoded[:2])
+    if codec is None:
+        raise DIDResolutionError(f'Unsupported did:key multicodec 0x{decoded[:2].hex()}')
+    key_type, crv, curve_cls = codec
+    raw = decoded[2:]
+    if curve_cls is None:
+        if len(raw) != 32:
+            raise DIDResolutionError('Ed25519 did:key must carry a 32-byte key')
+        public_key_hex = raw.hex()
+        jwk = {'kty': 'OKP', 'crv': crv, 'x': _b64url(raw)}
+    else:
+        public_key_hex, jwk = _ec_key_material(curve_cls, crv, raw)
+    return [{
+        'key_id': f'{did}#{identifier}',
+        'key_type': key_type,
+        'public_key_multibase': identifier,
+        'public_key_hex': public_key_hex,
+        'public_key_jwk': jwk,
+        'controller': did,
+        'purpose': 'assertion',
+        'is_active': True,
+    }]
+
+
+def resolve_did_jwk(did: str):
+    """Expand a did:jwk into its single verification method."""
+    try:
+        jwk = json.loads(_b64url_decode(did[len('did:jwk:'):]))
+    except (ValueError, TypeError) as e:
+        raise DIDResolutionError(f'Invalid did:jwk encoding: {e}')
+    if not isinstance(jwk, dict) or 'kty' not in jwk:
+        raise DIDResolutionError('did:jwk must encode a JWK object')
+    if 'd' in jwk:
+        raise DIDResolutionError('did:jwk must not contain private key material')
+    return [{
+        'key_id': f'{did}#0',
+        'key_type': 'JsonWebKey2020',
+        'public_key_multibase': '',
+        'public_key_hex': None,
+        'public_key_jwk': jwk,
+        'controller': did,
+        'purpose': 'assertion',
+        'is_active': True,
+    }]
+
+
+def did_web_url(did: str, scheme: str = 'https') -> str:
+    """Map a did:web to the URL of its DID document (did:web spec section 3.2)."""
+    parts = did[len('did:web:'):].split(':')
+    host = unquote(parts[0])
+    if not host or '/' in host:
+        raise DIDResolutionError('Invalid did:web domain')
+    path = '/'.join(unquote(p) for p in parts[1:]) if len(parts) > 1 else '.well-known'
+    return f'{scheme}://{host}/{path}/did.json'
+
+
+def extract_verification_methods(document: dict, did: str = None):
+    """Turn a DID document's verification methods into PublicKey field dicts.
+
+    Methods referenced from ``assertionMethod`` get purpose ``assertion``;
+    everything else is ``authentication``. Methods embedded directly in a
+    relationship are included too. Relative ids (``#key-1``) are made
+    absolute against the document id.
+    """
+    if not isinstance(document, dict):
+        raise DIDResolutionError('DID document must be a JSON object')
+    doc_id = document.get('id') or did
+    if did and doc_id != did:
+        raise DIDResolutionError(f'DID document id {doc_id} does not match {did}')
+
+    def absolute(ref):
+        return f'{doc_id}{ref}' if isinstance(ref, str) and ref.startswith('#') else ref
+
+    methods = {}
+    for method in document.get('verificationMethod') or []:
+        if isinstance(method, dict) and method.get('id'):
+            methods.setdefault(absolute(method['id']), method)
+    assertion = set()
+    for relationship in ('assertionMethod', 'authentication'):
+        for ref in document.get(relationship) or []:
+            if isinstance(ref, dict) and ref.get('id'):
+                methods.setdefault(absolute(ref['id']), ref)
+                ref = ref['id']
+            if relationship == 'assertionMethod' and isinstance(ref, str):
+                assertion.add(absolute(ref))
+
+    keys = []
+    for key_id, method in methods.items():
+        multibase = method.get('publicKeyMultibase') or ''
+        hex_value = method.get('publicKeyHex')
+        jwk = method.get('publicKeyJwk')
+        pem = method.get('publicKeyPem')
+        if not (multibase or hex_value or jwk or pem):
+            continue  # key material by reference only (e.g. blockchainAccountId) is not usable offline
+        keys.append({
+            'key_id': key_id,
+            'key_type': method.get('type', ''),
+            'public_key_multibase': multibase,
+            'public_key_hex': hex_value,
+            'public_key_jwk': jwk,
+            'public_key_pem': pem,
+            'controller': method.get('controller') or doc_id,
+            'purpose': 'assertion' if key_id in assertion else 'authentication',
+            'is_active': True,
+        })
+    if not keys:
+        raise DIDResolutionError('DID document has no usable verification methods')
+    return keys
+
+
+def extract_jwks_keys(jwks: dict, controller: str):
+    """Turn a JWKS (``{"keys": [...]}``) into PublicKey field dicts owned by ``controller``.
+
+    Relative ``kid`` values become ``controller#kid``; absolute ones (DID URLs
+    or URLs) are kept. Keys marked ``"use": "enc"`` are skipped.
+    """
+    if not isinstance(jwks, dict) or not isinstance(jwks.get('keys'), list):
+        raise DIDResolutionError('JWKS must be an object with a "keys" array')
+    keys = []
+    for position, jwk in enumerate(jwks['keys']):
+        if not isinstance(jwk, dict) or 'kty' not in jwk:
+            raise DIDResolutionError(f'keys[{position}] is not a JWK')
+        if 'd' in jwk:
+            raise DIDResolutionError(f'keys[{position}] contains private key material')
+        if jwk.get('use') == 'enc':
+            continue
+        kid = jwk.get('kid')
+        if not kid:
+            raise DIDResolutionError(f'keys[{position}] has no kid')
+        keys.append({
+            'key_id': kid if ':' in kid else f"{controller}#{kid.lstrip('#')}",
+            'key_type': 'JsonWebKey2020',
+            'public_key_multibase': '',
+            'public_key_hex': None,
+            'public_key_jwk': jwk,
+            'controller': controller,
+            'purpose': 'assertion',
+            'is_active': True,
+        })
+    if not keys:
+        raise DIDResolutionError('JWKS has no signing keys')
+    return keys
+
+
+def check_public_host(host: str, port: int = None):
+    """Raise DIDResolutionError unless every address ``host`` resolves to is publicly routable."""
+    try:
+        infos = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as e:
+        raise DIDResolutionError(f'Cannot resolve host {host}: {e}')
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split('%', 1)[0])
+        if not address.is_global:
+            raise DIDResolutionError(f'Host {host} resolves to non-public address {address}')
+
+
+class DIDResolver:
+    """Resolve many DIDs concurrently, reusing one HTTP connection pool per host.
+
+    ``scheme`` and ``allow_private_hosts`` only exist so tests can point did:web
+    at a plain-HTTP stand-in server on localhost.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, max_workers=DEFAULT_WORKERS, scheme='https',
+                 allow_private_hosts=False):
+        self.timeout = timeout
+        self.retries = retries
+        self.max_workers = max_workers
+        self.scheme = scheme
+        self.allow_private_hosts = allow_private_hosts
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _session_for(self, url: str) -> requests.Session:
+        host = urlsplit(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                retry = Retry(
+                    total=self.retries, connect=self.retries, read=self.retries,
+                    backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=frozenset(['GET']), raise_on_status=False,
+                )
+                adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=self.max_workers)
+                session = requests.Session()
+                session.mount(f'{self.scheme}://', adapter)
+                session.headers['Accept'] = 'application/did+json, application/did+ld+json, application/json'
+                self._sessions[host] = session
+            return session
+
+    def fetch_did_web(self, did: str) -> dict:
+        url = did_web_url(did, self.scheme)
+        parts = urlsplit(url)
+        if not self.allow_private_hosts:
+            try:
+                port = parts.port
+            except ValueError:
+                raise DIDResolutionError('Invalid did:web port')
+            check_public_host(parts.hostname, port)
+        try:
+            resp = self._session_for(url).get(url, timeout=self.timeout, allow_redirects=False)
+        except requests.RequestException as e:
+            raise DIDResolutionError(f'Fetching {url} failed: {e}')
+        if resp.is_redirect:
+            raise DIDResolutionError(f'Fetching {url} was redirected; did:web documents must be served directly')
+        if resp.status_code != 200:
+            raise DIDResolutionError(f'Fetching {url} returned HTTP {resp.status_code}')
+        if len(resp.content) > MAX_DOCUMENT_BYTES:
+            raise DIDResolutionError(f'DID document at {url} is too large')
+        try:
+            return resp.json()
+        except ValueError:
+            raise DIDResolutionError(f'DID document at {url} is not valid JSON')
+
+    def resolve(self, did: str):
+        """Return the normalized PublicKey field dicts for one DID; raises DIDResolutionError."""
+        if did.startswith('did:key:'):
+            keys = resolve_did_key(did)
+        elif did.startswith('did:jwk:'):
+            keys = resolve_did_jwk(did)
+        elif did.startswith('did:web:'):
+            keys = extract_verification_methods(self.fetch_did_web(did), did)
+        else:
+            raise DIDResolutionError('Unsupported DID method')
+        try:
+            return [normalize_key(k) for k in keys]
+        except InvalidKeyMaterial as e:
+            raise DIDResolutionError(f'Invalid key material: {e}')
+
+    def _resolve_one(self, did):
+        try:
+            return did, self.resolve(did), None
+        except DIDResolutionError as e:
+            return did, None, str(e)
+        except Exception as e:  # keep one bad document from failing the batch
+            logger.exception('Unexpected error resolving %s', did)
+            return did, None, f'Unexpected error: {e}'
+
+    def resolve_many(self, dids):
+        """Resolve DIDs concurrently. Returns {did: (keys, error)}; exactly one of the pair is None."""
+        dids = list(dict.fromkeys(dids))
+        if not dids:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(dids))) as pool:
+            return {did: (keys, error) for did, keys, error in pool.map(self._resolve_one, dids)}
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
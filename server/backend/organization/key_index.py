@@ -0,0 +1,138 @@
+# server/organization/key_index.py
+"""Per-process index of PublicKey rows for exact-match lookups.
+
+Each organization's active keys are loaded once, on first use, into two
+dicts: ``key_id -> key`` and ``controller -> [keys]``. Lookups afterwards
+are dict reads. Writes invalidate an organization's entry in this process
+right away (signals and bulk paths call ``invalidate``). Other processes
+(management commands, other workers, shell scripts) cannot reach this
+process, so every write path stamps ``Organization.keys_changed_at`` in the
+database. An entry compares it with the value it was loaded at, at most
+every ``GENERATION_CHECK_SECONDS``. Entries are also reloaded after
+``ENTRY_TTL_SECONDS``, which bounds staleness after writes that bypass the
+stamp (queryset updates). Lookups apply the same usability rule as the
+key list and offline bundle (``PublicKey.objects.usable``), so keys past
+``expires_at`` or ``revoked_at`` are not returned, even before the sweep
+deactivates them.
+"""
+import threading
+import time
+
+from django.utils import timezone
+
+KEY_FIELDS = (
+    'id', 'key_id', 'key_type', 'algorithm', 'public_key_multibase', 'public_key_hex', 'public_key_jwk',
+    'controller', 'purpose', 'created_at', 'expires_at', 'revoked_at', 'revocation_reason', 'is_active',
+)
+GENERATION_CHECK_SECONDS = 1.0
+ENTRY_TTL_SECONDS = 300
+
+
+def _generation(org_id):
+    from .models import Organization
+
+    return Organization.objects.filter(pk=org_id).values_list('keys_changed_at', flat=True).first()
+
+
+def _usable(key, now):
+    from .models import PublicKey
+
+    return PublicKey.objects.is_usable(key, now)
+
+
+class _OrgKeys:
+    __slots__ = ('by_key_id', 'by_controller', 'generation', 'loaded_at', 'checked_at')
+
+    def __init__(self, rows, generation):
+        self.by_key_id = {}
+        self.by_controller = {}
+        for row in rows:
+            self.by_key_id[row['key_id']] = row
+            self.by_controller.setdefault(row['controller'], []).append(row)
+        self.generation = generation
+        self.loaded_at = self.checked_at = time.monotonic()
+
+
+class PublicKeyIndex:
+    """Lazily loaded, invalidation-driven index of active keys per organization.
+
+    Returned key dicts are shared between requests and must not be mutated.
+    """
+
+    def __init__(self):
+        self._orgs = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'not_found': 0, 'invalidations': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _load(self, org_id):
+        from .models import PublicKey
+
+        # Read the generation first so a write racing with the load forces a reload later
+        generation = _generation(org_id)
+        rows = list(PublicKey.objects.filter(organization_id=org_id, is_active=True).values(*KEY_FIELDS))
+        entry = _OrgKeys(rows, generation)
+        with self._lock:
+            self._orgs[org_id] = entry
+        return entry
+
+    def _entry(self, org_id):
+        org_id = str(org_id)
+        entry = self._orgs.get(org_id)
+        now = time.monotonic()
+        if entry is not None and now - entry.loaded_at > ENTRY_TTL_SECONDS:
+            entry = None
+        elif entry is not None and now - entry.checked_at > GENERATION_CHECK_SECONDS:
+            if _generation(org_id) != entry.generation:
+                entry = None
+            else:
+                entry.checked_at = now
+        if entry is None:
+            self._count('misses')
+            return self._load(org_id)
+        self._count('hits')
+        return entry
+
+    def get_by_key_id(self, org_id, key_id):
+        """Return the active key with this exact key_id (verificationMethod URL), or None."""
+        key = self._entry(org_id).by_key_id.get(key_id)
+        if key is None or not _usable(key, timezone.now()):
+            self._count('not_found')
+            return None
+        return key
+
+    def get_by_controller(self, org_id, controller):
+        """Return the active keys controlled by this DID (empty list if none)."""
+        now = timezone.now()
+        keys = [key for key in self._entry(org_id).by_controller.get(controller, []) if _usable(key, now)]
+        if not keys:
+            self._count('not_found')
+        return keys
+
+    def invalidate(self, org_id):
+        """Drop an organization's keys in this process (others notice the new keys_changed_at)."""
+        if org_id is None:
+            return
+        org_id = str(org_id)
+        with self._lock:
+            self._orgs.pop(org_id, None)
+            self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._orgs.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['organizations'] = len(self._orgs)
+            stats['keys'] = sum(len(entry.by_key_id) for entry in self._orgs.values())
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+        return stats
+
+
+key_index = PublicKeyIndex()
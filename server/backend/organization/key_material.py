@@ -0,0 +1,249 @@
+# server/organization/key_material.py
+"""Normalize public key material to every representation devices use.
+
+Whatever subset of multibase, hex, JWK or PEM an uploader supplies is parsed
+with ``cryptography`` (which also rejects malformed keys and off-curve points).
+From it we derive:
+
+- multibase: ``z`` + base58btc(multicodec prefix + key), the did:key/Multikey
+  form. The key part is raw for Ed25519, the compressed point for EC keys,
+  and PKCS#1 DER for RSA.
+- hex: the raw Ed25519 key, the uncompressed EC point (``04 || X || Y``), or
+  SubjectPublicKeyInfo DER for RSA.
+- a public JWK.
+- the raw bytes and an algorithm name.
+"""
+import base64
+import binascii
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from .bitstring import decode_multibase, encode_base58btc
+
+ALGORITHMS = ('Ed25519', 'secp256k1', 'P-256', 'P-384', 'RSA')
+
+_CURVES = {
+    'secp256k1': ec.SECP256K1,
+    'P-256': ec.SECP256R1,
+    'P-384': ec.SECP384R1,
+}
+_CURVE_NAMES = {cls.name: crv for crv, cls in _CURVES.items()}
+_JWK_CURVE_ALIASES = {'SECP256K1': 'secp256k1', 'P256': 'P-256', 'SECP256R1': 'P-256', 'P384': 'P-384', 'SECP384R1': 'P-384'}
+_MULTICODEC = {
+    'Ed25519': b'\xed\x01',
+    'secp256k1': b'\xe7\x01',
+    'P-256': b'\x80\x24',
+    'P-384': b'\x81\x24',
+    'RSA': b'\x85\x24',
+}
+_JWK_MEMBERS_KEPT = ('kid', 'alg', 'use', 'key_ops')
+
+
+class InvalidKeyMaterial(ValueError):
+    """Key material is missing, malformed or of an unsupported type."""
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64url_decode(value: str) -> bytes:
+    if not isinstance(value, str):
+        raise InvalidKeyMaterial('JWK member must be a base64url string')
+    try:
+        return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+    except (ValueError, binascii.Error) as e:
+        raise InvalidKeyMaterial(f'Invalid base64url in JWK: {e}')
+
+
+def _algorithm_hint(key_type: str):
+    """Best guess of the algorithm from a verification method type, or None."""
+    kt = (key_type or '').lower()
+    if 'ed25519' in kt:
+        return 'Ed25519'
+    if 'secp256k1' in kt:
+        return 'secp256k1'
+    if 'p384' in kt or 'p-384' in kt or 'secp384r1' in kt:
+        return 'P-384'
+    if 'p256' in kt or 'p-256' in kt or 'secp256r1' in kt:
+        return 'P-256'
+    if 'rsa' in kt:
+        return 'RSA'
+    return None
+
+
+def _ec_point(algorithm, point: bytes):
+    try:
+        return ec.EllipticCurvePublicKey.from_encoded_point(_CURVES[algorithm](), point)
+    except ValueError as e:
+        raise InvalidKeyMaterial(f'Invalid {algorithm} public key: {e}')
+
+
+def _key_from_jwk(jwk: dict):
+    if not isinstance(jwk, dict):
+        raise InvalidKeyMaterial('public_key_jwk must be an object')
+    if 'd' in jwk or 'p' in jwk:
+        raise InvalidKeyMaterial('public_key_jwk must not contain private key material')
+    kty = jwk.get('kty')
+    if kty == 'OKP':
+        if jwk.get('crv') != 'Ed25519':
+            raise InvalidKeyMaterial(f"Unsupported OKP curve {jwk.get('crv')}")
+        try:
+            return ed25519.Ed25519PublicKey.from_public_bytes(_b64url_decode(jwk.get('x')))
+        except ValueError as e:
+            raise InvalidKeyMaterial(f'Invalid Ed25519 JWK: {e}')
+    if kty == 'EC':
+        crv = jwk.get('crv')
+        algorithm = crv if crv in _CURVES else _JWK_CURVE_ALIASES.get(str(crv).upper())
+        if algorithm is None:
+            raise InvalidKeyMaterial(f'Unsupported EC curve {crv}')
+        x, y = _b64url_decode(jwk.get('x')), _b64url_decode(jwk.get('y'))
+        size = (_CURVES[algorithm].key_size + 7) // 8
+        if len(x) != size or len(y) != size:
+            raise InvalidKeyMaterial(f'{algorithm} JWK coordinates must be {size} bytes')
+        return _ec_point(algorithm, b'\x04' + x + y)
+    if kty == 'RSA':
+        n = int.from_bytes(_b64url_decode(jwk.get('n')), 'big')
+        e = int.from_bytes(_b64url_decode(jwk.get('e')), 'big')
+        try:
+            return rsa.RSAPublicNumbers(e, n).public_key()
+        except ValueError as err:
+            raise InvalidKeyMaterial(f'Invalid RSA JWK: {err}')
+    raise InvalidKeyMaterial(f'Unsupported JWK kty {kty}')
+
+
+def _key_from_bytes(data: bytes, hint):
+    """Parse DER, multicodec-prefixed or bare key bytes, using the key type hint for bare ones."""
+    # Checked first: about 1 in 256 Ed25519 keys start with 0x30 (a DER SEQUENCE tag), and
+    # no multicodec-prefixed or DER key of a supported type is 32 bytes long
+    if len(data) == 32 and hint in (None, 'Ed25519'):
+        return ed25519.Ed25519PublicKey.from_public_bytes(data)
+    for algorithm, prefix in _MULTICODEC.items():
+        body = data[len(prefix):]
+        if not data.startswith(prefix):
+            continue
+        if algorithm == 'Ed25519' and len(body) == 32:
+            return ed25519.Ed25519PublicKey.from_public_bytes(body)
+        if algorithm == 'RSA' and body[:1] == b'\x30':
+            return _key_from_der(body)
+        if algorithm in _CURVES:
+            size = (_CURVES[algorithm].key_size + 7) // 8
+            if len(body) in (size + 1, 2 * size + 1):
+                return _ec_point(algorithm, body)
+    if data[:1] == b'\x30':
+        return _key_from_der(data)
+    if data[:1] in (b'\x02', b'\x03', b'\x04'):
+        # A bare point does not name its curve; try the hinted one, then the curves of that size
+        size = len(data) - 1 if data[:1] != b'\x04' else (len(data) - 1) // 2
+        candidates = [hint] if hint in _CURVES else [a for a in _CURVES if (_CURVES[a].key_size + 7) // 8 == size]
+        keys = []
+        for algorithm in candidates:
+            try:
+                keys.append(_ec_point(algorithm, data))
+            except InvalidKeyMaterial:
+                continue
+        if len(keys) > 1:
+            raise InvalidKeyMaterial('EC point is valid on several curves; use a curve-specific key_type or a JWK')
+        if keys:
+            return keys[0]
+    raise InvalidKeyMaterial('Unrecognized public key encoding')
+
+
+def _key_from_der(data: bytes):
+    try:
+        return serialization.load_der_public_key(data)
+    except ValueError as e:
+        raise InvalidKeyMaterial(f'Invalid DER public key: {e}')
+
+
+def _key_from_pem(pem):
+    if not isinstance(pem, str):
+        raise InvalidKeyMaterial('public_key_pem must be a string')
+    try:
+        return serialization.load_pem_public_key(pem.strip().encode('ascii'))
+    except (ValueError, UnicodeEncodeError) as e:
+        raise InvalidKeyMaterial(f'Invalid PEM public key: {e}')
+
+
+def _load(key_type, public_key_multibase, public_key_hex, public_key_jwk, public_key_pem):
+    hint = _algorithm_hint(key_type)
+    if public_key_jwk:
+        return _key_from_jwk(public_key_jwk)
+    if public_key_pem:
+        return _key_from_pem(public_key_pem)
+    if public_key_hex:
+        try:
+            data = bytes.fromhex(public_key_hex.removeprefix('0x'))
+        except (ValueError, AttributeError):
+            raise InvalidKeyMaterial('public_key_hex is not valid hex')
+        return _key_from_bytes(data, hint)
+    if public_key_multibase:
+        try:
+            data = decode_multibase(public_key_multibase)
+        except ValueError as e:
+            raise InvalidKeyMaterial(str(e))
+        return _key_from_bytes(data, hint)
+    raise InvalidKeyMaterial('One of public_key_multibase, public_key_hex, public_key_jwk or public_key_pem is required')
+
+
+def normalize_key_material(key_type='', public_key_multibase=None, public_key_hex=None, public_key_jwk=None,
+                           public_key_pem=None) -> dict:
+    """Return algorithm, public_key_raw and canonical multibase/hex/JWK for a key.
+
+    The JWK wins when several representations are supplied, then PEM. Raises InvalidKeyMaterial.
+    """
+    key = _load(key_type, public_key_multibase, public_key_hex, public_key_jwk, public_key_pem)
+
+    if isinstance(key, ed25519.Ed25519PublicKey):
+        algorithm = 'Ed25519'
+        raw = key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        multicodec_body, hex_value = raw, raw.hex()
+        jwk = {'kty': 'OKP', 'crv': 'Ed25519', 'x': _b64url(raw)}
+    elif isinstance(key, ec.EllipticCurvePublicKey):
+        algorithm = _CURVE_NAMES.get(key.curve.name)
+        if algorithm is None:
+            raise InvalidKeyMaterial(f'Unsupported EC curve {key.curve.name}')
+        raw = key.public_bytes(serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint)
+        multicodec_body = key.public_bytes(serialization.Encoding.X962, serialization.PublicFormat.CompressedPoint)
+        hex_value = raw.hex()
+        size = (key.curve.key_size + 7) // 8
+        jwk = {'kty': 'EC', 'crv': algorithm, 'x': _b64url(raw[1:1 + size]), 'y': _b64url(raw[1 + size:])}
+    elif isinstance(key, rsa.RSAPublicKey):
+        algorithm = 'RSA'
+        raw = key.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+        multicodec_body = key.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.PKCS1)
+        hex_value = raw.hex()
+        numbers = key.public_numbers()
+        jwk = {
+            'kty': 'RSA',
+            'n': _b64url(numbers.n.to_bytes((numbers.n.bit_length() + 7) // 8, 'big')),
+            'e': _b64url(numbers.e.to_bytes((numbers.e.bit_length() + 7) // 8, 'big')),
+        }
+    else:
+        raise InvalidKeyMaterial(f'Unsupported key type {type(key).__name__}')
+
+    hint = _algorithm_hint(key_type)
+    if hint and hint != algorithm:
+        raise InvalidKeyMaterial(f'{key_type} does not match the supplied {algorithm} key')
+    if isinstance(public_key_jwk, dict):
+        jwk.update({m: public_key_jwk[m] for m in _JWK_MEMBERS_KEPT if m in public_key_jwk})
+
+    return {
+        'algorithm': algorithm,
+        'public_key_raw': raw,
+        'public_key_multibase': encode_base58btc(_MULTICODEC[algorithm] + multicodec_body),
+        'public_key_hex': hex_value,
+        'public_key_jwk': jwk,
+    }
+
+
+def normalize_key(key: dict) -> dict:
+    """Copy of a PublicKey field dict with its key material normalized."""
+    return {
+        **key,
+        **normalize_key_material(
+            key.get('key_type', ''), key.get('public_key_multibase'), key.get('public_key_hex'), key.get('public_key_jwk'),
+            key.get('public_key_pem'),
+        ),
+    }
@@ -0,0 +1,89 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from organization.models import Organization
+from worker.models import UserEmail, normalize_email, users_with_email
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the organization-name and user-email lookups done at login, with and without the '
+        'normalized indexes, as synthetic organizations and users grow. Runs inside a transaction '
+        'that is rolled back, so nothing is kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000, 30000],
+                            help='Organization (and user) counts to measure at')
+        parser.add_argument('--iterations', type=int, default=200, help='Lookups timed per query and scale')
+        parser.add_argument('--explain', action='store_true', help='Print query plans at the largest scale')
+
+    def handle(self, *args, **options):
+        scales = sorted(options['scales'])
+        iterations = options['iterations']
+        tag = uuid.uuid4().hex[:8]
+        rows = []
+        with transaction.atomic():
+            created = 0
+            for scale in scales:
+                self._grow(tag, created, scale)
+                created = scale
+                self._analyze()
+                picks = [random.randrange(scale) for _ in range(iterations)]
+                names = [self._org_name(tag, i).swapcase() for i in picks]
+                emails = [self._email(tag, i).upper() for i in picks]
+                rows.append((scale, {
+                    'org iexact': self._time(lambda n: Organization.objects.filter(name__iexact=n).first(), names),
+                    'org named()': self._time(lambda n: Organization.objects.named(n).first(), names),
+                    'email iexact': self._time(lambda e: User.objects.filter(email__iexact=e).first(), emails),
+                    'users_with_email()': self._time(lambda e: users_with_email(e).first(), emails),
+                }))
+            if options['explain']:
+                self.stdout.write(Organization.objects.named(names[0]).explain())
+                self.stdout.write(users_with_email(emails[0]).explain())
+            transaction.set_rollback(True)
+
+        columns = list(rows[0][1])
+        self.stdout.write(f'Median / p95 lookup latency in ms on {connection.vendor} ({iterations} lookups each)')
+        self.stdout.write(f"{'organizations':>14}" + ''.join(f'{c:>22}' for c in columns))
+        for scale, timings in rows:
+            cells = ''.join(f"{f'{p50:.3f} / {p95:.3f}':>22}" for p50, p95 in (timings[c] for c in columns))
+            self.stdout.write(f'{scale:>14}' + cells)
+
+    def _org_name(self, tag, i):
+        return f'Bench {tag} Organization {i:06d}'
+
+    def _email(self, tag, i):
+        return f'Bench.Worker.{i:06d}@{tag}.Example.org'
+
+    def _grow(self, tag, start, stop, batch=5000):
+        for first in range(start, stop, batch):
+            indexes = range(first, min(first + batch, stop))
+            Organization.objects.bulk_create([Organization(name=self._org_name(tag, i)) for i in indexes])
+            users = User.objects.bulk_create([
+                User(username=f'bench-{tag}-{i}', email=self._email(tag, i), password='!') for i in indexes
+            ])
+            if users[0].pk is None:  # backends that do not return ids from bulk_create
+                users = User.objects.filter(username__in=[u.username for u in users])
+            # bulk_create sends no post_save, so fill the email index directly
+            UserEmail.objects.bulk_create([UserEmail(user_id=u.pk, email=normalize_email(u.email)) for u in users])
+
+    def _analyze(self):
+        with connection.cursor() as cursor:
+            for model in (Organization, User, UserEmail):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+    def _time(self, lookup, values):
+        lookup(values[0])  # warm up
+        samples = []
+        for value in values:
+            started = time.perf_counter()
+            lookup(value)
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples), statistics.quantiles(samples, n=20)[-1]
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from organization.context_closure import build_context_closure
+from organization.context_fetcher import DEFAULT_RETRIES, DEFAULT_TIMEOUT, DEFAULT_WORKERS, ContextFetcher
+from organization.models import JsonLdDocument, Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Store the transitive closure (@context references, @import, scoped contexts) of each "
+        "organization's uploaded JSON-LD contexts, fetching dependencies the server does not hold yet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', nargs='*', help='Only these organization ids')
+        parser.add_argument('--no-fetch', action='store_true', help='Only use documents already stored on the server')
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+        parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT)
+        parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES)
+        parser.add_argument('--allow-private-hosts', action='store_true',
+                            help='Fetch contexts from private/loopback addresses (local testing only)')
+
+    def handle(self, *args, **options):
+        qs = Organization.objects.filter(contexts__origin='UPLOADED').distinct()
+        if options['organization']:
+            qs = qs.filter(id__in=options['organization'])
+        fetcher = None
+        if not options['no_fetch']:
+            fetcher = ContextFetcher(
+                timeout=options['timeout'], retries=options['retries'], max_workers=options['workers'],
+                allow_private_hosts=options['allow_private_hosts'],
+            )
+        try:
+            for org in qs.order_by('name'):
+                result = build_context_closure(org, fetcher)
+                self.stdout.write(self.style.SUCCESS(
+                    f"✔ {org.name}: {len(result['added'])} added, {len(result['updated'])} updated, "
+                    f"{len(result['removed'])} removed"
+                ))
+                for url in result['missing']:
+                    self.stderr.write(self.style.ERROR(f'✖ {org.name}: could not locate {url}'))
+        finally:
+            if fetcher is not None:
+                fetcher.close()
+        # Garbage-collect bodies left behind by rebuilds, re-uploads, refreshes and deleted organizations
+        pruned = JsonLdDocument.objects.delete_unreferenced()
+        if pruned:
+            self.stdout.write(f'Deleted {pruned} unreferenced JSON-LD document(s)')
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from organization.models import Organization
+from organization.status_list_publisher import organization_dir, publish_status_lists
+
+
+class Command(BaseCommand):
+    help = (
+        'Write every organization\'s status list credentials and manifest to STATUS_LIST_PUBLISH_ROOT. '
+        'Writes republish automatically; run this after deploying to a fresh disk.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', nargs='*', help='Only these organization ids')
+
+    def handle(self, *args, **options):
+        if not settings.STATUS_LIST_PUBLISH_ROOT:
+            raise CommandError('STATUS_LIST_PUBLISH_ROOT is not set')
+        qs = Organization.objects.filter(status_list_credentials__isnull=False).distinct()
+        if options['organization']:
+            qs = qs.filter(id__in=options['organization'])
+        total = 0
+        for org in qs.order_by('name'):
+            written = publish_status_lists(org.pk)
+            total += written
+            self.stdout.write(self.style.SUCCESS(f'✔ {org.name}: {written} files written to {organization_dir(org.pk)}'))
+        self.stdout.write(self.style.SUCCESS(f'Done. {total} files written.'))
@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from organization.did_resolver import DEFAULT_RETRIES, DEFAULT_TIMEOUT, DEFAULT_WORKERS, DIDResolver
+from organization.models import OrganizationDID, PublicKey
+
+
+class Command(BaseCommand):
+    help = 'Resolve submitted organization DIDs (did:web, did:key, did:jwk) and upsert their keys into PublicKey.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--did', nargs='*', help='Only resolve these DIDs')
+        parser.add_argument('--all', action='store_true', help='Also re-resolve DIDs that are already RESOLVED')
+        parser.add_argument('--limit', type=int, default=500, help='Maximum DIDs per pass')
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+        parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT)
+        parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES)
+        parser.add_argument('--loop', action='store_true', help='Keep running, resolving new submissions every --interval seconds')
+        parser.add_argument('--interval', type=int, default=60)
+        parser.add_argument('--scheme', default='https', help='URL scheme for did:web (http only for local testing)')
+        parser.add_argument('--allow-private-hosts', action='store_true',
+                            help='Fetch did:web documents from private/loopback addresses (local testing only)')
+
+    def handle(self, *args, **options):
+        resolver = DIDResolver(
+            timeout=options['timeout'], retries=options['retries'],
+            max_workers=options['workers'], scheme=options['scheme'],
+            allow_private_hosts=options['allow_private_hosts'],
+        )
+        try:
+            while True:
+                self.resolve_pass(resolver, options)
+                if not options['loop']:
+                    break
+                close_old_connections()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            resolver.close()
+
+    def resolve_pass(self, resolver, options):
+        qs = OrganizationDID.objects.exclude(status='REVOKED')
+        if not options['all']:
+            qs = qs.filter(status='SUBMITTED')
+        if options['did']:
+            qs = qs.filter(did__in=options['did'])
+        org_dids = list(qs.select_related('organization').order_by('updated_at')[:options['limit']])
+        if not org_dids:
+            return 0, 0
+
+        results = resolver.resolve_many([d.did for d in org_dids])
+        resolved = failed = 0
+        now = timezone.now().isoformat()
+        for org_did in org_dids:
+            keys, error = results[org_did.did]
+            metadata = dict(org_did.metadata or {})
+            metadata['last_attempt_at'] = now
+            if error:
+                failed += 1
+                metadata['last_error'] = error
+                org_did.metadata = metadata
+                org_did.save(update_fields=['metadata', 'updated_at'])
+                self.stderr.write(self.style.ERROR(f'✖ {org_did.did}: {error}'))
+                continue
+            with transaction.atomic():
+                counts = PublicKey.objects.bulk_upsert(org_did.organization, keys)
+                metadata.pop('last_error', None)
+                metadata.update({'resolved_at': now, 'key_ids': [k['key_id'] for k in keys]})
+                org_did.status = 'RESOLVED'
+                org_did.metadata = metadata
+                org_did.save(update_fields=['status', 'metadata', 'updated_at'])
+            resolved += 1
+            self.stdout.write(self.style.SUCCESS(
+                f"✔ {org_did.did}: {len(counts['created'])} created, "
+                f"{len(counts['updated'])} updated, {len(counts['unchanged'])} unchanged"
+            ))
+        self.stdout.write(f'Done. Resolved {resolved}/{len(org_dids)} DIDs ({failed} failed).')
+        return resolved, failed
@@ -0,0 +1,81 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from organization.models import Organization, OrganizationChange, PublicKey, PublicKeySweep
+
+
+class Command(BaseCommand):
+    help = 'Deactivate expired and revoked public keys in chunks and stamp the affected organizations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Keys updated per UPDATE statement')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many keys would be deactivated')
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping every --interval seconds')
+        parser.add_argument('--interval', type=int, default=300)
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                self.sweep(options['chunk_size'], options['dry_run'])
+                if not options['loop']:
+                    break
+                close_old_connections()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def sweep(self, chunk_size, dry_run=False):
+        now = timezone.now()
+        conditions = {
+            'expired': Q(expires_at__lte=now),
+            # revoked_at set but is_active never cleared (revocations recorded ahead of time included)
+            'revoked': Q(revoked_at__lte=now),
+        }
+        if dry_run:
+            for label, condition in conditions.items():
+                count = PublicKey.objects.filter(condition, is_active=True).count()
+                self.stdout.write(f'{count} {label} keys would be deactivated')
+            return None
+
+        run = PublicKeySweep.objects.create(started_at=now)
+        counts = {'expired': 0, 'revoked': 0}
+        affected = set()
+        for label, condition in conditions.items():
+            while True:
+                # Index-backed (idx_pk_active) chunk; each UPDATE holds row locks only for this chunk
+                batch = list(
+                    PublicKey.objects.filter(condition, is_active=True)
+                    .order_by('pk').values_list('pk', 'organization_id', 'key_id')[:chunk_size]
+                )
+                if not batch:
+                    break
+                key_ids_by_org = {}
+                for _, org_id, key_id in batch:
+                    key_ids_by_org.setdefault(org_id, []).append(key_id)
+                org_ids = set(key_ids_by_org)
+                with transaction.atomic():
+                    updated = PublicKey.objects.filter(
+                        pk__in=[pk for pk, _, _ in batch], is_active=True
+                    ).update(is_active=False)
+                    Organization.mark_keys_changed(org_ids)
+                    for org_id, key_ids in key_ids_by_org.items():
+                        OrganizationChange.objects.record(org_id, 'public_keys', key_ids)
+                counts[label] += updated
+                affected |= org_ids
+                if len(batch) < chunk_size:
+                    break
+
+        run.expired_count = counts['expired']
+        run.revoked_count = counts['revoked']
+        run.organizations_affected = len({org_id for org_id in affected if org_id})
+        run.finished_at = timezone.now()
+        run.save(update_fields=['expired_count', 'revoked_count', 'organizations_affected', 'finished_at'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deactivated {run.expired_count} expired and {run.revoked_count} revoked keys '
+            f'across {run.organizations_affected} organizations.'
+        ))
+        return run
@@ -0,0 +1,102 @@
+# server/organization/memberships.py
+"""Resolve the requesting user's organization memberships once per request.
+
+``membership_roles(request)`` returns organization id -> role, in membership
+order (the first entry is the user's default organization). Permission
+classes and views all go through it, so an endpoint does at most one
+membership query, whichever of them asks first.
+
+Lookup order:
+  1. the value already resolved for this request;
+  2. membership claims in the access token (see api.tokens);
+  3. the Django cache, keyed by user id, for settings.MEMBERSHIP_CACHE_SECONDS.
+     With REDIS_URL the cache is shared and invalidation reaches every process;
+     without it other processes keep their entry until it expires (5 seconds
+     by default);
+  4. a single OrganizationMember query, which then fills the cache.
+
+Membership writes drop the user's cache entry through signals, both
+immediately and again after the transaction commits, so a reader racing the
+write cannot keep a stale entry. Queryset ``update()``/``delete()`` on
+memberships send no signals and must call ``invalidate`` themselves.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from api.tokens import claimed_memberships
+
+# IsOrganizationAdmin and the worker admin views accept ADMIN only; the checks that
+# find the organization from the membership itself also accept OWNER.
+ADMIN_ROLES = ('ADMIN',)
+ADMIN_OR_OWNER_ROLES = ('ADMIN', 'OWNER')
+_REQUEST_ATTR = '_organization_memberships'
+
+
+def _cache_key(user_id):
+    return f'organization:memberships:{user_id}'
+
+
+def load_membership_roles(user_id) -> dict:
+    from worker.models import OrganizationMember
+
+    key = _cache_key(user_id)
+    roles = cache.get(key)
+    if roles is None:
+        rows = OrganizationMember.objects.filter(user_id=user_id).order_by('created_at').values_list('organization_id', 'role')
+        roles = {str(org_id): role for org_id, role in rows}
+        cache.set(key, roles, settings.MEMBERSHIP_CACHE_SECONDS)
+    return roles
+
+
+def membership_roles(request) -> dict:
+    """organization id -> role for the authenticated user ({} when anonymous). Must not be mutated."""
+    # DRF's Request wraps the HttpRequest; memoize on the latter so every wrapper shares it
+    holder = getattr(request, '_request', request)
+    roles = getattr(holder, _REQUEST_ATTR, None)
+    if roles is None:
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            roles = {}
+        else:
+            roles = claimed_memberships(user)
+            if roles is None:
+                roles = load_membership_roles(user.pk)
+        setattr(holder, _REQUEST_ATTR, roles)
+    return roles
+
+
+def _normalize(org_id):
+    try:
+        return str(uuid.UUID(str(org_id)))
+    except ValueError:
+        return None
+
+
+def membership_role(request, org_id):
+    """The user's role in ``org_id``, or None when they are not a member (or the id is malformed)."""
+    org_id = _normalize(org_id)
+    return membership_roles(request).get(org_id) if org_id else None
+
+
+def is_organization_admin(request, org_id, roles=ADMIN_ROLES) -> bool:
+    return membership_role(request, org_id) in roles
+
+
+def default_organization_id(request):
+    """The user's first organization id, or None."""
+    return next(iter(membership_roles(request)), None)
+
+
+def admin_organization_id(request, roles=ADMIN_ROLES):
+    """The first organization the user administers, or None."""
+    return next((org_id for org_id, role in membership_roles(request).items() if role in roles), None)
+
+
+def invalidate(user_id):
+    """Forget a user's cached memberships now and once the current transaction commits."""
+    key = _cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
@@ -0,0 +1,53 @@
+# server/organization/middleware.py
+import mimetypes
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified, JsonResponse
+from django.utils.http import http_date
+
+from .status_list_publisher import MANIFEST_NAME
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, no-cache'
+
+
+class PublishedFilesMiddleware:
+    """Serve files under STATUS_LIST_PUBLISH_URL straight from STATUS_LIST_PUBLISH_ROOT.
+
+    Runs ahead of sessions, authentication and the ORM, so a status list
+    read costs one file open. Content-hashed files are cached as immutable;
+    manifests are revalidated against an ETag from their size and mtime.
+    Where nginx or a CDN serves the directory, requests never get here.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATUS_LIST_PUBLISH_URL
+        self.root = Path(settings.STATUS_LIST_PUBLISH_ROOT).resolve() if settings.STATUS_LIST_PUBLISH_ROOT else None
+
+    def __call__(self, request):
+        if self.root is None or not request.path.startswith(self.prefix):
+            return self.get_response(request)
+        if request.method not in ('GET', 'HEAD'):
+            return JsonResponse({'detail': 'Method not allowed'}, status=405, headers={'Allow': 'GET, HEAD'})
+
+        path = (self.root / request.path[len(self.prefix):]).resolve()
+        try:
+            if not path.is_relative_to(self.root) or not path.is_file():
+                raise FileNotFoundError
+            stat = path.stat()
+        except (FileNotFoundError, ValueError):
+            return JsonResponse({'detail': 'Not found'}, status=404)
+
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        immutable = path.name != MANIFEST_NAME
+        if etag in [t.strip() for t in request.headers.get('If-None-Match', '').split(',')]:
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=mimetypes.guess_type(path.name)[0] or 'application/octet-stream')
+            response['Last-Modified'] = http_date(stat.st_mtime)
+        response['ETag'] = etag
+        response['Cache-Control'] = IMMUTABLE if immutable else REVALIDATE
+        response['Access-Control-Allow-Origin'] = '*'
+        return response
@@ -0,0 +1,131 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:06
+
+import base64
+import zlib
+
+from django.db import migrations, models
+
+# Frozen copy of organization.bitstring's decoding and bitstring_stats as of this
+# migration, so later changes to that module cannot change what it backfills.
+MAX_BITSTRING_BYTES = 16 * 1024 * 1024
+_B58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+
+def decode_bitstring(encoded):
+    """Multibase (base58btc ``z``, base64url ``u`` or unprefixed base64url) GZIP bitstring to bytes."""
+    if not encoded or not isinstance(encoded, str):
+        raise ValueError('Encoded status list missing')
+    try:
+        if encoded[0] == 'z':
+            num = 0
+            for char in encoded[1:]:
+                idx = _B58_ALPHABET.find(char)
+                if idx < 0:
+                    raise ValueError('Invalid base58 character')
+                num = num * 58 + idx
+            body = num.to_bytes((num.bit_length() + 7) // 8, 'big') if num else b''
+            compressed = b'\x00' * (len(encoded[1:]) - len(encoded[1:].lstrip('1'))) + body
+        else:
+            value = encoded[1:] if encoded[0] == 'u' else encoded
+            compressed = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Invalid multibase encoding for status list: {e}')
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        bits = inflater.decompress(compressed, MAX_BITSTRING_BYTES + 1)
+        if inflater.unconsumed_tail or len(bits) > MAX_BITSTRING_BYTES:
+            raise ValueError('Status list exceeds maximum supported size')
+        bits += inflater.flush()
+    except zlib.error as e:
+        raise ValueError(f'Invalid GZIP data in status list: {e}')
+    if len(bits) > MAX_BITSTRING_BYTES:
+        raise ValueError('Status list exceeds maximum supported size')
+    return bits
+
+
+def bitstring_stats(encoded, previous_encoded=None):
+    bits = decode_bitstring(encoded)
+    changed = None
+    if previous_encoded is not None:
+        previous = decode_bitstring(previous_encoded)
+        width = max(len(bits), len(previous))
+        changed = (
+            int.from_bytes(bits.ljust(width, b'\x00'), 'big') ^ int.from_bytes(previous.ljust(width, b'\x00'), 'big')
+        ).bit_count()
+    return {
+        'bit_length': len(bits) * 8,
+        'set_bit_count': int.from_bytes(bits, 'big').bit_count(),
+        'changed_bit_count': changed,
+    }
+
+
+def backfill_statistics(apps, schema_editor):
+    """Compute bit statistics for existing lists, walking each list's versions in order."""
+    StatusListCredential = apps.get_model('organization', 'StatusListCredential')
+    StatusListCredentialHistory = apps.get_model('organization', 'StatusListCredentialHistory')
+
+    def encoded_list(credential):
+        subj = credential.get('credentialSubject', {}) if isinstance(credential, dict) else {}
+        return subj.get('encodedList') if isinstance(subj, dict) else None
+
+    def stats(encoded, previous):
+        try:
+            return bitstring_stats(encoded, previous)
+        except ValueError:
+            return None
+
+    for current in StatusListCredential.objects.all().iterator():
+        previous = None
+        versions = list(StatusListCredentialHistory.objects.filter(status_list_current=current).order_by('version'))
+        for row in versions + [current]:
+            encoded = encoded_list(row.full_credential)
+            result = stats(encoded, previous)
+            if result:
+                row.bit_length = result['bit_length']
+                row.set_bit_count = result['set_bit_count']
+                row.changed_bit_count = result['changed_bit_count']
+                row.save(update_fields=['bit_length', 'set_bit_count', 'changed_bit_count'])
+                previous = encoded
+            else:
+                previous = None
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0007_statuslistcredentialhistory_issuer_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='statuslistcredential',
+            name='bit_length',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Total bits in the decoded list', null=True),
+        ),
+        migrations.AddField(
+            model_name='statuslistcredential',
+            name='changed_bit_count',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Bits flipped relative to the previous version (null for version 1)', null=True),
+        ),
+        migrations.AddField(
+            model_name='statuslistcredential',
+            name='set_bit_count',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Bits set in the decoded list (revoked/suspended entries for 1-bit statuses)', null=True),
+        ),
+        migrations.AddField(
+            model_name='statuslistcredentialhistory',
+            name='bit_length',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='statuslistcredentialhistory',
+            name='changed_bit_count',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='statuslistcredentialhistory',
+            name='set_bit_count',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_statistics, migrations.RunPython.noop),
+    ]
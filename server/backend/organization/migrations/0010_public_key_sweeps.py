@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:16
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def stamp_organizations_with_keys(apps, schema_editor):
+    """Give organizations that already have keys a starting keys_changed_at."""
+    Organization = apps.get_model('organization', 'Organization')
+    PublicKey = apps.get_model('organization', 'PublicKey')
+    Organization.objects.filter(
+        pk__in=PublicKey.objects.values('organization_id')
+    ).update(keys_changed_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0009_publickey_normalized_material'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublicKeySweep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('expired_count', models.PositiveIntegerField(default=0)),
+                ('revoked_count', models.PositiveIntegerField(default=0)),
+                ('organizations_affected', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='keys_changed_at',
+            field=models.DateTimeField(blank=True, help_text="Last time the organization's active key set changed", null=True),
+        ),
+        migrations.RunPython(stamp_organizations_with_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:40
+
+import django.db.models.deletion
+import hashlib
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import migrations, models
+
+
+def canonical_json(document):
+    # Frozen copy of organization.models.canonical_json; the content hashes written here must not
+    # change if the live encoding does.
+    return json.dumps(
+        document, sort_keys=True, separators=(',', ':'), ensure_ascii=False, cls=DjangoJSONEncoder,
+    ).encode('utf-8')
+
+
+def move_documents(apps, schema_editor):
+    """Intern every existing context body and point its entry at the shared row."""
+    JsonLdContext = apps.get_model('organization', 'JsonLdContext')
+    JsonLdDocument = apps.get_model('organization', 'JsonLdDocument')
+    seen = set()
+    batch = []
+    for ctx in JsonLdContext.objects.all().iterator(chunk_size=500):
+        encoded = canonical_json(ctx.document)
+        content_hash = hashlib.sha256(encoded).hexdigest()
+        if content_hash not in seen:
+            JsonLdDocument.objects.get_or_create(
+                content_hash=content_hash, defaults={'document': ctx.document, 'size': len(encoded)}
+            )
+            seen.add(content_hash)
+        ctx.content_id = content_hash
+        batch.append(ctx)
+        if len(batch) >= 500:
+            JsonLdContext.objects.bulk_update(batch, ['content'])
+            batch = []
+    if batch:
+        JsonLdContext.objects.bulk_update(batch, ['content'])
+
+
+def restore_documents(apps, schema_editor):
+    JsonLdContext = apps.get_model('organization', 'JsonLdContext')
+    for ctx in JsonLdContext.objects.select_related('content').iterator(chunk_size=500):
+        ctx.document = ctx.content.document
+        ctx.save(update_fields=['document'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0010_public_key_sweeps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JsonLdDocument',
+            fields=[
+                ('content_hash', models.CharField(editable=False, max_length=64, primary_key=True, serialize=False)),
+                ('document', models.JSONField()),
+                ('size', models.PositiveIntegerField(help_text='Canonical JSON size in bytes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'JSON-LD Document',
+                'verbose_name_plural': 'JSON-LD Documents',
+            },
+        ),
+        migrations.AddField(
+            model_name='jsonldcontext',
+            name='content',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='contexts', to='organization.jsonlddocument'),
+        ),
+        migrations.AlterField(
+            model_name='jsonldcontext',
+            name='document',
+            field=models.JSONField(null=True),
+        ),
+        migrations.RunPython(move_documents, restore_documents),
+        migrations.RemoveField(
+            model_name='jsonldcontext',
+            name='document',
+        ),
+        migrations.AlterField(
+            model_name='jsonldcontext',
+            name='content',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='contexts', to='organization.jsonlddocument'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0011_jsonld_documents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JsonLdContextSource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500, unique=True)),
+                ('etag', models.CharField(blank=True, default='', max_length=255)),
+                ('last_modified', models.CharField(blank=True, default='', help_text='Last-Modified header as sent by the source', max_length=64)),
+                ('fetched_at', models.DateTimeField(blank=True, help_text='Last successful fetch or revalidation', null=True)),
+                ('changed_at', models.DateTimeField(blank=True, help_text='Last time the fetched document changed', null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('content', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='sources', to='organization.jsonlddocument')),
+            ],
+            options={
+                'verbose_name': 'JSON-LD Context Source',
+                'verbose_name_plural': 'JSON-LD Context Sources',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0012_jsonld_context_sources'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jsonldcontext',
+            name='origin',
+            field=models.CharField(choices=[('UPLOADED', 'Uploaded'), ('DEPENDENCY', 'Dependency')], default='UPLOADED', help_text='UPLOADED by an admin, or a DEPENDENCY pulled in by the context closure builder', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='missing_context_urls',
+            field=models.JSONField(blank=True, default=list, help_text='Context dependencies the closure builder could not locate'),
+        ),
+    ]
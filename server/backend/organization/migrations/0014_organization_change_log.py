@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0013_jsonld_context_closure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='change_seq',
+            field=models.PositiveBigIntegerField(default=0, help_text='Sequence number of the latest OrganizationChange'),
+        ),
+        migrations.CreateModel(
+            name='OrganizationChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('seq', models.PositiveBigIntegerField()),
+                ('section', models.CharField(choices=[('contexts', 'Contexts'), ('public_keys', 'Public keys'), ('status_list_credentials', 'Status list credentials')], max_length=30)),
+                ('item_key', models.CharField(max_length=1000)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='organization.organization')),
+            ],
+            options={
+                'ordering': ['organization', 'seq'],
+                'constraints': [models.UniqueConstraint(fields=('organization', 'seq'), name='uniq_change_org_seq')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:31
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0014_organization_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfflineBundle',
+            fields=[
+                ('organization', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='offline_bundle', serialize=False, to='organization.organization')),
+                ('bundle_hash', models.CharField(max_length=64)),
+                ('change_seq', models.PositiveBigIntegerField(default=0)),
+                ('body', models.BinaryField(help_text='UTF-8 JSON')),
+                ('gzip_body', models.BinaryField()),
+                ('br_body', models.BinaryField(blank=True, null=True)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('gzip_size', models.PositiveIntegerField(default=0)),
+                ('br_size', models.PositiveIntegerField(blank=True, null=True)),
+                ('stale', models.BooleanField(default=False)),
+                ('built_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:05
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+from organization.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('organization', '0015_offline_bundle_cache'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='organization',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='organization_name_lower_idx'),
+        ),
+    ]
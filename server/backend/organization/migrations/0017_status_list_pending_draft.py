@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0016_organization_name_lower_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='statuslistcredential',
+            name='pending_base_version',
+            field=models.PositiveIntegerField(blank=True, help_text='Version the pending draft was derived from', null=True),
+        ),
+        migrations.AddField(
+            model_name='statuslistcredential',
+            name='pending_credential',
+            field=models.JSONField(blank=True, help_text='Re-encoded list awaiting an issuer-signed upload', null=True),
+        ),
+        migrations.AddField(
+            model_name='statuslistcredential',
+            name='pending_encoded_list_hash',
+            field=models.CharField(blank=True, default='', max_length=128),
+        ),
+    ]
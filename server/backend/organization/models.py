@@ -1,9 +1,30 @@
 # server/organization/models.py
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, transaction
+from django.db.models import Value
+from django.db.models.functions import Lower
+from django.utils import timezone
 import hashlib
+import json
 from datetime import datetime, timezone as dt_timezone
+import logging
 import uuid
 
+from .bitstring import bitstring_stats
+from .change_stream import broadcaster as change_broadcaster
+from .key_material import normalize_key
+
+logger = logging.getLogger(__name__)
+
+
+class OrganizationManager(models.Manager):
+    def named(self, name):
+        """Organizations whose name matches case-insensitively, using the LOWER(name) index.
+
+        Prefer this to ``name__iexact``, which PostgreSQL evaluates as UPPER() and so scans.
+        """
+        return self.alias(name_lower=Lower('name')).filter(name_lower=Lower(Value(name)))
+
 
 class Organization(models.Model):
     """
@@ -11,14 +32,30 @@ class Organization(models.Model):
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255, unique=True)
+    keys_changed_at = models.DateTimeField(null=True, blank=True, help_text="Last time the organization's active key set changed")
+    missing_context_urls = models.JSONField(default=list, blank=True, help_text="Context dependencies the closure builder could not locate")
+    change_seq = models.PositiveBigIntegerField(default=0, help_text="Sequence number of the latest OrganizationChange")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrganizationManager()
+
     def __str__(self):
         return self.name
 
     class Meta:
         ordering = ["name"]
+        indexes = [models.Index(Lower('name'), name='organization_name_lower_idx')]
+
+    @classmethod
+    def mark_keys_changed(cls, org_ids):
+        """Stamp keys_changed_at and drop the organizations from the key index once committed."""
+        org_ids = {org_id for org_id in org_ids if org_id}
+        if not org_ids:
+            return
+        cls.objects.filter(pk__in=org_ids).update(keys_changed_at=timezone.now())
+        from .key_index import key_index
+        transaction.on_commit(lambda: [key_index.invalidate(org_id) for org_id in org_ids])
 
 
 class OrganizationDID(models.Model):
@@ -52,6 +89,83 @@ class OrganizationDID(models.Model):
         return f"{self.did} ({self.status})"
 
 
+def _field_value(obj, field):
+    value = getattr(obj, field)
+    return bytes(value) if isinstance(value, memoryview) else value
+
+
+class PublicKeyManager(models.Manager):
+    UPSERT_FIELDS = (
+        'key_type', 'algorithm', 'public_key_multibase', 'public_key_hex', 'public_key_jwk', 'public_key_raw',
+        'controller', 'purpose', 'is_active',
+    )
+    MAX_WRITE_ATTEMPTS = 5
+
+    def usable(self, now=None):
+        """Keys verifiers may use at ``now``: active, not expired and not revoked yet."""
+        now = now or timezone.now()
+        return self.filter(is_active=True).exclude(expires_at__lte=now).exclude(revoked_at__lte=now)
+
+    @staticmethod
+    def is_usable(key, now):
+        """The ``usable()`` rule for one key's field values (a ``values()`` dict)."""
+        return (
+            key['is_active']
+            and (key['expires_at'] is None or key['expires_at'] > now)
+            and (key['revoked_at'] is None or key['revoked_at'] > now)
+        )
+
+    def bulk_upsert(self, organization, keys):
+        """Insert or update an organization's keys by key_id in a constant number of queries.
+        Stamps the organization's keys_changed_at when anything changed.
+
+        ``keys`` are dicts of PublicKey fields (``key_id`` required); those
+        without an ``algorithm`` are normalized first, raising
+        InvalidKeyMaterial for malformed keys. Returns
+        ``{'created': [...], 'updated': [...], 'unchanged': [...]}`` of key ids.
+        Losing a creation race to a concurrent writer retries the transaction.
+        """
+        incoming = {k['key_id']: k if k.get('algorithm') else normalize_key(k) for k in keys}
+        for attempt in range(self.MAX_WRITE_ATTEMPTS):
+            try:
+                return self._upsert(organization, incoming)
+            except IntegrityError:
+                # Another resolver run or upload created one of these keys after our read; re-read and retry
+                if attempt == self.MAX_WRITE_ATTEMPTS - 1:
+                    raise
+
+    def _upsert(self, organization, incoming):
+        result = {'created': [], 'updated': [], 'unchanged': []}
+        with transaction.atomic():
+            existing = {
+                obj.key_id: obj
+                for obj in self.select_for_update().filter(organization=organization, key_id__in=list(incoming))
+            }
+            to_create, to_update = [], []
+            for key_id, data in incoming.items():
+                values = {field: data[field] for field in self.UPSERT_FIELDS if field in data}
+                obj = existing.get(key_id)
+                if obj is None:
+                    to_create.append(self.model(organization=organization, key_id=key_id, **values))
+                    result['created'].append(key_id)
+                elif any(_field_value(obj, field) != value for field, value in values.items()):
+                    for field, value in values.items():
+                        setattr(obj, field, value)
+                    to_update.append(obj)
+                    result['updated'].append(key_id)
+                else:
+                    result['unchanged'].append(key_id)
+            if to_create:
+                self.bulk_create(to_create)
+            if to_update:
+                self.bulk_update(to_update, list(self.UPSERT_FIELDS))
+            if to_create or to_update:
+                # bulk writes send no post_save signals
+                Organization.mark_keys_changed([organization.pk])
+                OrganizationChange.objects.record(organization.pk, 'public_keys', result['created'] + result['updated'])
+        return result
+
+
 class PublicKey(models.Model):
     """
     Stores resolved public keys for organizations' DIDs.
@@ -62,9 +176,11 @@ class PublicKey(models.Model):
     )
     key_id = models.CharField(max_length=500)
     key_type = models.CharField(max_length=100)
+    algorithm = models.CharField(max_length=20, blank=True, default='', help_text="Ed25519, secp256k1, P-256, P-384 or RSA (derived from the key material)")
     public_key_multibase = models.TextField()
     public_key_hex = models.TextField(null=True, blank=True)
     public_key_jwk = models.JSONField(null=True, blank=True)
+    public_key_raw = models.BinaryField(null=True, blank=True, help_text="Raw key bytes: Ed25519 key, uncompressed EC point or RSA SubjectPublicKeyInfo DER")
     controller = models.CharField(max_length=500)
     purpose = models.CharField(max_length=100, default="assertion")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -73,6 +189,8 @@ class PublicKey(models.Model):
     revocation_reason = models.CharField(max_length=255, null=True, blank=True)
     is_active = models.BooleanField(default=True)
 
+    objects = PublicKeyManager()
+
     class Meta:
         indexes = [
             models.Index(fields=["organization"], name="idx_pk_org"),
@@ -91,6 +209,21 @@ class PublicKey(models.Model):
         return f"{self.key_id} ({self.key_type})"
 
 
+class PublicKeySweep(models.Model):
+    """One run of the sweep_public_keys command and how many keys it deactivated."""
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expired_count = models.PositiveIntegerField(default=0)
+    revoked_count = models.PositiveIntegerField(default=0)
+    organizations_affected = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-started_at"]
+
+    def __str__(self):
+        return f"Sweep {self.started_at:%Y-%m-%d %H:%M} ({self.expired_count} expired, {self.revoked_count} revoked)"
+
+
 class PendingOrganizationRegistration(models.Model):
     """Holds a pending organization admin registration awaiting email OTP confirmation."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -126,16 +259,88 @@ class PendingOrganizationRegistration(models.Model):
         return f"Pending org {self.org_name} admin {self.admin_username} ({state})"
 
 
+def canonical_json(document) -> bytes:
+    """Deterministic JSON encoding used to content-address documents and bundle sections."""
+    return json.dumps(
+        document, sort_keys=True, separators=(',', ':'), ensure_ascii=False, cls=DjangoJSONEncoder,
+    ).encode('utf-8')
+
+
+class JsonLdDocumentManager(models.Manager):
+    def intern(self, document):
+        """Return the shared row for this document body, creating it on first use.
+
+        The row stays locked until the caller's transaction ends, so call this in
+        the transaction that saves the referencing row; delete_unreferenced then
+        cannot remove it in between.
+        """
+        encoded = canonical_json(document)
+        content_hash = hashlib.sha256(encoded).hexdigest()
+        with transaction.atomic():
+            obj, _ = self.select_for_update().get_or_create(
+                content_hash=content_hash, defaults={'document': document, 'size': len(encoded)}
+            )
+        return obj
+
+    def delete_unreferenced(self):
+        """Delete bodies no context or context source points at any more; returns how many.
+
+        Garbage collection for build_context_closures, kept off the request path.
+        Each row goes in its own transaction, and a body re-referenced meanwhile
+        is skipped.
+        """
+        deleted = 0
+        orphans = self.filter(contexts__isnull=True, sources__isnull=True).values_list('content_hash', flat=True)
+        for content_hash in list(orphans):
+            try:
+                with transaction.atomic():
+                    count, _ = self.filter(
+                        content_hash=content_hash, contexts__isnull=True, sources__isnull=True,
+                    ).delete()
+            except (IntegrityError, models.ProtectedError):
+                continue
+            deleted += count
+        return deleted
+
+
+class JsonLdDocument(models.Model):
+    """
+    Immutable JSON-LD context body, shared by every organization entry with the same content.
+    Addressed by the SHA-256 of its canonical JSON encoding.
+    """
+    content_hash = models.CharField(max_length=64, primary_key=True, editable=False)
+    document = models.JSONField()
+    size = models.PositiveIntegerField(help_text="Canonical JSON size in bytes")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = JsonLdDocumentManager()
+
+    class Meta:
+        verbose_name = "JSON-LD Document"
+        verbose_name_plural = "JSON-LD Documents"
+
+    def __str__(self):
+        return self.content_hash
+
+
 class JsonLdContext(models.Model):
     """
-    JSON-LD Context scoped to an Organization.
+    JSON-LD Context scoped to an Organization. The body lives in a shared JsonLdDocument.
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     organization = models.ForeignKey(
         Organization, on_delete=models.CASCADE, related_name="contexts"
     )
     url = models.URLField(max_length=500)
-    document = models.JSONField()
+    content = models.ForeignKey(JsonLdDocument, on_delete=models.PROTECT, related_name="contexts")
+    ORIGIN_CHOICES = [
+        ("UPLOADED", "Uploaded"),
+        ("DEPENDENCY", "Dependency"),
+    ]
+    origin = models.CharField(
+        max_length=20, choices=ORIGIN_CHOICES, default="UPLOADED",
+        help_text="UPLOADED by an admin, or a DEPENDENCY pulled in by the context closure builder",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -156,6 +361,33 @@ class JsonLdContext(models.Model):
         return f"{self.organization_id} :: {self.url}"
 
 
+class JsonLdContextSource(models.Model):
+    """
+    Fetch state of an upstream JSON-LD context URL, shared by every organization referencing it.
+    Holds the HTTP validators used for conditional refreshes and the last fetched document.
+    """
+    url = models.URLField(max_length=500, unique=True)
+    content = models.ForeignKey(
+        JsonLdDocument, on_delete=models.PROTECT, null=True, blank=True, related_name="sources"
+    )
+    etag = models.CharField(max_length=255, blank=True, default="")
+    last_modified = models.CharField(max_length=64, blank=True, default="", help_text="Last-Modified header as sent by the source")
+    fetched_at = models.DateTimeField(null=True, blank=True, help_text="Last successful fetch or revalidation")
+    changed_at = models.DateTimeField(null=True, blank=True, help_text="Last time the fetched document changed")
+    last_error = models.TextField(blank=True, default="")
+
+    class Meta:
+        verbose_name = "JSON-LD Context Source"
+        verbose_name_plural = "JSON-LD Context Sources"
+
+    def __str__(self):
+        return self.url
+
+
+class StatusListVersionConflict(Exception):
+    """A status list row moved past the version a writer based its update on."""
+
+
 class StatusListCredential(models.Model):
     """Current (latest) version of a BitstringStatusList credential for an org.
     One row per (organization, status_list_id) stable identifier.
@@ -170,6 +402,13 @@ class StatusListCredential(models.Model):
     issuance_date = models.DateTimeField(null=True, blank=True)
     encoded_list_hash = models.CharField(max_length=128, help_text="SHA256 hash of credentialSubject.encodedList for change detection", blank=True)
     full_credential = models.JSONField(help_text="Complete StatusList credential JSON document (latest)")
+    bit_length = models.PositiveBigIntegerField(null=True, blank=True, help_text="Total bits in the decoded list")
+    set_bit_count = models.PositiveBigIntegerField(null=True, blank=True, help_text="Bits set in the decoded list (revoked/suspended entries for 1-bit statuses)")
+    changed_bit_count = models.PositiveBigIntegerField(null=True, blank=True, help_text="Bits flipped relative to the previous version (null for version 1)")
+    # Unsigned draft from index operations; the signed full_credential stays current until the issuer uploads a re-signed list
+    pending_credential = models.JSONField(null=True, blank=True, help_text="Re-encoded list awaiting an issuer-signed upload")
+    pending_encoded_list_hash = models.CharField(max_length=128, blank=True, default="")
+    pending_base_version = models.PositiveIntegerField(null=True, blank=True, help_text="Version the pending draft was derived from")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -208,11 +447,22 @@ class StatusListCredential(models.Model):
         except Exception:
             return ''
 
-    def bump_version(self, new_credential: dict):
-        """Persist current row to history then update this row to new version."""
-        StatusListCredentialHistory.objects.create(
+    @staticmethod
+    def _parse_issuance_date(credential: dict):
+        raw = credential.get('issuanceDate') or credential.get('issuance_date')
+        if not raw:
+            return None
+        try:
+            from django.utils.dateparse import parse_datetime
+            return parse_datetime(raw)
+        except Exception:
+            return None
+
+    def _history_snapshot(self):
+        """Unsaved history row capturing this row's current version."""
+        return StatusListCredentialHistory(
             status_list_current=self,
-            organization=self.organization,
+            organization_id=self.organization_id,
             status_list_id=self.status_list_id,
             issuer=self.issuer,
             purposes=self.purposes,
@@ -220,23 +470,83 @@ class StatusListCredential(models.Model):
             issuance_date=self.issuance_date,
             encoded_list_hash=self.encoded_list_hash,
             full_credential=self.full_credential,
+            bit_length=self.bit_length,
+            set_bit_count=self.set_bit_count,
+            changed_bit_count=self.changed_bit_count,
         )
-        self.version += 1
-        self.full_credential = new_credential
-        self.purposes = self._extract_purposes(new_credential)
-        # Update issuance date if present
-        new_issuance = new_credential.get('issuanceDate') or new_credential.get('issuance_date')
-        if new_issuance:
-            try:
-                # Store as raw string parsed by DRF serializers later if needed
-                from django.utils.dateparse import parse_datetime
-                parsed = parse_datetime(new_issuance)
-                if parsed:
-                    self.issuance_date = parsed
-            except Exception:
-                pass
-        self.encoded_list_hash = self._compute_encoded_list_hash(new_credential)
-        self.save()
+
+    @staticmethod
+    def _list_stats(credential: dict, previous_credential: dict = None) -> dict:
+        """Bit counts for the credential's encodedList, computed once at write time.
+        Counts are None when the list cannot be decoded.
+        """
+        def encoded_list(cred):
+            subj = cred.get('credentialSubject', {}) if isinstance(cred, dict) else {}
+            return subj.get('encodedList') if isinstance(subj, dict) else None
+
+        previous = encoded_list(previous_credential) if previous_credential else None
+        try:
+            return bitstring_stats(encoded_list(credential), previous)
+        except ValueError as e:
+            if previous is not None:
+                try:
+                    return bitstring_stats(encoded_list(credential))
+                except ValueError:
+                    pass
+            logger.warning("Could not compute status list statistics: %s", e)
+            return {'bit_length': None, 'set_bit_count': None, 'changed_bit_count': None}
+
+    def _next_version_fields(self, new_credential: dict, encoded_list_hash: str = None, stats: dict = None) -> dict:
+        """Field values for the version following this row's current one."""
+        if encoded_list_hash is None:
+            encoded_list_hash = self._compute_encoded_list_hash(new_credential)
+        if stats is None:
+            stats = self._list_stats(new_credential, self.full_credential)
+        return {
+            'version': self.version + 1,
+            'full_credential': new_credential,
+            'purposes': self._extract_purposes(new_credential),
+            # Keep the previous issuance date when the new credential omits it
+            'issuance_date': self._parse_issuance_date(new_credential) or self.issuance_date,
+            'encoded_list_hash': encoded_list_hash,
+            **stats,
+            # A new signed version supersedes any pending draft
+            'pending_credential': None,
+            'pending_encoded_list_hash': '',
+            'pending_base_version': None,
+        }
+
+    def _apply_credential(self, new_credential: dict, encoded_list_hash: str = None):
+        """Advance in-memory fields to ``new_credential`` as the next version (no save)."""
+        for field, value in self._next_version_fields(new_credential, encoded_list_hash).items():
+            setattr(self, field, value)
+
+    def bump_version(self, new_credential: dict, encoded_list_hash: str = None, stats: dict = None, **extra_fields):
+        """Persist current row to history then update this row to new version.
+
+        The update is a compare-and-swap on the (version, encoded_list_hash)
+        this instance was loaded with, so two writers can never claim the same
+        version. Raises StatusListVersionConflict, leaving the instance
+        untouched, when another writer got there first; callers re-read and
+        retry. Pass ``encoded_list_hash`` and ``stats`` when they are already
+        known to avoid hashing or decoding the list again.
+        """
+        snapshot = self._history_snapshot()
+        fields = self._next_version_fields(new_credential, encoded_list_hash, stats)
+        fields.update(extra_fields)
+        fields['updated_at'] = timezone.now()
+        with transaction.atomic():
+            swapped = StatusListCredential.objects.filter(
+                pk=self.pk, version=self.version, encoded_list_hash=self.encoded_list_hash,
+            ).update(**fields)
+            if not swapped:
+                raise StatusListVersionConflict(
+                    f"{self.status_list_id} changed since version {self.version} was read"
+                )
+            snapshot.save()
+            OrganizationChange.objects.record(self.organization_id, 'status_list_credentials', [self.status_list_id])
+        for field, value in fields.items():
+            setattr(self, field, value)
 
 
 class StatusListCredentialHistory(models.Model):
@@ -251,6 +561,9 @@ class StatusListCredentialHistory(models.Model):
     issuance_date = models.DateTimeField(null=True, blank=True)
     encoded_list_hash = models.CharField(max_length=128, blank=True)
     full_credential = models.JSONField()
+    bit_length = models.PositiveBigIntegerField(null=True, blank=True)
+    set_bit_count = models.PositiveBigIntegerField(null=True, blank=True)
+    changed_bit_count = models.PositiveBigIntegerField(null=True, blank=True)
     archived_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -266,3 +579,92 @@ class StatusListCredentialHistory(models.Model):
         return f"{self.status_list_id} v{self.version} (archived)"
 
 
+
+
+class OrganizationChangeManager(models.Manager):
+    def record(self, organization_id, section, item_keys):
+        """Append one change per item to the organization's log.
+
+        The organization row is locked while its counter advances, so sequence
+        numbers are gap-free and commit in order for each organization. Call
+        inside the transaction making the write, so the log commits with it.
+        """
+        item_keys = list(dict.fromkeys(item_keys))
+        if not item_keys or organization_id is None:
+            return
+        with transaction.atomic():
+            seq = (
+                Organization.objects.select_for_update()
+                .filter(pk=organization_id).values_list('change_seq', flat=True).first()
+            )
+            if seq is None:
+                return
+            Organization.objects.filter(pk=organization_id).update(change_seq=seq + len(item_keys))
+            self.bulk_create([
+                self.model(organization_id=organization_id, seq=seq + n, section=section, item_key=key)
+                for n, key in enumerate(item_keys, 1)
+            ])
+            OfflineBundle.mark_stale(organization_id)
+        transaction.on_commit(change_broadcaster.wake)
+        if section == 'status_list_credentials':
+            from .status_list_publisher import publish_after_commit
+            publish_after_commit(organization_id)
+
+
+class OrganizationChange(models.Model):
+    """Append-only log of changes to an organization's offline trust data.
+
+    Each entry names an item (context url, key_id or status_list_id) of one
+    offline bundle section; readers look up the item's current state, and an
+    item that is gone is reported as deleted.
+    """
+    SECTION_CHOICES = [
+        ("contexts", "Contexts"),
+        ("public_keys", "Public keys"),
+        ("status_list_credentials", "Status list credentials"),
+    ]
+    id = models.BigAutoField(primary_key=True)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="changes")
+    seq = models.PositiveBigIntegerField()
+    section = models.CharField(max_length=30, choices=SECTION_CHOICES)
+    item_key = models.CharField(max_length=1000)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = OrganizationChangeManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["organization", "seq"], name="uniq_change_org_seq"),
+        ]
+        ordering = ["organization", "seq"]
+
+    def __str__(self):
+        return f"{self.organization_id} #{self.seq} {self.section} {self.item_key}"
+
+
+class OfflineBundle(models.Model):
+    """Materialized offline bundle of an organization, stored encoded and pre-compressed.
+
+    Rebuilt lazily: writes only flag the row ``stale`` and the next read
+    regenerates it. ``br_body`` is only filled when the brotli module is installed.
+    """
+    organization = models.OneToOneField(
+        Organization, on_delete=models.CASCADE, primary_key=True, related_name="offline_bundle"
+    )
+    bundle_hash = models.CharField(max_length=64)
+    change_seq = models.PositiveBigIntegerField(default=0)
+    body = models.BinaryField(help_text="UTF-8 JSON")
+    gzip_body = models.BinaryField()
+    br_body = models.BinaryField(null=True, blank=True)
+    size = models.PositiveIntegerField(default=0)
+    gzip_size = models.PositiveIntegerField(default=0)
+    br_size = models.PositiveIntegerField(null=True, blank=True)
+    stale = models.BooleanField(default=False)
+    built_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.organization_id} bundle {self.bundle_hash[:12]}{' (stale)' if self.stale else ''}"
+
+    @classmethod
+    def mark_stale(cls, organization_id):
+        cls.objects.filter(organization_id=organization_id, stale=False).update(stale=True)
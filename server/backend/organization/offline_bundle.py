@@ -0,0 +1,211 @@
+# server/organization/offline_bundle.py
+"""Everything a worker caches for offline verification, in one payload.
+
+The bundle has three sections: the organization's JSON-LD contexts
+(dependencies included), its currently valid public keys, and its status
+list credentials. Each section is ordered deterministically and hashed over
+its canonical JSON. Clients can therefore compare ``hashes`` with what they
+hold and skip sections that did not change. ``bundle_hash`` covers all three
+and doubles as the ETag. ``change_seq`` is where an incremental sync through
+the organization change feed picks up.
+
+The full bundle is materialized per organization in OfflineBundle, already
+JSON-encoded and compressed (gzip, plus brotli when the module is
+installed). Writes flag it stale through the change log and the next read
+rebuilds it, so serving it is a row read and a byte copy.
+
+Rebuilds are single-flight. When many devices reconnect at once, the
+requests for one organization in a process wait on a single build, and
+processes serialize on the organization's row lock. A process that gets the
+lock after another one rebuilt the bundle reuses that bundle.
+"""
+import gzip
+import hashlib
+import json
+import threading
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import JsonLdContext, OfflineBundle, Organization, PublicKey, StatusListCredential, canonical_json
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+SECTIONS = ('contexts', 'public_keys', 'status_list_credentials')
+# Field identifying an item within its section (what the change log records)
+SECTION_KEYS = {
+    'contexts': 'url',
+    'public_keys': 'key_id',
+    'status_list_credentials': 'status_list_id',
+}
+
+PUBLIC_KEY_FIELDS = (
+    'key_id', 'key_type', 'algorithm', 'public_key_multibase', 'public_key_hex', 'public_key_jwk',
+    'controller', 'purpose', 'expires_at', 'revoked_at', 'is_active',
+)
+STATUS_LIST_FIELDS = ('status_list_id', 'issuer', 'purposes', 'version', 'encoded_list_hash', 'bit_length')
+
+
+def section_hash(items) -> str:
+    return hashlib.sha256(canonical_json(items)).hexdigest()
+
+
+def _contexts(organization, manifest):
+    columns = {'content_hash': F('content_id')}
+    if not manifest:
+        columns['document'] = F('content__document')
+    return JsonLdContext.objects.filter(organization=organization).order_by('url').values('url', 'origin', **columns)
+
+
+def _public_keys(organization, manifest):
+    qs = PublicKey.objects.usable().filter(organization=organization)
+    return qs.order_by('key_id').values(*PUBLIC_KEY_FIELDS)
+
+
+def _status_list_credentials(organization, manifest):
+    fields = STATUS_LIST_FIELDS if manifest else STATUS_LIST_FIELDS + ('full_credential',)
+    return StatusListCredential.objects.filter(organization=organization).order_by('status_list_id').values(*fields)
+
+
+_BUILDERS = {
+    'contexts': _contexts,
+    'public_keys': _public_keys,
+    'status_list_credentials': _status_list_credentials,
+}
+
+
+def section_items(organization, section, manifest=False, keys=None):
+    """Current items of one section, optionally only those whose key is in ``keys``."""
+    qs = _BUILDERS[section](organization, manifest)
+    if keys is not None:
+        qs = qs.filter(**{f'{SECTION_KEYS[section]}__in': list(keys)})
+    return list(qs)
+
+
+def build_offline_bundle(organization, manifest=()):
+    """Return the bundle dict for an organization (only its pk is used).
+
+    Sections named in ``manifest`` leave out their bodies (context documents,
+    full status list credentials). Their hashes then describe the manifest,
+    not the full section.
+    """
+    # Read the sequence first: a change racing with the build is then replayed, never missed
+    row = Organization.objects.filter(pk=organization.pk).values_list('change_seq', 'missing_context_urls').first()
+    if row is None:
+        raise Organization.DoesNotExist
+    change_seq, missing_context_urls = row
+    bundle = {'organization_id': str(organization.pk), 'change_seq': change_seq}
+    hashes = {}
+    for section in SECTIONS:
+        items = section_items(organization, section, section in manifest)
+        bundle[section] = items
+        hashes[section] = section_hash(items)
+    bundle['missing_context_urls'] = missing_context_urls
+    bundle['hashes'] = hashes
+    bundle['bundle_hash'] = hashlib.sha256(
+        ''.join(hashes[section] for section in SECTIONS).encode('ascii')
+    ).hexdigest()
+    return bundle
+
+
+# Stored body column for each Content-Encoding
+ENCODED_BODIES = {'br': 'br_body', 'gzip': 'gzip_body', None: 'body'}
+
+
+def encode_bundle(bundle) -> bytes:
+    return json.dumps(bundle, cls=JSONEncoder, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def materialize_offline_bundle(organization):
+    """Build, encode and store the organization's full bundle; returns the OfflineBundle row."""
+    bundle = build_offline_bundle(organization)
+    body = encode_bundle(bundle)
+    gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+    br_body = brotli.compress(body, quality=11) if brotli is not None else None
+    obj, _ = OfflineBundle.objects.update_or_create(organization=organization, defaults={
+        'bundle_hash': bundle['bundle_hash'],
+        'change_seq': bundle['change_seq'],
+        'body': body,
+        'gzip_body': gzip_body,
+        'br_body': br_body,
+        'size': len(body),
+        'gzip_size': len(gzip_body),
+        'br_size': len(br_body) if br_body is not None else None,
+        'stale': False,
+        'built_at': timezone.now(),
+    })
+    # A write that landed while we were building may have been cleared by the save above
+    if Organization.objects.filter(pk=organization.pk, change_seq__gt=bundle['change_seq']).exists():
+        OfflineBundle.mark_stale(organization.pk)
+    return obj
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _rebuild_locked(organization):
+    with transaction.atomic():
+        Organization.objects.select_for_update().filter(pk=organization.pk).exists()
+        obj = OfflineBundle.objects.filter(organization=organization, stale=False).first()
+        if obj is not None:  # another process rebuilt it while we waited for the lock
+            return obj
+        return materialize_offline_bundle(organization)
+
+
+def rebuild_offline_bundle(organization):
+    """Rebuild a stale bundle once, however many callers ask for it concurrently.
+
+    The first caller for an organization builds; callers arriving in this
+    process meanwhile wait for and share its result (or its exception).
+    """
+    key = str(organization.pk)
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+    try:
+        flight.result = _rebuild_locked(organization)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+def load_offline_bundle(organization, encoding=None, with_body=True):
+    """Return the organization's fresh OfflineBundle, rebuilding it first if missing or stale.
+
+    Only the body column for ``encoding`` is loaded (none with ``with_body=False``);
+    a rebuilt bundle has every column.
+    """
+    columns = ['bundle_hash', 'change_seq', 'stale', 'built_at']
+    if with_body:
+        columns.append(ENCODED_BODIES[encoding])
+    obj = OfflineBundle.objects.filter(organization=organization).only(*columns).first()
+    if obj is None or obj.stale:
+        obj = rebuild_offline_bundle(organization)
+    return obj
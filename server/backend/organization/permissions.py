@@ -1,5 +1,7 @@
 from rest_framework.permissions import BasePermission
-from worker.models import OrganizationMember
+
+from .memberships import ADMIN_OR_OWNER_ROLES, admin_organization_id, is_organization_admin
+
 
 class IsOrganizationAdmin(BasePermission):
     """
@@ -17,9 +19,7 @@ class IsOrganizationAdmin(BasePermission):
             org_id = request.query_params.get('organization_id')
         if not org_id:
             return False
-        return OrganizationMember.objects.filter(
-            user=user, organization_id=org_id, role='ADMIN'
-        ).exists()
+        return is_organization_admin(request, org_id)
 
 
 class IsOrganizationAdminFromMembership(BasePermission):
@@ -34,7 +34,4 @@ class IsOrganizationAdminFromMembership(BasePermission):
             return False
         
         # Check if user is ADMIN or OWNER in any organization
-        return OrganizationMember.objects.filter(
-            user=user, 
-            role__in=['ADMIN', 'OWNER']
-        ).exists()
\ No newline at end of file
+        return admin_organization_id(request, roles=ADMIN_OR_OWNER_ROLES) is not None
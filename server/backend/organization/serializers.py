@@ -2,13 +2,23 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
-from rest_framework_simplejwt.tokens import RefreshToken
-from .models import Organization, OrganizationDID, PublicKey, PendingOrganizationRegistration, JsonLdContext, StatusListCredential
+from api.tokens import OrganizationRefreshToken
+from .models import (
+    Organization, OrganizationChange, OrganizationDID, PublicKey, PendingOrganizationRegistration, JsonLdContext,
+    StatusListCredential, StatusListCredentialHistory, StatusListVersionConflict,
+)
 from worker.models import OrganizationMember
+from .bitstring import decode_bitstring, encode_bitstring
+from .did_resolver import DIDResolutionError, extract_jwks_keys, extract_verification_methods
+from .key_material import InvalidKeyMaterial, normalize_key
 from datetime import datetime, timedelta, timezone as dt_timezone
 import random, string
-from django.core.mail import send_mail
+from api.outbox import enqueue_email
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+import copy
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
@@ -50,7 +60,7 @@ class PublicKeySerializer(serializers.ModelSerializer):
     class Meta:
         model = PublicKey
         fields = [
-            'id', 'key_id', 'key_type', 'public_key_multibase', 'public_key_hex', 'public_key_jwk',
+            'id', 'key_id', 'key_type', 'algorithm', 'public_key_multibase', 'public_key_hex', 'public_key_jwk',
             'controller', 'purpose', 'created_at', 'expires_at', 'revoked_at', 'revocation_reason', 'is_active'
         ]
 
@@ -61,6 +71,70 @@ class PublicKeyListResponseSerializer(serializers.Serializer):
     keys = PublicKeySerializer(many=True)
 
 
+class PublicKeyImportSerializer(serializers.Serializer):
+    """Import every key of a DID document or JWKS into an organization at once.
+
+    Exactly one of ``did_document`` or ``jwks`` is required; a JWKS also needs
+    the ``controller`` DID its keys belong to. ``save()`` returns one
+    created/updated/unchanged result per key.
+    """
+    MAX_KEYS = 500
+
+    organization_id = serializers.UUIDField()
+    did_document = serializers.JSONField(required=False)
+    jwks = serializers.JSONField(required=False)
+    controller = serializers.CharField(max_length=500, required=False)
+
+    def validate(self, attrs):
+        try:
+            org = Organization.objects.get(id=attrs['organization_id'])
+        except Organization.DoesNotExist:
+            raise serializers.ValidationError({'organization_id': 'Organization not found'})
+
+        has_doc, has_jwks = 'did_document' in attrs, 'jwks' in attrs
+        if has_doc == has_jwks:
+            raise serializers.ValidationError('Provide exactly one of did_document or jwks')
+        try:
+            if has_doc:
+                keys = extract_verification_methods(attrs['did_document'], attrs.get('controller'))
+            else:
+                if not attrs.get('controller'):
+                    raise serializers.ValidationError({'controller': 'controller is required with jwks'})
+                keys = extract_jwks_keys(attrs['jwks'], attrs['controller'])
+        except DIDResolutionError as e:
+            raise serializers.ValidationError({'did_document' if has_doc else 'jwks': str(e)})
+
+        if len(keys) > self.MAX_KEYS:
+            raise serializers.ValidationError(f'At most {self.MAX_KEYS} keys per import')
+        key_ids = [k['key_id'] for k in keys]
+        if len(set(key_ids)) != len(key_ids):
+            raise serializers.ValidationError('Duplicate key ids in import')
+
+        normalized, errors = [], {}
+        for key in keys:
+            try:
+                normalized.append(normalize_key(key))
+            except InvalidKeyMaterial as e:
+                errors[key['key_id']] = str(e)
+        if errors:
+            raise serializers.ValidationError({'keys': errors})
+
+        attrs['organization'] = org
+        attrs['keys'] = normalized
+        return attrs
+
+    def create(self, validated):
+        outcome = PublicKey.objects.bulk_upsert(validated['organization'], validated['keys'])
+        result_by_key = {key_id: result for result, key_ids in outcome.items() for key_id in key_ids}
+        return [
+            {
+                'key_id': k['key_id'], 'key_type': k['key_type'], 'algorithm': k['algorithm'],
+                'result': result_by_key[k['key_id']],
+            }
+            for k in validated['keys']
+        ]
+
+
 class OrganizationRegistrationSerializer(serializers.Serializer):
     """Initial registration request that sends an OTP and stores a pending record."""
     org_name = serializers.CharField(max_length=255)
@@ -69,7 +143,7 @@ class OrganizationRegistrationSerializer(serializers.Serializer):
     admin_email = serializers.EmailField()
 
     def validate(self, attrs):
-        if Organization.objects.filter(name__iexact=attrs['org_name']).exists():
+        if Organization.objects.named(attrs['org_name']).exists():
             raise serializers.ValidationError({'org_name': 'Organization name already exists'})
         if User.objects.filter(username=attrs['admin_username']).exists():
             raise serializers.ValidationError({'admin_username': 'Username already exists'})
@@ -99,7 +173,6 @@ class OrganizationRegistrationSerializer(serializers.Serializer):
             otp_code=otp,
             expires_at=expires_at,
         )
-        # Send email (console backend logs it). In production configure real backend.
         subject = 'Complete Your INJI Offline Verifier Organization Registration'
         message = f"""Welcome to INJI Offline Verifier Platform!
 
@@ -123,14 +196,8 @@ For support, please contact our team.
 
 Best regards,
 INJI Offline Verifier Team"""
-        delivered = False
-        try:
-            sent = send_mail(subject, message, getattr(settings, 'DEFAULT_FROM_EMAIL', 'no-reply@example.com'), [pending.admin_email])
-            delivered = sent == 1
-            if not delivered:
-                logger.debuging("OTP email send_mail returned %s (expected 1) for %s", sent, pending.admin_email)
-        except Exception as e:
-            logger.exception("Failed to send OTP email to %s: %s", pending.admin_email, e)
+        # Queued for the send_outbound_email worker; the request does not wait on the email provider
+        enqueue_email('organization_otp', subject, message, [pending.admin_email])
         return {
             'pending_id': str(pending.id),
             'org_name': pending.org_name,
@@ -139,7 +206,7 @@ INJI Offline Verifier Team"""
             'expires_at': expires_at,
             # For local/dev you might expose OTP; remove in prod.
             'debug_otp': otp if settings.DEBUG else None,
-            'email_delivered': delivered,
+            'email_queued': True,
         }
 
 
@@ -169,7 +236,7 @@ class OrganizationRegistrationConfirmSerializer(serializers.Serializer):
         
         pending: PendingOrganizationRegistration = validated_data['pending']
         # Double-check uniqueness again right before creation
-        if Organization.objects.filter(name__iexact=pending.org_name).exists():
+        if Organization.objects.named(pending.org_name).exists():
             raise serializers.ValidationError('Organization already exists')
         if User.objects.filter(username=pending.admin_username).exists():
             raise serializers.ValidationError('Username already exists')
@@ -183,7 +250,7 @@ class OrganizationRegistrationConfirmSerializer(serializers.Serializer):
         )
         OrganizationMember.objects.create(user=user, organization=org, role='ADMIN')
         # Issue JWT pair for immediate login
-        jwt = RefreshToken.for_user(user)
+        jwt = OrganizationRefreshToken.for_user(user)
         pending.mark_consumed()
         return {
             'organization': org,
@@ -205,7 +272,7 @@ class OrganizationLoginSerializer(serializers.Serializer):
             raise serializers.ValidationError('Invalid credentials')
 
         try:
-            org = Organization.objects.get(name__iexact=attrs['org_name'])
+            org = Organization.objects.named(attrs['org_name']).get()
         except Organization.DoesNotExist:
             raise serializers.ValidationError('Organization not found')
 
@@ -218,7 +285,7 @@ class OrganizationLoginSerializer(serializers.Serializer):
             raise serializers.ValidationError('Organization login requires admin privileges')
 
         # Issue JWT pair
-        jwt = RefreshToken.for_user(user)
+        jwt = OrganizationRefreshToken.for_user(user)
         
         return {
             'access': str(jwt.access_token),
@@ -232,9 +299,13 @@ class OrganizationLoginSerializer(serializers.Serializer):
 
 
 class JsonLdContextSerializer(serializers.ModelSerializer):
+    content_hash = serializers.CharField(source='content_id', read_only=True)
+    size = serializers.IntegerField(source='content.size', read_only=True)
+    document = serializers.JSONField(source='content.document', read_only=True)
+
     class Meta:
         model = JsonLdContext
-        fields = ['id', 'organization', 'url', 'document', 'created_at', 'updated_at']
+        fields = ['id', 'organization', 'url', 'origin', 'content_hash', 'size', 'document', 'created_at', 'updated_at']
 
 
 class StatusListCredentialSerializer(serializers.ModelSerializer):
@@ -242,13 +313,66 @@ class StatusListCredentialSerializer(serializers.ModelSerializer):
         model = StatusListCredential
         fields = [
             'id', 'status_list_id', 'issuer', 'purposes', 'version', 'issuance_date',
-            'encoded_list_hash', 'full_credential', 'created_at', 'updated_at'
+            'encoded_list_hash', 'bit_length', 'set_bit_count', 'changed_bit_count',
+            'full_credential', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'created_at', 'updated_at', 'version', 'encoded_list_hash',
+            'bit_length', 'set_bit_count', 'changed_bit_count',
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'version', 'encoded_list_hash']
+
+
+def parse_status_list_credential(credential_data):
+    """Validate a BitstringStatusListCredential and extract its indexed fields.
+    Raises serializers.ValidationError with a plain message on malformed input.
+    """
+    if not isinstance(credential_data, dict):
+        raise serializers.ValidationError('Must be a JSON object')
+
+    ctype = credential_data.get('type', [])
+    if not isinstance(ctype, list):
+        ctype = [ctype]
+    if 'BitstringStatusListCredential' not in ctype:
+        raise serializers.ValidationError('Credential must include BitstringStatusListCredential in type')
+
+    status_list_id = credential_data.get('id')
+    if not status_list_id:
+        raise serializers.ValidationError('Missing id')
+
+    issuer = credential_data.get('issuer')
+    if not issuer:
+        raise serializers.ValidationError('Missing issuer')
+    if isinstance(issuer, dict):
+        issuer = issuer.get('id', '')
+
+    subj = credential_data.get('credentialSubject', {})
+    if not isinstance(subj, dict):
+        raise serializers.ValidationError('credentialSubject must be object')
+    encoded_list = subj.get('encodedList')
+    if not encoded_list:
+        raise serializers.ValidationError('credentialSubject.encodedList required')
+
+    # purposes normalization
+    raw_purpose = subj.get('statusPurpose')
+    purposes = raw_purpose if isinstance(raw_purpose, list) else [raw_purpose] if raw_purpose else []
+
+    # issuance date optional
+    issuance_date = credential_data.get('issuanceDate') or credential_data.get('issuance_date')
+
+    return {
+        'status_list_id': status_list_id,
+        'issuer': issuer,
+        'purposes': purposes,
+        'encoded_list_hash': hashlib.sha256(encoded_list.encode('utf-8')).hexdigest(),
+        'issuance_date': issuance_date,
+        'full_credential': credential_data,
+    }
 
 
 class StatusListCredentialUpsertSerializer(serializers.Serializer):
     """Upsert serializer with version bump & hash detection."""
+    MAX_WRITE_ATTEMPTS = 10
+
     organization_id = serializers.UUIDField()
     status_list_credential = serializers.JSONField()
 
@@ -258,84 +382,300 @@ class StatusListCredentialUpsertSerializer(serializers.Serializer):
         except Organization.DoesNotExist:
             raise serializers.ValidationError({'organization_id': 'Organization not found'})
 
-        credential_data = attrs['status_list_credential']
-        if not isinstance(credential_data, dict):
-            raise serializers.ValidationError({'status_list_credential': 'Must be a JSON object'})
-
-        ctype = credential_data.get('type', [])
-        if not isinstance(ctype, list):
-            ctype = [ctype]
-        if 'BitstringStatusListCredential' not in ctype:
-            raise serializers.ValidationError({'status_list_credential': 'Credential must include BitstringStatusListCredential in type'})
-
-        status_list_id = credential_data.get('id')
-        if not status_list_id:
-            raise serializers.ValidationError({'status_list_credential': 'Missing id'})
-
-        issuer = credential_data.get('issuer')
-        if not issuer:
-            raise serializers.ValidationError({'status_list_credential': 'Missing issuer'})
-        if isinstance(issuer, dict):
-            issuer = issuer.get('id', '')
-
-        subj = credential_data.get('credentialSubject', {})
-        if not isinstance(subj, dict):
-            raise serializers.ValidationError({'status_list_credential': 'credentialSubject must be object'})
-        encoded_list = subj.get('encodedList')
-        if not encoded_list:
-            raise serializers.ValidationError({'status_list_credential': 'credentialSubject.encodedList required'})
-
-        # purposes normalization
-        raw_purpose = subj.get('statusPurpose')
-        purposes = raw_purpose if isinstance(raw_purpose, list) else [raw_purpose] if raw_purpose else []
-
-        # issuance date optional
-        issuance_date = credential_data.get('issuanceDate') or credential_data.get('issuance_date')
-
-        # compute hash
-        import hashlib
-        encoded_hash = hashlib.sha256(encoded_list.encode('utf-8')).hexdigest()
-
-        attrs.update({
-            'organization': org,
-            'status_list_id': status_list_id,
-            'issuer': issuer,
-            'purposes': purposes,
-            'encoded_list_hash': encoded_hash,
-            'issuance_date': issuance_date,
-            'full_credential': credential_data,
-        })
+        try:
+            parsed = parse_status_list_credential(attrs['status_list_credential'])
+        except serializers.ValidationError as e:
+            raise serializers.ValidationError({'status_list_credential': e.detail})
+
+        attrs.update(parsed)
+        attrs['organization'] = org
         return attrs
 
     def create(self, validated):
         org = validated['organization']
         status_list_id = validated['status_list_id']
-        existing = StatusListCredential.objects.filter(organization=org, status_list_id=status_list_id).first()
-        if existing:
+        for _ in range(self.MAX_WRITE_ATTEMPTS):
+            # full_credential is only needed (for the history snapshot) when the list changed
+            existing = StatusListCredential.objects.filter(
+                organization=org, status_list_id=status_list_id
+            ).defer('full_credential', 'pending_credential').first()
+            if existing is None:
+                try:
+                    with transaction.atomic():
+                        return StatusListCredential.objects.create(
+                            organization=org,
+                            status_list_id=status_list_id,
+                            issuer=validated['issuer'],
+                            purposes=validated['purposes'],
+                            version=1,
+                            issuance_date=StatusListCredential._parse_issuance_date(validated['full_credential']),
+                            encoded_list_hash=validated['encoded_list_hash'],
+                            full_credential=validated['full_credential'],
+                            **StatusListCredential._list_stats(validated['full_credential']),
+                        )
+                except IntegrityError:
+                    continue  # lost the creation race; retry as an update
             # no change?
             if existing.encoded_list_hash == validated['encoded_list_hash']:
                 return existing  # version unchanged
-            # bump version
-            existing.bump_version(validated['full_credential'])
-            existing.issuer = validated['issuer']
-            existing.encoded_list_hash = validated['encoded_list_hash']
-            existing.save(update_fields=['issuer', 'encoded_list_hash', 'updated_at'])
-            return existing
-        # create new
-        from django.utils.dateparse import parse_datetime
-        issuance_dt = None
-        if validated.get('issuance_date'):
-            issuance_dt = parse_datetime(validated['issuance_date'])
-        return StatusListCredential.objects.create(
-            organization=org,
-            status_list_id=status_list_id,
-            issuer=validated['issuer'],
-            purposes=validated['purposes'],
-            version=1,
-            issuance_date=issuance_dt,
-            encoded_list_hash=validated['encoded_list_hash'],
-            full_credential=validated['full_credential']
-        )
+            try:
+                existing.bump_version(
+                    validated['full_credential'],
+                    encoded_list_hash=validated['encoded_list_hash'],
+                    issuer=validated['issuer'],
+                )
+                return existing
+            except StatusListVersionConflict:
+                continue  # another writer bumped first; compare against the new head
+        raise serializers.ValidationError('Status list is being updated concurrently; please retry')
+
+
+class StatusListCredentialBatchUpsertSerializer(serializers.Serializer):
+    """Upsert many status lists of one organization in a single transaction.
+
+    Existing rows are hash-compared in one query; changed lists are archived
+    to history and advanced with bulk writes. ``save()`` returns one result
+    per submitted list: created, unchanged or bumped.
+    """
+    MAX_BATCH_SIZE = 100
+    MAX_WRITE_ATTEMPTS = 5
+
+    organization_id = serializers.UUIDField()
+    status_list_credentials = serializers.ListField(
+        child=serializers.JSONField(), allow_empty=False, max_length=MAX_BATCH_SIZE
+    )
+
+    def validate(self, attrs):
+        try:
+            org = Organization.objects.get(id=attrs['organization_id'])
+        except Organization.DoesNotExist:
+            raise serializers.ValidationError({'organization_id': 'Organization not found'})
+
+        entries, errors, seen = [], {}, set()
+        for idx, credential_data in enumerate(attrs['status_list_credentials']):
+            try:
+                parsed = parse_status_list_credential(credential_data)
+            except serializers.ValidationError as e:
+                errors[idx] = e.detail
+                continue
+            if parsed['status_list_id'] in seen:
+                errors[idx] = [f"Duplicate status list id {parsed['status_list_id']} in batch"]
+                continue
+            seen.add(parsed['status_list_id'])
+            entries.append(parsed)
+        if errors:
+            raise serializers.ValidationError({'status_list_credentials': errors})
+
+        attrs['organization'] = org
+        attrs['entries'] = entries
+        return attrs
+
+    def create(self, validated):
+        for _ in range(self.MAX_WRITE_ATTEMPTS):
+            try:
+                return self._write(validated['organization'], validated['entries'])
+            except IntegrityError:
+                continue  # a concurrent writer created one of the new lists first; re-read and retry
+        raise serializers.ValidationError('Status lists are being updated concurrently; please retry')
+
+    def _write(self, org, entries):
+        now = timezone.now()
+        with transaction.atomic():
+            # One query for change detection; the large payload is only loaded for rows that change.
+            existing = {
+                obj.status_list_id: obj
+                for obj in StatusListCredential.objects.select_for_update()
+                .filter(organization=org, status_list_id__in=[e['status_list_id'] for e in entries])
+                .defer('full_credential', 'pending_credential')
+            }
+            changed = [
+                e for e in entries
+                if e['status_list_id'] in existing
+                and existing[e['status_list_id']].encoded_list_hash != e['encoded_list_hash']
+            ]
+            previous_credentials = dict(
+                StatusListCredential.objects.filter(
+                    pk__in=[existing[e['status_list_id']].pk for e in changed]
+                ).values_list('pk', 'full_credential')
+            ) if changed else {}
+
+            history_rows, to_update, to_create, results = [], [], [], []
+            for entry in entries:
+                obj = existing.get(entry['status_list_id'])
+                if obj is None:
+                    obj = StatusListCredential(
+                        organization=org,
+                        status_list_id=entry['status_list_id'],
+                        issuer=entry['issuer'],
+                        purposes=entry['purposes'],
+                        version=1,
+                        issuance_date=StatusListCredential._parse_issuance_date(entry['full_credential']),
+                        encoded_list_hash=entry['encoded_list_hash'],
+                        full_credential=entry['full_credential'],
+                        **StatusListCredential._list_stats(entry['full_credential']),
+                    )
+                    to_create.append(obj)
+                    result = 'created'
+                elif obj.encoded_list_hash == entry['encoded_list_hash']:
+                    result = 'unchanged'
+                else:
+                    obj.full_credential = previous_credentials[obj.pk]
+                    history_rows.append(obj._history_snapshot())
+                    obj._apply_credential(entry['full_credential'], entry['encoded_list_hash'])
+                    obj.issuer = entry['issuer']
+                    obj.updated_at = now
+                    to_update.append(obj)
+                    result = 'bumped'
+                results.append({
+                    'status_list_id': obj.status_list_id,
+                    'result': result,
+                    'version': obj.version,
+                    'encoded_list_hash': obj.encoded_list_hash,
+                })
+
+            if history_rows:
+                StatusListCredentialHistory.objects.bulk_create(history_rows)
+            if to_update:
+                StatusListCredential.objects.bulk_update(to_update, [
+                    'version', 'full_credential', 'purposes', 'issuer', 'issuance_date',
+                    'encoded_list_hash', 'bit_length', 'set_bit_count', 'changed_bit_count', 'updated_at',
+                    'pending_credential', 'pending_encoded_list_hash', 'pending_base_version',
+                ])
+            if to_create:
+                StatusListCredential.objects.bulk_create(to_create)
+            OrganizationChange.objects.record(
+                org.pk, 'status_list_credentials', [obj.status_list_id for obj in to_create + to_update],
+            )
+        return results
+
+
+class StatusListIndexOperationsSerializer(serializers.Serializer):
+    """Set/clear status bits of a server-held list and keep the result as a pending draft.
+
+    The list is decoded once, all operations are applied to a bytearray and
+    the result is re-encoded once. Indices use the SDK's bit order (bit ``i``
+    is byte ``i // 8``, most significant bit first). The issuer's proof does
+    not cover the new list and verifiers check it, so the signed credential
+    stays current: the unsigned draft is stored in ``pending_credential`` for
+    the issuer to re-sign, and becomes the next version when the signed list
+    is uploaded. Further operations accumulate on the draft while it is based
+    on the current version. ``save()`` returns ``(obj, stats)``, with
+    ``stats`` None when the operations change nothing.
+    """
+    MAX_OPERATIONS = 100000
+    MAX_WRITE_ATTEMPTS = 10
+
+    organization_id = serializers.UUIDField()
+    status_list_id = serializers.CharField(max_length=1000)
+    purpose = serializers.CharField(max_length=100)
+    set = serializers.ListField(
+        child=serializers.IntegerField(min_value=0), required=False, default=list, max_length=MAX_OPERATIONS
+    )
+    clear = serializers.ListField(
+        child=serializers.IntegerField(min_value=0), required=False, default=list, max_length=MAX_OPERATIONS
+    )
+
+    def validate(self, attrs):
+        try:
+            org = Organization.objects.get(id=attrs['organization_id'])
+        except Organization.DoesNotExist:
+            raise serializers.ValidationError({'organization_id': 'Organization not found'})
+
+        if not attrs['set'] and not attrs['clear']:
+            raise serializers.ValidationError('Provide at least one index to set or clear')
+        if len(attrs['set']) + len(attrs['clear']) > self.MAX_OPERATIONS:
+            raise serializers.ValidationError(f'At most {self.MAX_OPERATIONS} operations per request')
+        to_set, to_clear = set(attrs['set']), set(attrs['clear'])
+        both = to_set & to_clear
+        if both:
+            raise serializers.ValidationError(
+                {'clear': f'Indices cannot be both set and cleared: {sorted(both)[:10]}'}
+            )
+
+        attrs['organization'] = org
+        attrs['to_set'] = to_set
+        attrs['to_clear'] = to_clear
+        return attrs
+
+    def _next_credential(self, credential, to_set, to_clear):
+        """Return (credential, encoded_list_hash, stats) for the list after the operations, or None if nothing changes."""
+        credential = credential or {}
+        subj = credential.get('credentialSubject')
+        if not isinstance(subj, dict) or not subj.get('encodedList'):
+            raise serializers.ValidationError({'status_list_id': 'Stored status list has no encodedList'})
+        if int(subj.get('statusSize', 1) or 1) != 1:
+            raise serializers.ValidationError({'status_list_id': 'Only single-bit status lists are supported'})
+        try:
+            bits = decode_bitstring(subj['encodedList'])
+        except ValueError as e:
+            raise serializers.ValidationError({'status_list_id': f'Stored status list cannot be decoded: {e}'})
+
+        bit_length = len(bits) * 8
+        out_of_range = sorted(i for i in to_set | to_clear if i >= bit_length)
+        if out_of_range:
+            raise serializers.ValidationError(f'Indices outside list of {bit_length} bits: {out_of_range[:10]}')
+
+        changed = 0
+        for index in to_set:
+            mask = 0x80 >> (index % 8)
+            if not bits[index // 8] & mask:
+                bits[index // 8] |= mask
+                changed += 1
+        for index in to_clear:
+            mask = 0x80 >> (index % 8)
+            if bits[index // 8] & mask:
+                bits[index // 8] &= ~mask & 0xFF
+                changed += 1
+        if not changed:
+            return None
+
+        encoded_list = encode_bitstring(bits)
+        new_credential = copy.deepcopy(credential)
+        new_credential.pop('proof', None)
+        new_credential['credentialSubject']['encodedList'] = encoded_list
+        stats = {
+            'bit_length': bit_length,
+            'set_bit_count': int.from_bytes(bits, 'big').bit_count(),
+            'changed_bit_count': changed,
+        }
+        return new_credential, hashlib.sha256(encoded_list.encode('utf-8')).hexdigest(), stats
+
+    def create(self, validated):
+        for _ in range(self.MAX_WRITE_ATTEMPTS):
+            try:
+                obj = StatusListCredential.objects.get(
+                    organization=validated['organization'], status_list_id=validated['status_list_id']
+                )
+            except StatusListCredential.DoesNotExist:
+                raise serializers.ValidationError({'status_list_id': 'Status list not found'})
+            if validated['purpose'] not in (obj.purposes or []):
+                raise serializers.ValidationError(
+                    {'purpose': f"Status list purposes are {', '.join(obj.purposes or []) or 'unset'}"}
+                )
+            has_draft = obj.pending_credential is not None and obj.pending_base_version == obj.version
+            base = obj.pending_credential if has_draft else obj.full_credential
+            result = self._next_credential(base, validated['to_set'], validated['to_clear'])
+            if result is None:
+                return obj, None
+            draft, encoded_list_hash, stats = result
+            if encoded_list_hash == obj.encoded_list_hash:
+                # The operations undo the draft; the signed list is already current
+                draft, encoded_list_hash = None, ''
+            fields = {
+                'pending_credential': draft,
+                'pending_encoded_list_hash': encoded_list_hash,
+                'pending_base_version': obj.version if draft is not None else None,
+            }
+            # Compare-and-swap on the version and draft this request was based on
+            swapped = StatusListCredential.objects.filter(
+                pk=obj.pk, version=obj.version, pending_encoded_list_hash=obj.pending_encoded_list_hash,
+            ).update(**fields)
+            if not swapped:
+                continue  # re-apply the operations on top of the newer version or draft
+            for field, value in fields.items():
+                setattr(obj, field, value)
+            return obj, stats
+        raise serializers.ValidationError('Status list is being updated concurrently; please retry')
 
 
 class StatusListCredentialListResponseSerializer(serializers.Serializer):
@@ -0,0 +1,49 @@
+# server/organization/signals.py
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from worker.models import OrganizationMember
+
+from . import memberships
+from .models import JsonLdContext, Organization, OrganizationChange, PublicKey, StatusListCredential
+
+
+def _cascading(origin):
+    # Rows removed because their organization is being deleted need no log entry
+    return isinstance(origin, Organization)
+
+
+@receiver(post_save, sender=PublicKey)
+@receiver(post_delete, sender=PublicKey)
+def public_key_changed(sender, instance, origin=None, **kwargs):
+    Organization.mark_keys_changed([instance.organization_id])
+    if not _cascading(origin):
+        OrganizationChange.objects.record(instance.organization_id, 'public_keys', [instance.key_id])
+
+
+@receiver(post_save, sender=JsonLdContext)
+@receiver(post_delete, sender=JsonLdContext)
+def context_changed(sender, instance, origin=None, **kwargs):
+    if not _cascading(origin):
+        OrganizationChange.objects.record(instance.organization_id, 'contexts', [instance.url])
+
+
+@receiver(post_save, sender=StatusListCredential)
+@receiver(post_delete, sender=StatusListCredential)
+def status_list_changed(sender, instance, origin=None, **kwargs):
+    if not _cascading(origin):
+        OrganizationChange.objects.record(instance.organization_id, 'status_list_credentials', [instance.status_list_id])
+
+
+@receiver(post_save, sender=OrganizationMember)
+@receiver(post_delete, sender=OrganizationMember)
+def membership_changed(sender, instance, **kwargs):
+    memberships.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    # A reused user id must not inherit a cached entry
+    if created:
+        memberships.invalidate(instance.pk)
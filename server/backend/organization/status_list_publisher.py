@@ -0,0 +1,152 @@
+# server/organization/status_list_publisher.py
+"""Publish status list credentials as static, content-hashed files.
+
+Status lists are public verification data, so every current list is written
+to ``STATUS_LIST_PUBLISH_ROOT/status-lists/<organization_id>/<sha256>.json``.
+Because the name is the hash of the bytes, each file is immutable and can be
+cached for a year by browsers and CDNs. The same directory holds a
+``manifest.json`` with every list's id, version and file URL. The manifest
+is the only file that changes, and it is served with revalidation.
+
+OrganizationChange.objects.record republishes an organization after every
+status list write commits. PublishedFilesMiddleware (or nginx/a CDN pointed
+at the same directory) serves the files, with no authentication and no
+database access.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Organization, StatusListCredential
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+# Superseded files stay this long after leaving the manifest, for clients still holding the previous one
+RETENTION_SECONDS = 3600
+
+
+def publish_root() -> Path:
+    return Path(settings.STATUS_LIST_PUBLISH_ROOT)
+
+
+def organization_dir(organization_id) -> Path:
+    return publish_root() / 'status-lists' / str(organization_id)
+
+
+def published_url(organization_id, name) -> str:
+    return f'{settings.STATUS_LIST_PUBLISH_URL}status-lists/{organization_id}/{name}'
+
+
+def _write_atomic(path: Path, data: bytes):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _read_manifest(directory: Path):
+    try:
+        with open(directory / MANIFEST_NAME, 'rb') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def publish_status_lists(organization_id, prune=True):
+    """Write any new list files and the manifest for one organization; returns the number of files written.
+
+    Only lists whose version differs from the current manifest are loaded and
+    written. Runs under the organization's row lock, so concurrent publishers
+    cannot leave an older manifest in place. The manifest's ``retired`` map
+    records when each superseded file left it; with ``prune`` those older than
+    RETENTION_SECONDS are deleted.
+    """
+    directory = organization_dir(organization_id)
+    with transaction.atomic():
+        if not Organization.objects.select_for_update().filter(pk=organization_id).exists():
+            return 0
+        rows = list(
+            StatusListCredential.objects.filter(organization_id=organization_id).order_by('status_list_id')
+            .values('status_list_id', 'issuer', 'purposes', 'version', 'encoded_list_hash', 'bit_length')
+        )
+        previous = _read_manifest(directory) or {}
+        published = {entry['status_list_id']: entry for entry in previous.get('status_lists', [])}
+        stale = [
+            row['status_list_id'] for row in rows
+            if (entry := published.get(row['status_list_id'])) is None
+            or entry.get('version') != row['version']
+            or not (directory / entry.get('file', '')).is_file()
+        ]
+        credentials = dict(
+            StatusListCredential.objects.filter(organization_id=organization_id, status_list_id__in=stale)
+            .values_list('status_list_id', 'full_credential')
+        ) if stale else {}
+
+        directory.mkdir(parents=True, exist_ok=True)
+        written = 0
+        entries = []
+        for row in rows:
+            status_list_id = row['status_list_id']
+            if status_list_id in credentials:
+                data = json.dumps(credentials[status_list_id], separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+                name = f'{hashlib.sha256(data).hexdigest()}.json'
+                if not (directory / name).is_file():
+                    _write_atomic(directory / name, data)
+                    written += 1
+            else:
+                name = published[status_list_id]['file']
+            entries.append({**row, 'file': name, 'url': published_url(organization_id, name)})
+
+        now = time.time()
+        retired = _retired(directory, {entry['file'] for entry in entries}, previous.get('retired') or {}, now)
+        expired = [name for name, retired_at in retired.items() if retired_at <= now - RETENTION_SECONDS] if prune else []
+        for name in expired:
+            del retired[name]
+
+        manifest = {'organization_id': str(organization_id), 'status_lists': entries, 'retired': retired}
+        if manifest != previous:
+            _write_atomic(directory / MANIFEST_NAME, json.dumps(manifest, separators=(',', ':')).encode('utf-8'))
+            written += 1
+        for name in expired:
+            (directory / name).unlink(missing_ok=True)
+    return written
+
+
+def _retired(directory: Path, keep, previous, now):
+    """Map each list file the manifest no longer references to when it left it.
+
+    Files dropped by this publish (or never listed at all) are stamped ``now``.
+    Pruning goes by this stamp rather than the file's mtime, because an
+    identical file may have been written long before it was superseded.
+    """
+    return {
+        path.name: previous.get(path.name, now) for path in directory.glob('*.json')
+        if path.name != MANIFEST_NAME and path.name not in keep
+    }
+
+
+def publish_after_commit(organization_id):
+    """Publish once the current transaction commits; failures are logged, never raised into the write."""
+    if not settings.STATUS_LIST_PUBLISH_ROOT:
+        return
+
+    def publish():
+        try:
+            publish_status_lists(organization_id)
+        except Exception:
+            logger.exception('Publishing status lists for organization %s failed', organization_id)
+
+    transaction.on_commit(publish)
@@ -1,3 +1,1545 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import hashlib
+import importlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from urllib.parse import quote, urlencode
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from api.tokens import tokens_for_user
+from worker.models import OrganizationMember
+
+from . import key_index as key_index_module, offline_bundle, status_list_publisher
+from .change_stream import broadcaster as change_broadcaster
+from .context_closure import build_context_closure
+from .context_fetcher import FAILED, FETCHED, ContextFetcher
+from .did_resolver import DIDResolutionError
+from .status_list_publisher import organization_dir
+
+from .models import (
+    JsonLdContext, JsonLdContextSource, JsonLdDocument, OfflineBundle, Organization, OrganizationChange, OrganizationDID,
+    PublicKey, StatusListCredential, StatusListCredentialHistory,
+)
+from .key_material import InvalidKeyMaterial, normalize_key_material
+from .serializers import StatusListCredentialBatchUpsertSerializer, StatusListCredentialUpsertSerializer
+
+
+def make_status_list_credential(status_list_id, bits=b'\x00' * 16, purpose='revocation'):
+    encoded = base64.urlsafe_b64encode(gzip.compress(bits)).decode('ascii').rstrip('=')
+    return {
+        'id': status_list_id,
+        'type': ['VerifiableCredential', 'BitstringStatusListCredential'],
+        'issuer': 'did:example:issuer',
+        'issuanceDate': '2024-01-01T00:00:00Z',
+        'credentialSubject': {
+            'id': f'{status_list_id}#list',
+            'type': 'BitstringStatusList',
+            'statusPurpose': purpose,
+            'encodedList': f'u{encoded}',
+        },
+    }
+
+
+class StatusListConcurrentUpsertTests(TransactionTestCase):
+    """Parallel upserts of one status list must neither collide nor lose versions."""
+    WRITERS = 8
+    MAX_LATENCY_SECONDS = 5.0
+
+    def setUp(self):
+        self.org = Organization.objects.create(name='Concurrent Org')
+        self.status_list_id = 'https://issuer.example/status/1'
+
+    def _upsert(self, index, barrier):
+        try:
+            credential = make_status_list_credential(self.status_list_id, bits=bytes([index + 1]) * 16)
+            serializer = StatusListCredentialUpsertSerializer(data={
+                'organization_id': str(self.org.id),
+                'status_list_credential': credential,
+            })
+            serializer.is_valid(raise_exception=True)
+            barrier.wait()
+            started = time.monotonic()
+            serializer.save()
+            return time.monotonic() - started
+        finally:
+            connection.close()
+
+    def test_parallel_upserts_keep_every_version(self):
+        barrier = threading.Barrier(self.WRITERS)
+        with ThreadPoolExecutor(max_workers=self.WRITERS) as pool:
+            latencies = list(pool.map(lambda i: self._upsert(i, barrier), range(self.WRITERS)))
+
+        current = StatusListCredential.objects.get(organization=self.org, status_list_id=self.status_list_id)
+        history_versions = sorted(
+            StatusListCredentialHistory.objects.filter(status_list_current=current).values_list('version', flat=True)
+        )
+        # One writer created version 1, every other writer bumped exactly once
+        self.assertEqual(current.version, self.WRITERS)
+        self.assertEqual(history_versions, list(range(1, self.WRITERS)))
+        self.assertLess(max(latencies), self.MAX_LATENCY_SECONDS)
+
+
+class StatusListBatchCreationRaceTests(TestCase):
+    """A batch that loses a creation race to another writer retries instead of failing."""
+
+    def test_batch_retries_after_concurrent_create(self):
+        org = Organization.objects.create(name='Batch Race Org')
+        ids = [f'https://issuer.example/status/batch-{n}' for n in range(3)]
+        serializer = StatusListCredentialBatchUpsertSerializer(data={
+            'organization_id': str(org.id),
+            'status_list_credentials': [make_status_list_credential(i, bits=b'\x01' * 16) for i in ids],
+        })
+        serializer.is_valid(raise_exception=True)
+
+        manager_class = type(StatusListCredential.objects)
+        real_bulk_create = manager_class.bulk_create
+        calls = []
+
+        def bulk_create(manager, objs, *args, **kwargs):
+            if manager.model is not StatusListCredential:
+                return real_bulk_create(manager, objs, *args, **kwargs)
+            calls.append(len(objs))
+            if len(calls) == 1:
+                # What the insert raises when another writer created one of these lists after our read
+                raise IntegrityError('UNIQUE constraint failed: uniq_statuslist_org_id')
+            return real_bulk_create(manager, objs, *args, **kwargs)
+
+        with mock.patch.object(manager_class, 'bulk_create', autospec=True, side_effect=bulk_create):
+            results = serializer.save()
+
+        self.assertEqual(calls, [3, 3])
+        self.assertEqual([r['result'] for r in results], ['created'] * 3)
+        self.assertEqual(StatusListCredential.objects.filter(organization=org).count(), 3)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class StatusListBatchUpsertTests(TestCase):
+    """A batch reports each list's outcome and is written entirely or not at all."""
+
+    def setUp(self):
+        self.org = Organization.objects.create(name='Batch Org')
+        admin = User.objects.create_user(username='batch-admin')
+        OrganizationMember.objects.create(user=admin, organization=self.org, role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.ids = [f'https://issuer.example/status/upsert-{n}' for n in range(3)]
+
+    def _batch(self, credentials):
+        return self.client.post('/organization/api/status-list-credentials/batch-upsert/', {
+            'organization_id': str(self.org.id), 'status_list_credentials': credentials,
+        }, format='json')
+
+    def test_created_bumped_and_unchanged_lists(self):
+        first = self._batch([make_status_list_credential(i) for i in self.ids[:2]])
+        self.assertEqual(first.status_code, 200, first.content)
+        self.assertEqual(first.json()['summary'], {'created': 2, 'unchanged': 0, 'bumped': 0})
+        seq = Organization.objects.get(pk=self.org.pk).change_seq
+
+        response = self._batch([
+            make_status_list_credential(self.ids[0]),
+            make_status_list_credential(self.ids[1], bits=b'\x80' + b'\x00' * 15),
+            make_status_list_credential(self.ids[2], purpose='suspension'),
+        ])
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual(data['summary'], {'created': 1, 'unchanged': 1, 'bumped': 1})
+        self.assertEqual([(r['status_list_id'], r['result'], r['version']) for r in data['results']], [
+            (self.ids[0], 'unchanged', 1), (self.ids[1], 'bumped', 2), (self.ids[2], 'created', 1),
+        ])
+
+        rows = {r.status_list_id: r for r in StatusListCredential.objects.filter(organization=self.org)}
+        self.assertEqual([r['encoded_list_hash'] for r in data['results']],
+                         [rows[i].encoded_list_hash for i in self.ids])
+        self.assertEqual((rows[self.ids[1]].version, rows[self.ids[1]].set_bit_count), (2, 1))
+        self.assertEqual(rows[self.ids[2]].purposes, ['suspension'])
+        history = StatusListCredentialHistory.objects.filter(organization=self.org)
+        self.assertEqual(list(history.values_list('status_list_id', 'version', 'set_bit_count')), [(self.ids[1], 1, 0)])
+        # Only the written lists reach the change log
+        self.assertEqual(
+            sorted(OrganizationChange.objects.filter(organization=self.org, seq__gt=seq).values_list('item_key', flat=True)),
+            [self.ids[1], self.ids[2]],
+        )
+
+    def test_invalid_items_reject_the_batch(self):
+        self._batch([make_status_list_credential(self.ids[0])])
+        broken = make_status_list_credential(self.ids[1])
+        del broken['credentialSubject']['encodedList']
+        response = self._batch([
+            make_status_list_credential(self.ids[0], bits=b'\xff' * 16),
+            broken,
+            make_status_list_credential(self.ids[2]),
+            make_status_list_credential(self.ids[2], bits=b'\x01' * 16),
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response.json()['status_list_credentials']), ['1', '3'])
+        self.assertIn('Duplicate', str(response.json()['status_list_credentials']['3']))
+
+        # The valid items were not written either
+        current = StatusListCredential.objects.get(organization=self.org)
+        self.assertEqual((current.status_list_id, current.version), (self.ids[0], 1))
+        self.assertFalse(StatusListCredentialHistory.objects.filter(organization=self.org).exists())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class OfflineBundleReconnectTests(TransactionTestCase):
+    """A reconnect storm against a stale bundle must rebuild it once, not once per device."""
+    RECONNECTS = 1000
+    WORKERS = 50
+
+    def setUp(self):
+        self.org = Organization.objects.create(name='Reconnect Org')
+        self.user = User.objects.create_user(username='worker', password='pw12345678', email='worker@example.org')
+        OrganizationMember.objects.create(user=self.user, organization=self.org, role='USER')
+        JsonLdContext.objects.create(
+            organization=self.org, url='https://example.org/ctx/v1',
+            content=JsonLdDocument.objects.intern({'@context': {'name': 'https://schema.org/name'}}),
+        )
+        serializer = StatusListCredentialUpsertSerializer(data={
+            'organization_id': str(self.org.id),
+            'status_list_credential': make_status_list_credential('https://issuer.example/status/1'),
+        })
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertFalse(OfflineBundle.objects.filter(organization=self.org).exists())
+
+    def _reconnect(self, barrier):
+        try:
+            client = APIClient()
+            client.force_authenticate(self.user)
+            barrier.wait(timeout=30)
+            response = client.get(
+                f'/organization/api/offline-bundle/?organization_id={self.org.id}', HTTP_ACCEPT_ENCODING='gzip',
+            )
+            return response.status_code, response['ETag']
+        finally:
+            connection.close()
+
+    def test_reconnect_storm_builds_bundle_once(self):
+        barrier = threading.Barrier(self.WORKERS)
+        with mock.patch.object(
+            offline_bundle, 'materialize_offline_bundle', wraps=offline_bundle.materialize_offline_bundle,
+        ) as materialize:
+            with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+                results = list(pool.map(lambda _: self._reconnect(barrier), range(self.RECONNECTS)))
+
+        self.assertEqual(materialize.call_count, 1)
+        self.assertEqual({code for code, _ in results}, {200})
+        bundle = OfflineBundle.objects.get(organization=self.org)
+        self.assertFalse(bundle.stale)
+        self.assertEqual({etag for _, etag in results}, {f'"{bundle.bundle_hash}-gzip"'})
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class OfflineBundleEncodingTests(TestCase):
+    """The full bundle is served in the best accepted encoding, each with its own ETag."""
+
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name='Encoding Org')
+        user = User.objects.create_user(username='encoding-worker')
+        OrganizationMember.objects.create(user=user, organization=self.org, role='USER')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self._add_status_list('https://issuer.example/status/encoding')
+
+    def _add_status_list(self, status_list_id):
+        serializer = StatusListCredentialUpsertSerializer(data={
+            'organization_id': str(self.org.id),
+            'status_list_credential': make_status_list_credential(status_list_id),
+        })
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+    def _get(self, accept_encoding=None, if_none_match=None):
+        headers = {}
+        if accept_encoding is not None:
+            headers['HTTP_ACCEPT_ENCODING'] = accept_encoding
+        if if_none_match is not None:
+            headers['HTTP_IF_NONE_MATCH'] = if_none_match
+        return self.client.get(f'/organization/api/offline-bundle/?organization_id={self.org.id}', **headers)
+
+    def _check(self, accept_encoding, encoding, decode):
+        response = self._get(accept_encoding)
+        self.assertEqual(response.status_code, 200, accept_encoding)
+        self.assertEqual(response.get('Content-Encoding'), encoding, accept_encoding)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        bundle = json.loads(decode(response.content))
+        self.assertEqual(bundle['status_list_credentials'][0]['status_list_id'], 'https://issuer.example/status/encoding')
+        suffix = f'-{encoding}' if encoding else ''
+        self.assertEqual(response['ETag'], f'"{bundle["bundle_hash"]}{suffix}"')
+
+        # Revalidation answers 304 with the ETag of the encoding the client asked for
+        revalidated = self._get(accept_encoding, if_none_match=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304, accept_encoding)
+        self.assertEqual((revalidated['ETag'], revalidated.content), (response['ETag'], b''))
+        return response
+
+    def test_gzip_identity_and_unsupported_codings(self):
+        gzipped = self._check('gzip, deflate', 'gzip', gzip.decompress)
+        for accept_encoding in (None, 'identity', 'compress, deflate', 'gzip;q=0, identity'):
+            plain = self._check(accept_encoding, None, lambda body: body)
+        self.assertEqual(gzip.decompress(gzipped.content), plain.content)
+
+        # Brotli is only chosen when the module is available
+        with mock.patch('organization.views.bundle_brotli', None):
+            self._check('br, gzip', 'gzip', gzip.decompress)
+
+        # Any encoding's ETag identifies the same bundle; a changed bundle is sent again
+        self.assertEqual(self._get('gzip', if_none_match=plain['ETag']).status_code, 304)
+        self._add_status_list('https://issuer.example/status/encoding-2')
+        self.assertEqual(self._get('gzip', if_none_match=gzipped['ETag']).status_code, 200)
+
+    @skipIf(offline_bundle.brotli is None, 'brotli is not installed')
+    def test_brotli(self):
+        self._check('gzip, br', 'br', offline_bundle.brotli.decompress)
+        self._check('br;q=0, gzip', 'gzip', gzip.decompress)
+
+
+class StatusListPublisherTests(TestCase):
+    """Status list writes are published as static files that are served without touching the database."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(STATUS_LIST_PUBLISH_ROOT=tmp.name, SECURE_SSL_REDIRECT=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.org = Organization.objects.create(name='Publisher Org')
+        self.status_list_id = 'https://issuer.example/status/1'
+
+    def _upsert(self, bits):
+        serializer = StatusListCredentialUpsertSerializer(data={
+            'organization_id': str(self.org.id),
+            'status_list_credential': make_status_list_credential(self.status_list_id, bits=bits),
+        })
+        serializer.is_valid(raise_exception=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            serializer.save()
+        with open(organization_dir(self.org.id) / 'manifest.json') as f:
+            return json.load(f)
+
+    def test_version_bump_publishes_new_immutable_file(self):
+        manifest = self._upsert(b'\x00' * 16)
+        [entry] = manifest['status_lists']
+        self.assertEqual((entry['status_list_id'], entry['version']), (self.status_list_id, 1))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(entry['url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        stored = StatusListCredential.objects.get(organization=self.org, status_list_id=self.status_list_id)
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), stored.full_credential)
+        self.assertEqual(entry['file'], hashlib.sha256(
+            json.dumps(stored.full_credential, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        ).hexdigest() + '.json')
+
+        manifest_url = entry['url'].rsplit('/', 1)[0] + '/manifest.json'
+        first = self.client.get(manifest_url)
+        self.assertEqual(first['Cache-Control'], 'public, no-cache')
+        self.assertEqual(self.client.get(manifest_url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        [bumped] = self._upsert(b'\x01' * 16)['status_lists']
+        self.assertEqual(bumped['version'], 2)
+        self.assertNotEqual(bumped['file'], entry['file'])
+        self.assertEqual(self.client.get(bumped['url']).status_code, 200)
+        # The superseded file stays available for clients holding the old manifest
+        self.assertEqual(self.client.get(entry['url']).status_code, 200)
+        self.assertEqual(self.client.get(manifest_url + '/../../../../etc/passwd').status_code, 404)
+
+    def test_superseded_files_are_pruned_by_retirement_time(self):
+        directory = organization_dir(self.org.id)
+        [first] = self._upsert(b'\x00' * 16)['status_lists']
+        # An old mtime must not get a file pruned the moment it is superseded
+        os.utime(directory / first['file'], (0, 0))
+        before = time.time()
+        manifest = self._upsert(b'\x01' * 16)
+        [second] = manifest['status_lists']
+        self.assertEqual(list(manifest['retired']), [first['file']])
+        self.assertGreaterEqual(manifest['retired'][first['file']], before)
+        self.assertTrue((directory / first['file']).is_file())
+
+        later = time.time() + status_list_publisher.RETENTION_SECONDS + 1
+        with mock.patch.object(status_list_publisher.time, 'time', return_value=later):
+            manifest = self._upsert(b'\x02' * 16)
+        self.assertFalse((directory / first['file']).exists())
+        self.assertTrue((directory / second['file']).is_file())
+        self.assertEqual(manifest['retired'], {second['file']: later})
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class TokenClaimsTests(TestCase):
+    """Hot reads authorize from signed membership claims; refreshing picks up membership changes."""
+
+    def setUp(self):
+        self.org = Organization.objects.create(name='Claims Org')
+        self.user = User.objects.create_user(username='claims-admin', password='pw12345678', email='claims@example.org')
+        self.member = OrganizationMember.objects.create(user=self.user, organization=self.org, role='ADMIN')
+        self.key_id = 'did:example:issuer#key-1'
+        raw = ed25519.Ed25519PrivateKey.generate().public_key().public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw,
+        )
+        PublicKey.objects.create(
+            organization=self.org, key_id=self.key_id, key_type='Ed25519VerificationKey2020',
+            controller='did:example:issuer',
+            **normalize_key_material('Ed25519VerificationKey2020', public_key_hex=raw.hex()),
+        )
+
+    def _login(self):
+        response = self.client.post('/organization/api/login/', {
+            'username': 'claims-admin', 'password': 'pw12345678', 'org_name': 'Claims Org',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_key_lookup_is_authorized_from_claims(self):
+        tokens = self._login()
+        self.assertEqual(AccessToken(tokens['access'])['orgs'], {str(self.org.id): 'ADMIN'})
+        url = '/organization/api/public-keys/lookup/?' + urlencode({'organization_id': self.org.id, 'key_id': self.key_id})
+        auth = {'HTTP_AUTHORIZATION': f"Bearer {tokens['access']}"}
+        self.client.get(url, **auth)  # warm the key index
+        with self.assertNumQueries(0):
+            response = self.client.get(url, **auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['key']['key_id'], self.key_id)
+
+    def test_refresh_recomputes_memberships(self):
+        tokens = self._login()
+        self.member.delete()
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': tokens['refresh']}, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        access = response.json()['access']
+        self.assertEqual(AccessToken(access)['orgs'], {})
+        response = self.client.get(
+            f'/organization/api/offline-bundle/?organization_id={self.org.id}', HTTP_AUTHORIZATION=f'Bearer {access}',
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class OrganizationChangeFeedTests(TestCase):
+    """The incremental feed pages through the change log and asks for a resync when it cannot."""
+
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name='Feed Org')
+        user = User.objects.create_user(username='feed-worker')
+        OrganizationMember.objects.create(user=user, organization=self.org, role='USER')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def _feed(self, since, **params):
+        return self.client.get('/organization/api/changes/', {'organization_id': str(self.org.id), 'since': since, **params})
+
+    def _add_key(self, key_id):
+        raw = ed25519.Ed25519PrivateKey.generate().public_key().public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw,
+        )
+        PublicKey.objects.create(
+            organization=self.org, key_id=key_id, key_type='Ed25519VerificationKey2020', controller='did:example:feed',
+            **normalize_key_material('Ed25519VerificationKey2020', public_key_hex=raw.hex()),
+        )
+
+    def _seq(self):
+        return Organization.objects.get(pk=self.org.pk).change_seq
+
+    def test_empty_feed(self):
+        response = self._feed(self._seq())
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['change_seq'], data['has_more']), (self._seq(), False))
+        self.assertEqual(data['changes'], {'contexts': [], 'public_keys': [], 'status_list_credentials': []})
+        self.assertEqual(data['deleted'], {'contexts': [], 'public_keys': [], 'status_list_credentials': []})
+
+    def test_pages_by_change_seq(self):
+        start = self._seq()
+        for n in range(3):
+            self._add_key(f'did:example:feed#key-{n}')
+        PublicKey.objects.get(key_id='did:example:feed#key-1').delete()
+        self.assertEqual(self._seq(), start + 4)
+
+        # Pages serve the current state of the items changed in their slice of the log
+        first = self._feed(start, limit=2).json()
+        self.assertEqual((first['change_seq'], first['has_more']), (start + 2, True))
+        self.assertEqual([k['key_id'] for k in first['changes']['public_keys']], ['did:example:feed#key-0'])
+        self.assertEqual(first['changes']['public_keys'][0]['public_key_multibase'][:1], 'z')
+        self.assertEqual(first['deleted']['public_keys'], ['did:example:feed#key-1'])
+
+        second = self._feed(first['change_seq'], limit=2).json()
+        self.assertEqual((second['since'], second['change_seq'], second['has_more']), (start + 2, start + 4, False))
+        self.assertEqual([k['key_id'] for k in second['changes']['public_keys']], ['did:example:feed#key-2'])
+        self.assertEqual(second['deleted']['public_keys'], ['did:example:feed#key-1'])
+
+        last = self._feed(second['change_seq']).json()
+        self.assertEqual((last['change_seq'], last['has_more'], last['changes']['public_keys']), (start + 4, False, []))
+
+    def test_cursor_outside_the_log_needs_a_full_resync(self):
+        start = self._seq()
+        OrganizationChange.objects.record(self.org.pk, 'contexts', ['https://example.org/a', 'https://example.org/b'])
+        OrganizationChange.objects.record(self.org.pk, 'contexts', ['https://example.org/c'])
+        # Older entries have been trimmed from the log
+        OrganizationChange.objects.filter(organization=self.org, seq__lte=start + 2).delete()
+
+        for since in (start, self._seq() + 1):
+            response = self._feed(since)
+            self.assertEqual(response.status_code, 410, since)
+            self.assertTrue(response.json()['reset'])
+        self.assertEqual(self._feed(start + 2).json()['deleted']['contexts'], ['https://example.org/c'])
+        self.assertEqual(self._feed('soon').status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class OrganizationChangeStreamTests(TestCase):
+    """Long polls and SSE streams answer as soon as change_seq advances."""
+
+    def setUp(self):
+        self.org = Organization.objects.create(name='Stream Org')
+        user = User.objects.create_user(username='stream-worker')
+        OrganizationMember.objects.create(user=user, organization=self.org, role='USER')
+        self.auth = {'Authorization': f"Bearer {tokens_for_user(user)['access']}"}
+        self._record()
+        self.seq = Organization.objects.get(pk=self.org.pk).change_seq
+
+    def _record(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            OrganizationChange.objects.record(self.org.pk, 'contexts', ['https://example.org/ctx/v1'])
+
+    def _get(self, since, headers=None, **params):
+        query = urlencode({'organization_id': self.org.id, 'since': since, **params})
+        return self.async_client.get(f'/organization/api/changes/stream/?{query}', headers={**self.auth, **(headers or {})})
+
+    @staticmethod
+    async def _body(response):
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    @staticmethod
+    async def _next_event(events):
+        """The next SSE ``change`` event (skipping the retry hint and keepalives), parsed."""
+        while True:
+            chunk = (await anext(events)).decode()
+            if 'event: change' in chunk:
+                fields = dict(line.split(': ', 1) for line in chunk.strip().splitlines())
+                return int(fields['id']), json.loads(fields['data'])
+
+    async def test_long_poll_wakes_on_record(self):
+        response = await self._get(self.seq, timeout=30)
+        self.assertEqual(response.status_code, 200)
+        # Only the wake-up from record() can answer this before the (stretched) poll interval
+        with mock.patch.object(change_broadcaster, 'interval', 30):
+            body = asyncio.ensure_future(self._body(response))
+            await asyncio.sleep(0.1)
+            self.assertFalse(body.done())
+            await sync_to_async(self._record)()
+            payload = json.loads(await asyncio.wait_for(body, 5))
+        self.assertEqual(payload['change_seq'], self.seq + 1)
+        self.assertTrue(payload['changed'])
+
+    async def test_long_poll_times_out_unchanged(self):
+        response = await self._get(self.seq, timeout=1)
+        payload = json.loads(await asyncio.wait_for(self._body(response), 5))
+        self.assertEqual(payload, {
+            'organization_id': str(self.org.id), 'since': self.seq, 'change_seq': self.seq, 'changed': False,
+        })
+
+    async def test_event_stream_resumes_from_last_event_id(self):
+        # Last-Event-ID takes precedence over since, and a missed change is sent straight away
+        response = await self._get(0, headers={'Accept': 'text/event-stream', 'Last-Event-ID': str(self.seq - 1)})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        try:
+            self.assertEqual(await asyncio.wait_for(self._next_event(events), 5), (self.seq, {
+                'organization_id': str(self.org.id), 'change_seq': self.seq,
+            }))
+            await sync_to_async(self._record)()
+            event_id, _ = await asyncio.wait_for(self._next_event(events), 5)
+            self.assertEqual(event_id, self.seq + 1)
+        finally:
+            await events.aclose()
+
+    async def test_since_ahead_of_organization_is_gone(self):
+        for headers in ({}, {'Accept': 'text/event-stream'}):
+            response = await self._get(self.seq + 1, headers)
+            self.assertEqual(response.status_code, 410)
+            self.assertTrue(json.loads(response.content)['reset'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class StatusListDownloadRevalidationTests(TestCase):
+    """Downloading a status list with a current ETag costs a 304, not the credential."""
+
+    def test_matching_etag_is_not_modified(self):
+        org = Organization.objects.create(name='Download Org')
+        status_list_id = 'https://issuer.example/status/download'
+        serializer = StatusListCredentialUpsertSerializer(data={
+            'organization_id': str(org.id),
+            'status_list_credential': make_status_list_credential(status_list_id),
+        })
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='download-user'))
+        url = '/organization/api/status-list-credentials/download/?' + urlencode(
+            {'organization_id': org.id, 'status_list_id': status_list_id})
+
+        first = client.get(url)
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(1):
+            revalidated = client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual((revalidated.status_code, revalidated['ETag']), (304, first['ETag']))
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH='"stale-v0"').status_code, 200)
+
+    def test_invalid_organization_id_is_rejected(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='download-user'))
+        response = client.get('/organization/api/status-list-credentials/download/?' + urlencode(
+            {'organization_id': 'bad', 'status_list_id': 'https://issuer.example/status/download'}))
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class StatusListStatsTests(TestCase):
+    """Dashboard stats come from the counts stored at upsert time."""
+
+    def setUp(self):
+        self.org = Organization.objects.create(name='Stats Org')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='stats-user'))
+        self.url = '/organization/api/status-list-credentials/stats/'
+
+    def _upsert(self, status_list_id, bits, purpose='revocation'):
+        serializer = StatusListCredentialUpsertSerializer(data={
+            'organization_id': str(self.org.id),
+            'status_list_credential': make_status_list_credential(status_list_id, bits=bits, purpose=purpose),
+        })
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+    def test_organization_totals(self):
+        self._upsert('https://issuer.example/status/1', b'\x80' + b'\x00' * 15)
+        self._upsert('https://issuer.example/status/2', b'\xff' + b'\x00' * 31, purpose='suspension')
+
+        response = self.client.get(self.url, {'organization_id': str(self.org.id)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['totals'], {
+            'lists': 2, 'bit_length': 384, 'set_bit_count': 9,
+            'by_purpose': {
+                'revocation': {'lists': 1, 'bit_length': 128, 'set_bit_count': 1},
+                'suspension': {'lists': 1, 'bit_length': 256, 'set_bit_count': 8},
+            },
+        })
+        self.assertEqual(
+            [(row['status_list_id'], row['set_bit_count']) for row in response.json()['status_lists']],
+            [('https://issuer.example/status/1', 1), ('https://issuer.example/status/2', 8)],
+        )
+        self.assertNotIn('versions', response.json())
+
+    def test_per_list_version_history(self):
+        status_list_id = 'https://issuer.example/status/history'
+        self._upsert(status_list_id, b'\x00' * 16)
+        self._upsert(status_list_id, b'\x0f' + b'\x00' * 15)
+        self._upsert(status_list_id, b'\x03' + b'\x00' * 15)
+
+        response = self.client.get(self.url, {'organization_id': str(self.org.id), 'status_list_id': status_list_id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(v['version'], v['set_bit_count'], v['changed_bit_count']) for v in response.json()['versions']],
+            [(1, 0, None), (2, 4, 4), (3, 2, 2)],
+        )
+        self.assertIsNone(response.json()['versions'][-1]['archived_at'])
+        missing = self.client.get(self.url, {'organization_id': str(self.org.id), 'status_list_id': 'nope'})
+        self.assertEqual(missing.status_code, 404)
+
+    def test_invalid_organization_id_is_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'organization_id': 'bad'}).status_code, 400)
+
+    def test_migration_backfill_matches_live_counts(self):
+        from django.apps import apps
+        migration = importlib.import_module('organization.migrations.0008_statuslist_bit_statistics')
+        status_list_id = 'https://issuer.example/status/backfill'
+        self._upsert(status_list_id, b'\x00' * 16)
+        self._upsert(status_list_id, b'\xf0' + b'\x00' * 15)
+        stat_fields = ('bit_length', 'set_bit_count', 'changed_bit_count')
+        expected = list(StatusListCredentialHistory.objects.values_list(*stat_fields)) + list(
+            StatusListCredential.objects.values_list(*stat_fields))
+        StatusListCredentialHistory.objects.update(bit_length=None, set_bit_count=None, changed_bit_count=None)
+        StatusListCredential.objects.update(bit_length=None, set_bit_count=None, changed_bit_count=None)
+
+        migration.backfill_statistics(apps, None)
+
+        self.assertEqual(list(StatusListCredentialHistory.objects.values_list(*stat_fields)) + list(
+            StatusListCredential.objects.values_list(*stat_fields)), expected)
+        self.assertEqual(expected, [(128, 0, None), (128, 4, 4)])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class StatusListIndexOperationsTests(TestCase):
+    """Index operations keep the signed list current and hand back an unsigned draft to re-sign."""
+
+    def setUp(self):
+        self.org = Organization.objects.create(name='Operations Org')
+        admin = User.objects.create_user(username='operations-admin')
+        OrganizationMember.objects.create(user=admin, organization=self.org, role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.status_list_id = 'https://issuer.example/status/ops'
+        self._upload(make_status_list_credential(self.status_list_id))
+
+    def _upload(self, credential):
+        serializer = StatusListCredentialUpsertSerializer(data={
+            'organization_id': str(self.org.id),
+            'status_list_credential': {**credential, 'proof': {'type': 'Ed25519Signature2020', 'proofValue': 'z1'}},
+        })
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def _apply(self, **ops):
+        response = self.client.post('/organization/api/status-list-credentials/apply-operations/', {
+            'organization_id': str(self.org.id), 'status_list_id': self.status_list_id, 'purpose': 'revocation', **ops,
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_draft_accumulates_until_signed_upload(self):
+        first = self._apply(set=[3])
+        second = self._apply(set=[10], clear=[3])
+        self.assertEqual((first['result'], second['result'], second['version']), ('pending', 'pending', 1))
+        self.assertNotIn('proof', second['pending_credential'])
+        self.assertEqual(second['set_bit_count'], 1)
+
+        current = StatusListCredential.objects.get(status_list_id=self.status_list_id)
+        self.assertEqual((current.version, current.full_credential['proof']['proofValue']), (1, 'z1'))
+        self.assertEqual(self._apply(set=[10])['result'], 'unchanged')
+
+        promoted = self._upload(second['pending_credential'])
+        self.assertEqual((promoted.version, promoted.encoded_list_hash), (2, second['pending_encoded_list_hash']))
+        self.assertEqual((promoted.set_bit_count, promoted.changed_bit_count), (1, 1))
+        promoted.refresh_from_db()
+        self.assertIsNone(promoted.pending_credential)
+        self.assertIn('proof', promoted.full_credential)
+
+
+def ed25519_key_starting_with(first_byte):
+    while True:
+        raw = ed25519.Ed25519PrivateKey.generate().public_key().public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw
+        )
+        if raw[0] == first_byte:
+            return raw
+
+
+class KeyMaterialTests(TestCase):
+    """Every supported input form normalizes to the same multibase, hex and JWK."""
+
+    def test_ed25519_forms(self):
+        raw = ed25519_key_starting_with(0x30)  # looks like the start of a DER SEQUENCE
+        spki = ed25519.Ed25519PublicKey.from_public_bytes(raw).public_bytes(
+            serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+        pem = ed25519.Ed25519PublicKey.from_public_bytes(raw).public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+        expected = {
+            'algorithm': 'Ed25519',
+            'public_key_raw': raw,
+            'public_key_multibase': 'z' + b58encode(b'\xed\x01' + raw),
+            'public_key_hex': raw.hex(),
+            'public_key_jwk': {'kty': 'OKP', 'crv': 'Ed25519', 'x': base64.urlsafe_b64encode(raw).decode().rstrip('=')},
+        }
+        for key_type, form in (
+            ('Ed25519VerificationKey2018', {'public_key_hex': raw.hex()}),
+            ('', {'public_key_hex': '0x' + raw.hex()}),
+            ('Ed25519VerificationKey2020', {'public_key_multibase': 'z' + b58encode(raw)}),
+            ('Ed25519VerificationKey2020', {'public_key_multibase': expected['public_key_multibase']}),
+            ('JsonWebKey2020', {'public_key_jwk': expected['public_key_jwk']}),
+            ('Ed25519VerificationKey2020', {'public_key_hex': spki.hex()}),
+            ('Ed25519VerificationKey2020', {'public_key_pem': pem}),
+        ):
+            self.assertEqual(normalize_key_material(key_type, **form), expected, form)
+
+    def test_ec_and_rsa_forms(self):
+        ec_key = ec.generate_private_key(ec.SECP256R1()).public_key()
+        point = ec_key.public_bytes(serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint)
+        compressed = ec_key.public_bytes(serialization.Encoding.X962, serialization.PublicFormat.CompressedPoint)
+        from_point = normalize_key_material('EcdsaSecp256r1VerificationKey2019', public_key_hex=point.hex())
+        self.assertEqual(from_point['algorithm'], 'P-256')
+        self.assertEqual(from_point['public_key_multibase'], 'z' + b58encode(b'\x80\x24' + compressed))
+        self.assertEqual(normalize_key_material('JsonWebKey2020', public_key_jwk=from_point['public_key_jwk']), from_point)
+        self.assertEqual(normalize_key_material('', public_key_multibase=from_point['public_key_multibase']), from_point)
+
+        rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048).public_key()
+        spki = rsa_key.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+        pem = rsa_key.public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+        from_pem = normalize_key_material('RsaVerificationKey2018', public_key_pem=pem)
+        self.assertEqual((from_pem['algorithm'], from_pem['public_key_raw']), ('RSA', spki))
+        self.assertEqual(normalize_key_material('', public_key_hex=spki.hex()), from_pem)
+        self.assertEqual(normalize_key_material('JsonWebKey2020', public_key_jwk=from_pem['public_key_jwk']), from_pem)
+        self.assertEqual(normalize_key_material('', public_key_multibase=from_pem['public_key_multibase']), from_pem)
+
+        for key_type, form in (
+            ('Ed25519VerificationKey2020', {'public_key_hex': point.hex()}),  # type/key mismatch
+            ('', {'public_key_hex': '30' + '00' * 40}),
+            ('', {'public_key_pem': '-----BEGIN PUBLIC KEY-----\nnot a key\n-----END PUBLIC KEY-----'}),
+            ('', {'public_key_jwk': {**from_point['public_key_jwk'], 'd': 'secret'}}),
+        ):
+            with self.assertRaises(InvalidKeyMaterial, msg=form):
+                normalize_key_material(key_type, **form)
+
+    def test_migration_backfills_existing_keys(self):
+        from django.apps import apps
+        migration = importlib.import_module('organization.migrations.0009_publickey_normalized_material')
+        org = Organization.objects.create(name='Backfill Org')
+        raw = ed25519_key_starting_with(0x30)
+        good = PublicKey.objects.create(organization=org, key_id='did:example:b#1', controller='did:example:b',
+                                        key_type='Ed25519VerificationKey2018', public_key_hex=raw.hex())
+        bad = PublicKey.objects.create(organization=org, key_id='did:example:b#2', controller='did:example:b',
+                                       key_type='Ed25519VerificationKey2018', public_key_multibase='not-multibase')
+
+        migration.backfill_key_material(apps, None)
+
+        good.refresh_from_db()
+        bad.refresh_from_db()
+        self.assertEqual((good.algorithm, bytes(good.public_key_raw)), ('Ed25519', raw))
+        self.assertEqual(good.public_key_multibase, 'z' + b58encode(b'\xed\x01' + raw))
+        self.assertEqual((bad.algorithm, bad.public_key_multibase), ('', 'not-multibase'))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PublicKeyImportTests(TestCase):
+    """DID documents and JWKS import all their keys with normalized material, or none of them."""
+
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name='Import Org')
+        admin = User.objects.create_user(username='import-admin')
+        OrganizationMember.objects.create(user=admin, organization=self.org, role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.ed_raw = ed25519.Ed25519PrivateKey.generate().public_key().public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw,
+        )
+        self.ec_key = ec.generate_private_key(ec.SECP256K1()).public_key()
+        self.ec_point = self.ec_key.public_bytes(serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint)
+
+    def _import(self, **body):
+        return self.client.post('/organization/api/public-keys/import/', {'organization_id': str(self.org.id), **body},
+                                format='json')
+
+    def _b64url(self, data):
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def test_jwks_import(self):
+        ec_jwk = {'kty': 'EC', 'crv': 'secp256k1', 'x': self._b64url(self.ec_point[1:33]),
+                  'y': self._b64url(self.ec_point[33:]), 'kid': 'did:example:issuer#ec', 'alg': 'ES256K'}
+        jwks = {'keys': [
+            {'kty': 'OKP', 'crv': 'Ed25519', 'x': self._b64url(self.ed_raw), 'kid': 'ed'},
+            ec_jwk,
+            {'kty': 'OKP', 'crv': 'Ed25519', 'x': self._b64url(self.ed_raw), 'kid': 'enc', 'use': 'enc'},
+        ]}
+        response = self._import(jwks=jwks, controller='did:example:issuer')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['summary'], {'created': 2, 'updated': 0, 'unchanged': 0})
+
+        keys = {k.key_id: k for k in PublicKey.objects.filter(organization=self.org)}
+        self.assertEqual(sorted(keys), ['did:example:issuer#ec', 'did:example:issuer#ed'])
+        ed = keys['did:example:issuer#ed']
+        self.assertEqual((ed.algorithm, ed.key_type, ed.controller, ed.purpose), (
+            'Ed25519', 'JsonWebKey2020', 'did:example:issuer', 'assertion'))
+        self.assertEqual(bytes(ed.public_key_raw), self.ed_raw)
+        self.assertEqual(ed.public_key_multibase, 'z' + b58encode(b'\xed\x01' + self.ed_raw))
+        self.assertEqual(ed.public_key_hex, self.ed_raw.hex())
+        compressed = self.ec_key.public_bytes(serialization.Encoding.X962, serialization.PublicFormat.CompressedPoint)
+        ec_row = keys['did:example:issuer#ec']
+        self.assertEqual((ec_row.algorithm, ec_row.public_key_hex), ('secp256k1', self.ec_point.hex()))
+        self.assertEqual(ec_row.public_key_multibase, 'z' + b58encode(b'\xe7\x01' + compressed))
+        self.assertEqual(ec_row.public_key_jwk, {**ec_jwk, 'kid': 'did:example:issuer#ec'})
+
+        again = self._import(jwks=jwks, controller='did:example:issuer')
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['summary'], {'created': 0, 'updated': 0, 'unchanged': 2})
+
+    def test_did_document_import(self):
+        document = {
+            'id': 'did:example:doc',
+            'verificationMethod': [
+                {'id': '#key-1', 'type': 'Ed25519VerificationKey2020', 'controller': 'did:example:doc',
+                 'publicKeyMultibase': 'z' + b58encode(self.ed_raw)},
+                {'id': '#key-2', 'type': 'EcdsaSecp256k1VerificationKey2019', 'controller': 'did:example:doc',
+                 'publicKeyHex': self.ec_point.hex()},
+                {'id': '#account', 'type': 'EcdsaSecp256k1RecoveryMethod2020', 'controller': 'did:example:doc',
+                 'blockchainAccountId': 'eip155:1:0x89a932207c485f85226d86f7cd486a89a24fcc12'},
+            ],
+            'assertionMethod': ['#key-1'],
+            'authentication': ['#key-2'],
+        }
+        response = self._import(did_document=document)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(
+            [(r['key_id'], r['algorithm'], r['result']) for r in response.json()['results']],
+            [('did:example:doc#key-1', 'Ed25519', 'created'), ('did:example:doc#key-2', 'secp256k1', 'created')],
+        )
+
+        keys = {k.key_id: k for k in PublicKey.objects.filter(organization=self.org)}
+        self.assertEqual(keys['did:example:doc#key-1'].purpose, 'assertion')
+        self.assertEqual(keys['did:example:doc#key-2'].purpose, 'authentication')
+        # The bare multibase key is stored in its multicodec-prefixed form
+        self.assertEqual(keys['did:example:doc#key-1'].public_key_multibase, 'z' + b58encode(b'\xed\x01' + self.ed_raw))
+        self.assertEqual(keys['did:example:doc#key-1'].public_key_jwk,
+                         {'kty': 'OKP', 'crv': 'Ed25519', 'x': self._b64url(self.ed_raw)})
+        self.assertEqual(bytes(keys['did:example:doc#key-2'].public_key_raw), self.ec_point)
+
+    def test_malformed_keys_are_rejected(self):
+        document = {
+            'id': 'did:example:bad',
+            'verificationMethod': [
+                {'id': '#good', 'type': 'Ed25519VerificationKey2020', 'publicKeyMultibase': 'z' + b58encode(self.ed_raw)},
+                {'id': '#bad', 'type': 'Ed25519VerificationKey2018', 'publicKeyHex': 'abcd'},
+            ],
+        }
+        response = self._import(did_document=document)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()['keys']), ['did:example:bad#bad'])
+
+        off_curve = {'kty': 'EC', 'crv': 'secp256k1', 'x': self._b64url(self.ec_point[1:33]),
+                     'y': self._b64url(bytes(32)), 'kid': 'off-curve'}
+        for body in (
+            {'jwks': {'keys': [off_curve]}, 'controller': 'did:example:bad'},
+            {'jwks': {'keys': [{**off_curve, 'd': self._b64url(bytes(32))}]}, 'controller': 'did:example:bad'},
+            {'jwks': {'keys': [off_curve]}},  # no controller
+            {'did_document': document, 'jwks': {'keys': []}},
+        ):
+            self.assertEqual(self._import(**body).status_code, 400, body)
+        # Nothing is stored when any key is rejected
+        self.assertFalse(PublicKey.objects.filter(organization=self.org).exists())
+
+
+class PublicKeyIndexTests(TestCase):
+    """The key index serves repeat lookups from memory and notices writes made by other processes."""
+
+    def setUp(self):
+        self.org = Organization.objects.create(name='Index Org')
+        self.index = key_index_module.PublicKeyIndex()
+        self.key = PublicKey.objects.create(
+            organization=self.org, key_id='did:example:index#key-1', key_type='Ed25519VerificationKey2020',
+            public_key_multibase='z6Mk', controller='did:example:index',
+        )
+
+    def _advance(self, seconds):
+        # Move the index's clock forward instead of sleeping
+        return mock.patch.object(key_index_module.time, 'monotonic',
+                                 return_value=key_index_module.time.monotonic() + seconds)
+
+    def test_hits_misses_and_invalidation(self):
+        org_id = str(self.org.id)
+        self.assertEqual(self.index.get_by_key_id(org_id, self.key.key_id)['id'], self.key.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.index.get_by_controller(org_id, 'did:example:index')), 1)
+            self.assertIsNone(self.index.get_by_key_id(org_id, 'did:example:index#missing'))
+        stats = self.index.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['not_found']), (2, 1, 1))
+
+        # A write from another process only reaches this one through keys_changed_at
+        PublicKey.objects.filter(pk=self.key.pk).update(revoked_at=timezone.now(), is_active=False)
+        Organization.objects.filter(pk=self.org.pk).update(keys_changed_at=timezone.now())
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(self.index.get_by_key_id(org_id, self.key.key_id))
+        with self._advance(key_index_module.GENERATION_CHECK_SECONDS + 1):
+            self.assertIsNone(self.index.get_by_key_id(org_id, self.key.key_id))
+
+        # Unstamped writes are picked up once the entry's TTL runs out
+        PublicKey.objects.filter(pk=self.key.pk).update(revoked_at=None, is_active=True)
+        self.assertIsNone(self.index.get_by_key_id(org_id, self.key.key_id))
+        with self._advance(key_index_module.ENTRY_TTL_SECONDS + 10):
+            self.assertIsNotNone(self.index.get_by_key_id(org_id, self.key.key_id))
+
+        # Expired keys are hidden even before the sweep deactivates them
+        PublicKey.objects.filter(pk=self.key.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.index.invalidate(org_id)
+        self.assertIsNone(self.index.get_by_key_id(org_id, self.key.key_id))
+        self.assertEqual(self.index.get_by_controller(org_id, 'did:example:index'), [])
+
+    def test_index_and_database_views_agree_on_usable_keys(self):
+        now = timezone.now()
+        cases = {
+            'scheduled-revocation': {'revoked_at': now + timedelta(hours=1)},
+            'revoked': {'revoked_at': now - timedelta(seconds=1)},
+            'expiring': {'expires_at': now + timedelta(hours=1)},
+            'expired': {'expires_at': now - timedelta(seconds=1)},
+            'inactive': {'is_active': False},
+        }
+        for name, fields in cases.items():
+            PublicKey.objects.create(
+                organization=self.org, key_id=f'did:example:index#{name}', key_type='Ed25519VerificationKey2020',
+                public_key_multibase='z6Mk', controller='did:example:index', **fields,
+            )
+        expected = ['did:example:index#expiring', 'did:example:index#key-1', 'did:example:index#scheduled-revocation']
+
+        org_id = str(self.org.id)
+        self.assertEqual(sorted(PublicKey.objects.usable(now).filter(organization=self.org).values_list('key_id', flat=True)),
+                         expected)
+        self.assertEqual(sorted(k['key_id'] for k in offline_bundle.section_items(self.org, 'public_keys')), expected)
+        self.assertEqual(sorted(k['key_id'] for k in self.index.get_by_controller(org_id, 'did:example:index')), expected)
+        self.assertEqual(
+            sorted(name for name in cases if self.index.get_by_key_id(org_id, f'did:example:index#{name}')),
+            ['expiring', 'scheduled-revocation'],
+        )
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PublicKeyListRevalidationTests(TestCase):
+    """Conditional GETs of the key list never hide a change made within the same second."""
+
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name='Revalidation Org')
+        user = User.objects.create_user(username='revalidation-user')
+        OrganizationMember.objects.create(user=user, organization=self.org, role='USER')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.url = f'/organization/api/public-keys/?organization_id={self.org.id}'
+        self.first_change = timezone.now().replace(microsecond=100000)
+        Organization.objects.filter(pk=self.org.pk).update(keys_changed_at=self.first_change)
+
+    def test_change_within_the_same_second(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        since = quote(first.json()['keys_changed_at'])
+        for headers in ({'HTTP_IF_NONE_MATCH': first['ETag']}, {}):
+            self.assertEqual(self.client.get(f'{self.url}&since={since}', **headers).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        # Last-Modified has whole seconds, so it cannot prove the list is unchanged
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 200)
+
+        Organization.objects.filter(pk=self.org.pk).update(keys_changed_at=self.first_change.replace(microsecond=900000))
+        self.assertEqual(self.client.get(f'{self.url}&since={since}').status_code, 200)
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second['Last-Modified'], first['Last-Modified'])
+
+        later = http_date(self.first_change.timestamp() + 1)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=later).status_code, 304)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class MembershipResolverTests(TestCase):
+    """Permission classes and views share one cached membership lookup."""
+
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name='Resolver Org')
+        self.user = User.objects.create_user(username='resolver-admin', password='pw12345678')
+        self.member = OrganizationMember.objects.create(user=self.user, organization=self.org, role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        org_id = self.org.id
+        self.endpoints = [
+            ('get', f'/worker/api/organizations/{org_id}/logs/'),
+            ('get', f'/worker/api/organizations/{org_id}/logs/stats/'),
+            ('get', f'/organization/api/public-keys/?organization_id={org_id}'),
+            ('get', f'/organization/api/status-list-credentials/manifest/?organization_id={org_id}'),
+            ('delete', '/organization/api/public-keys/did:example:missing%23key-1/'),
+        ]
+
+    def _membership_queries(self, method, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url)
+        return response, sum('"worker_organizationmember"' in q['sql'] for q in ctx.captured_queries)
+
+    def test_membership_is_resolved_once_and_invalidated_on_change(self):
+        counts = []
+        for method, url in self.endpoints:
+            response, queries = self._membership_queries(method, url)
+            self.assertIn(response.status_code, (200, 404), (url, response.content))
+            counts.append(queries)
+        # Only the first request reaches the database; the rest hit the cache
+        self.assertEqual(counts, [1, 0, 0, 0, 0])
+
+        self.member.role = 'USER'
+        self.member.save()
+        for method, url in (self.endpoints[0], self.endpoints[4]):
+            response, queries = self._membership_queries(method, url)
+            self.assertEqual(response.status_code, 403, url)
+            self.assertLessEqual(queries, 1)
+
+    def test_unshared_cache_entries_expire_quickly(self):
+        # A role change made by another process drops only that process's entry;
+        # here the entry must expire within MEMBERSHIP_CACHE_SECONDS
+        url = self.endpoints[0][1]
+        self.assertEqual(self.client.get(url).status_code, 200)
+        OrganizationMember.objects.filter(pk=self.member.pk).update(role='USER')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        later = time.time() + settings.MEMBERSHIP_CACHE_SECONDS + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_owner_is_admin_only_where_owner_was_accepted(self):
+        self.member.role = 'OWNER'
+        self.member.save()
+        # IsOrganizationAdmin and the worker admin views require ADMIN
+        for method, url in self.endpoints[:2]:
+            self.assertEqual(getattr(self.client, method)(url).status_code, 403, url)
+        response = self.client.post('/organization/api/status-list-credentials/apply-operations/', {
+            'organization_id': str(self.org.id), 'status_list_id': 'x', 'purpose': 'revocation', 'set': [1],
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+        # Membership-scoped detail views accept OWNER as well
+        self.assertEqual(self.client.delete(self.endpoints[4][1]).status_code, 404)
+
+
+def b58encode(data: bytes) -> str:
+    alphabet = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+    num = int.from_bytes(data, 'big')
+    out = ''
+    while num:
+        num, rem = divmod(num, 58)
+        out = alphabet[rem] + out
+    return '1' * (len(data) - len(data.lstrip(b'\x00'))) + out
+
+
+class DIDDocumentHandler(BaseHTTPRequestHandler):
+    """Serves ``server.documents[path]``; paths in ``server.flaky`` fail once with 503 first."""
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.path in self.server.flaky:
+            self.server.flaky.discard(self.path)
+            self.send_response(503)
+            self.end_headers()
+            return
+        document = self.server.documents.get(self.path)
+        if document is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = json.dumps(document).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/did+json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ResolveOrganizationDIDsTests(TestCase):
+    """The resolver command against a local stand-in for did:web hosts."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), DIDDocumentHandler)
+        cls.server.documents, cls.server.flaky, cls.server.requests = {}, set(), []
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.host = f'127.0.0.1%3A{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.documents.clear()
+        self.server.flaky.clear()
+        self.server.requests.clear()
+        self.org = Organization.objects.create(name='Resolver Org')
+
+    def _ed25519_multibase(self):
+        raw = ed25519.Ed25519PrivateKey.generate().public_key().public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw
+        )
+        return raw, 'z' + b58encode(b'\xed\x01' + raw)
+
+    def _run(self, **options):
+        out, err = StringIO(), StringIO()
+        options.setdefault('allow_private_hosts', True)
+        call_command('resolve_organization_dids', scheme='http', retries=1, timeout=5, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_resolves_web_key_and_jwk_dids(self):
+        web_did = f'did:web:{self.host}:issuers:one'
+        _, web_multibase = self._ed25519_multibase()
+        jwk_raw, _ = self._ed25519_multibase()
+        web_jwk = {'kty': 'OKP', 'crv': 'Ed25519', 'x': base64.urlsafe_b64encode(jwk_raw).decode().rstrip('=')}
+        self.server.documents['/issuers/one/did.json'] = {
+            'id': web_did,
+            'verificationMethod': [
+                {'id': '#key-1', 'type': 'Ed25519VerificationKey2020', 'controller': web_did,
+                 'publicKeyMultibase': web_multibase},
+                {'id': f'{web_did}#key-2', 'type': 'JsonWebKey2020', 'controller': web_did,
+                 'publicKeyJwk': web_jwk},
+            ],
+            'assertionMethod': ['#key-1'],
+        }
+        self.server.flaky.add('/issuers/one/did.json')
+        raw, key_multibase = self._ed25519_multibase()
+        key_did = f'did:key:{key_multibase}'
+        jwk = {'kty': 'EC', 'crv': 'P-256', 'x': 'f83OJ3D2xF1Bg8vub9tLe1gHMzV76e8Tus9uPHvRVEU',
+               'y': 'x_FEzRu9m36HLN_tue659LNpXW6pCyStikYjKIWI5a0'}
+        jwk_did = 'did:jwk:' + base64.urlsafe_b64encode(json.dumps(jwk).encode()).decode().rstrip('=')
+        for did in (web_did, key_did, jwk_did):
+            OrganizationDID.objects.create(organization=self.org, did=did)
+
+        self._run()
+
+        self.assertEqual(set(OrganizationDID.objects.values_list('status', flat=True)), {'RESOLVED'})
+        keys = {k.key_id: k for k in PublicKey.objects.filter(organization=self.org)}
+        self.assertEqual(keys[f'{web_did}#key-1'].purpose, 'assertion')
+        self.assertEqual(keys[f'{web_did}#key-1'].public_key_multibase, web_multibase)
+        self.assertEqual(keys[f'{web_did}#key-2'].purpose, 'authentication')
+        self.assertEqual(keys[f'{web_did}#key-2'].public_key_hex, jwk_raw.hex())
+        self.assertEqual(keys[f'{key_did}#{key_multibase}'].public_key_hex, raw.hex())
+        self.assertEqual(keys[f'{jwk_did}#0'].public_key_jwk, jwk)
+        self.assertEqual(keys[f'{jwk_did}#0'].algorithm, 'P-256')
+        # The 503 was retried on the same pooled session
+        self.assertEqual(self.server.requests, ['/issuers/one/did.json'] * 2)
+
+        # Re-resolving unchanged documents touches no keys
+        out, _ = self._run(all=True)
+        self.assertIn('0 created, 0 updated, 2 unchanged', out)
+
+    def test_failed_resolution_stays_submitted(self):
+        did = f'did:web:{self.host}:missing'
+        OrganizationDID.objects.create(organization=self.org, did=did)
+
+        _, err = self._run()
+
+        org_did = OrganizationDID.objects.get(did=did)
+        self.assertEqual(org_did.status, 'SUBMITTED')
+        self.assertIn('HTTP 404', org_did.metadata['last_error'])
+        self.assertIn('HTTP 404', err)
+        self.assertFalse(PublicKey.objects.exists())
+
+    def test_private_hosts_are_not_fetched(self):
+        did = f'did:web:{self.host}:internal'
+        self.server.documents['/internal/did.json'] = {'id': did}
+        OrganizationDID.objects.create(organization=self.org, did=did)
+
+        self._run(allow_private_hosts=False)
+
+        self.assertIn('non-public address 127.0.0.1', OrganizationDID.objects.get(did=did).metadata['last_error'])
+        self.assertEqual(self.server.requests, [])
+
+    def test_bulk_upsert_retries_after_concurrent_create(self):
+        raw, multibase = self._ed25519_multibase()
+        keys = [{'key_id': f'did:example:race#key-{n}', 'key_type': 'Ed25519VerificationKey2020',
+                 'public_key_multibase': multibase, 'controller': 'did:example:race'} for n in range(2)]
+        manager_class = type(PublicKey.objects)
+        real_bulk_create = manager_class.bulk_create
+        calls = []
+
+        def bulk_create(manager, objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 1:
+                raise IntegrityError('UNIQUE constraint failed: uniq_publickey_org_keyid')
+            return real_bulk_create(manager, objs, *args, **kwargs)
+
+        with mock.patch.object(manager_class, 'bulk_create', autospec=True, side_effect=bulk_create):
+            result = PublicKey.objects.bulk_upsert(self.org, keys)
+
+        self.assertEqual((calls, len(result['created'])), ([2, 2], 2))
+        self.assertEqual(PublicKey.objects.get(key_id='did:example:race#key-0').public_key_hex, raw.hex())
+
+
+class ContextSourceHandler(BaseHTTPRequestHandler):
+    """Serves ``server.documents[path]`` with an ETag, answering matching If-None-Match with 304.
+
+    Paths in ``server.redirects`` answer with a 302 to the mapped path.
+    """
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.path in self.server.redirects:
+            self.send_response(302)
+            self.send_header('Location', self.server.redirects[self.path])
+            self.end_headers()
+            return
+        document = self.server.documents.get(self.path)
+        if document is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = json.dumps(document).encode()
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/ld+json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ContextServerTestCase(TestCase):
+    """Runs a ContextSourceHandler server on a free local port for the test class."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), ContextSourceHandler)
+        cls.server.documents, cls.server.requests, cls.server.redirects = {}, [], {}
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.documents.clear()
+        self.server.requests.clear()
+        self.server.redirects.clear()
+
+
+class FetchJsonLdContextsTests(ContextServerTestCase):
+    """fetch_jsonld_contexts against a local stand-in for context hosts."""
+
+    def setUp(self):
+        super().setUp()
+        self.stale = JsonLdDocument.objects.intern({'@context': {'stale': True}})
+        self.urls = [f'{self.base}/contexts/{n}' for n in range(3)]
+        for n in range(3):
+            org = Organization.objects.create(name=f'Context Org {n}')
+            for url in self.urls:
+                JsonLdContext.objects.create(organization=org, url=url, content=self.stale)
+        for n, url in enumerate(self.urls):
+            self.server.documents[f'/contexts/{n}'] = {'@context': {'term': f'https://example.org/{n}'}}
+
+    def _run(self, **options):
+        options.setdefault('allow_private_hosts', True)
+        out, err = StringIO(), StringIO()
+        call_command('fetch_jsonld_contexts', retries=0, timeout=5, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_fetches_fans_out_and_revalidates(self):
+        out, _ = self._run()
+
+        self.assertIn('3 changed, 0 unchanged, 0 failed; 9 organization contexts updated', out)
+        for n, url in enumerate(self.urls):
+            source = JsonLdContextSource.objects.get(url=url)
+            self.assertEqual(
+                set(JsonLdContext.objects.filter(url=url).values_list('content_id', flat=True)), {source.content_id},
+            )
+            self.assertEqual(source.content.document, self.server.documents[f'/contexts/{n}'])
+            self.assertTrue(source.etag)
+        self.assertTrue(all(inm is None for _, inm in self.server.requests))
+
+        # Second run sends the stored ETags and gets 304s back
+        self.server.requests.clear()
+        out, _ = self._run()
+        self.assertIn('0 changed, 3 unchanged, 0 failed; 0 organization contexts updated', out)
+        self.assertTrue(all(inm for _, inm in self.server.requests))
+
+        # A changed upstream document reaches every organization in one pass
+        self.server.documents['/contexts/1'] = {'@context': {'term': 'https://example.org/new'}}
+        out, _ = self._run()
+        self.assertIn('1 changed, 2 unchanged, 0 failed; 3 organization contexts updated', out)
+        new_content = JsonLdContextSource.objects.get(url=self.urls[1]).content
+        self.assertEqual(new_content.document, {'@context': {'term': 'https://example.org/new'}})
+        self.assertEqual(JsonLdContext.objects.filter(url=self.urls[1], content=new_content).count(), 3)
+
+    def test_failed_fetch_keeps_existing_documents(self):
+        del self.server.documents['/contexts/2']
+
+        _, err = self._run()
+
+        self.assertIn('HTTP 404', err)
+        source = JsonLdContextSource.objects.get(url=self.urls[2])
+        self.assertIn('HTTP 404', source.last_error)
+        self.assertIsNone(source.content)
+        self.assertEqual(
+            set(JsonLdContext.objects.filter(url=self.urls[2]).values_list('content_id', flat=True)),
+            {self.stale.content_hash},
+        )
+
+    def test_private_hosts_are_not_fetched(self):
+        _, err = self._run(allow_private_hosts=False)
+
+        self.assertEqual(self.server.requests, [])
+        for url in self.urls:
+            self.assertIn('non-public address 127.0.0.1', JsonLdContextSource.objects.get(url=url).last_error)
+        self.assertIn('non-public address', err)
+
+    def test_redirects_are_checked_hop_by_hop(self):
+        fetcher = ContextFetcher(retries=0, timeout=5, allow_private_hosts=True)
+        self.addCleanup(fetcher.close)
+        self.server.redirects['/moved'] = '/contexts/0'
+        result = fetcher.fetch(f'{self.base}/moved')
+        self.assertEqual((result.outcome, result.document), (FETCHED, self.server.documents['/contexts/0']))
+
+        # A public host redirecting to a private one is refused at the second hop
+        public = ContextFetcher(retries=0, timeout=5)
+        self.addCleanup(public.close)
+        redirect = mock.Mock(is_redirect=True, headers={'Location': f'{self.base}/contexts/0'})
+        with mock.patch('organization.context_fetcher.check_public_host', side_effect=[None, DIDResolutionError('private')]), \
+                mock.patch.object(public.session, 'get', return_value=redirect) as get:
+            result = public.fetch('https://contexts.example/moved')
+        self.assertEqual(result.outcome, FAILED)
+        self.assertIn('private', result.error)
+        get.assert_called_once_with('https://contexts.example/moved', headers={}, timeout=5, allow_redirects=False)
+
+
+class ContextClosureTests(ContextServerTestCase):
+    """build_context_closures follows @context, @import and scoped contexts."""
+
+    def setUp(self):
+        super().setUp()
+        self.org = Organization.objects.create(name='Closure Org')
+        b = self.base
+        self.server.documents.update({
+            '/a': {'@context': {'@import': f'{b}/b', 'Thing': {'@id': 'ex:Thing', '@context': f'{b}/c'}}},
+            '/b': {'@context': [f'{b}/d', {'term': 'ex:term'}]},
+            '/c': {'@context': {'scoped': 'ex:scoped'}},
+            '/d': {'@context': {'d': 'ex:d', 'loop': {'@id': 'ex:loop', '@context': f'{b}/a'}}},
+        })
+        credential_context = {'@context': ['https://www.w3.org/2018/credentials/v1', f'{b}/a']}
+        JsonLdContext.objects.create(
+            organization=self.org, url=f'{b}/credential',
+            content=JsonLdDocument.objects.intern(credential_context),
+        )
+
+    def _run(self, **options):
+        options.setdefault('allow_private_hosts', True)
+        out, err = StringIO(), StringIO()
+        call_command('build_context_closures', retries=0, timeout=5, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_stores_transitive_dependencies(self):
+        # The W3C context is already held on the server, so it is located rather than fetched
+        w3c = 'https://www.w3.org/2018/credentials/v1'
+        JsonLdContextSource.objects.create(url=w3c, content=JsonLdDocument.objects.intern({'@context': {'w3c': 1}}))
+
+        out, err = self._run()
+
+        self.assertIn('5 added', out)
+        self.assertEqual(err, '')
+        dependencies = dict(
+            JsonLdContext.objects.filter(organization=self.org, origin='DEPENDENCY').values_list('url', 'content_id')
+        )
+        self.assertEqual(set(dependencies), {w3c} | {f'{self.base}/{p}' for p in 'abcd'})
+        self.assertEqual(sorted(path for path, _ in self.server.requests), ['/a', '/b', '/c', '/d'])
+        self.org.refresh_from_db()
+        self.assertEqual(self.org.missing_context_urls, [])
+
+        # Rebuilding locally is a no-op; dropping the import removes dependencies that are no longer reachable
+        self.server.requests.clear()
+        out, _ = self._run(no_fetch=True)
+        self.assertIn('0 added, 0 updated, 0 removed', out)
+        self.assertEqual(self.server.requests, [])
+        uploaded = JsonLdContext.objects.filter(url=f'{self.base}/credential')
+        old_body = uploaded.get().content_id
+        uploaded.update(content=JsonLdDocument.objects.intern({'@context': [w3c]}))
+        out, _ = self._run(no_fetch=True)
+        self.assertIn('0 added, 0 updated, 4 removed', out)
+        # The replaced upload body is deleted; fetched bodies are still held by their sources
+        self.assertIn('Deleted 1 unreferenced JSON-LD document(s)', out)
+        self.assertFalse(JsonLdDocument.objects.filter(content_hash=old_body).exists())
+        self.assertEqual(JsonLdDocument.objects.filter(content_hash__in=dependencies.values()).count(), 5)
+
+        # Once a dependency's source is gone, the run that drops it also collects its body
+        JsonLdContextSource.objects.filter(url=w3c).delete()
+        uploaded.update(content=JsonLdDocument.objects.intern({'@context': {'local': 'ex:local'}}))
+        out, _ = self._run(no_fetch=True)
+        self.assertIn('0 added, 0 updated, 1 removed', out)
+        self.assertFalse(JsonLdDocument.objects.filter(content_hash=dependencies[w3c]).exists())
+
+    def test_shared_body_survives_one_organization_detaching(self):
+        other = Organization.objects.create(name='Other Closure Org')
+        body = {'@context': {'shared': 'ex:shared'}}
+        for org in (self.org, other):
+            JsonLdContext.objects.create(organization=org, url=f'{self.base}/shared', content=JsonLdDocument.objects.intern(body))
+        [shared] = JsonLdDocument.objects.filter(contexts__organization=other).distinct()
+        self.assertEqual(JsonLdDocument.objects.filter(contexts__url=f'{self.base}/shared').distinct().count(), 1)
+
+        JsonLdContext.objects.filter(organization=self.org, url=f'{self.base}/shared').delete()
+        # A rebuild inside a request never collects
+        build_context_closure(self.org)
+        self.assertTrue(JsonLdDocument.objects.filter(pk=shared.pk).exists())
+        self._run(no_fetch=True)
+        self.assertTrue(JsonLdDocument.objects.filter(pk=shared.pk).exists())
+        self.assertEqual(JsonLdContext.objects.get(organization=other, url=f'{self.base}/shared').content_id, shared.pk)
+
+        JsonLdContext.objects.filter(organization=other).delete()
+        self._run(no_fetch=True)
+        self.assertFalse(JsonLdDocument.objects.filter(pk=shared.pk).exists())
+
+    def test_collection_skips_bodies_referenced_meanwhile(self):
+        orphan = JsonLdDocument.objects.intern({'@context': {'orphan': 'ex:orphan'}})
+        real_filter = JsonLdDocument.objects.filter
+
+        def filter_then_reference(*args, **kwargs):
+            # Another request re-references the body between the scan and the delete
+            if kwargs.get('content_hash') == orphan.pk:
+                JsonLdContext.objects.get_or_create(organization=self.org, url=f'{self.base}/orphan', content=orphan)
+            return real_filter(*args, **kwargs)
+
+        with mock.patch.object(JsonLdDocument.objects, 'filter', side_effect=filter_then_reference):
+            self.assertEqual(JsonLdDocument.objects.delete_unreferenced(), 0)
+        self.assertTrue(JsonLdDocument.objects.filter(pk=orphan.pk).exists())
+
+    def test_private_references_are_not_fetched(self):
+        _, err = self._run(allow_private_hosts=False)
+
+        self.assertEqual(self.server.requests, [])
+        self.org.refresh_from_db()
+        self.assertIn(f'{self.base}/a', self.org.missing_context_urls)
+        self.assertIn('could not locate', err)
+
+    @override_settings(SECURE_SSL_REDIRECT=False)
+    def test_upload_only_uses_documents_on_the_server(self):
+        admin = User.objects.create_user(username='closure-admin')
+        OrganizationMember.objects.create(user=admin, organization=self.org, role='ADMIN')
+        client = APIClient()
+        client.force_authenticate(admin)
+        with mock.patch.object(ContextFetcher, 'fetch_many') as fetch_many:
+            response = client.post('/organization/api/contexts/upsert/', {
+                'organization_id': str(self.org.id), 'url': f'{self.base}/uploaded',
+                'document': {'@context': {'@import': f'{self.base}/c'}},
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        fetch_many.assert_not_called()
+        self.assertEqual(self.server.requests, [])
+        self.org.refresh_from_db()
+        self.assertIn(f'{self.base}/c', self.org.missing_context_urls)
+
+    def test_unreachable_dependencies_are_reported(self):
+        out, err = self._run(no_fetch=True)
+
+        self.assertIn('0 added', out)
+        self.org.refresh_from_db()
+        self.assertEqual(self.org.missing_context_urls, ['https://www.w3.org/2018/credentials/v1', f'{self.base}/a'])
+        self.assertIn('could not locate', err)
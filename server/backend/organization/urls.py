@@ -12,17 +12,30 @@ urlpatterns = [
     path('api/register/', views.RegisterOrganizationView.as_view(), name='organization-register'),
     path('api/confirm/', views.ConfirmOrganizationRegistrationView.as_view(), name='organization-confirm'),
 
+    # Offline bundle (contexts + public keys + status lists)
+    path('api/offline-bundle/', views.OrganizationOfflineBundleView.as_view(), name='organization-offline-bundle'),
+    path('api/changes/', views.OrganizationChangesView.as_view(), name='organization-changes'),
+    path('api/changes/stream/', views.OrganizationChangeStreamView.as_view(), name='organization-change-stream'),
+
     # Contexts
     path('api/contexts/', views.OrganizationContextsView.as_view(), name='organization-contexts'),
     path('api/contexts/upsert/', views.OrganizationContextUpsertView.as_view(), name='organization-contexts-upsert'),
+    path('api/contexts/documents/<str:content_hash>/', views.OrganizationContextDocumentView.as_view(), name='organization-context-document'),
 
     # Public keys
     path('api/public-keys/', views.OrganizationPublicKeysView.as_view(), name='organization-public-keys'),
     path('api/public-keys/upsert/', views.OrganizationPublicKeyUpsertView.as_view(), name='organization-public-keys-upsert'),
+    path('api/public-keys/lookup/', views.OrganizationPublicKeyLookupView.as_view(), name='organization-public-keys-lookup'),
+    path('api/public-keys/index-stats/', views.PublicKeyIndexStatsView.as_view(), name='organization-public-keys-index-stats'),
+    path('api/public-keys/import/', views.OrganizationPublicKeyImportView.as_view(), name='organization-public-keys-import'),
     path('api/public-keys/<path:key_id>/', views.OrganizationPublicKeyDetailView.as_view(), name='organization-public-key-detail'),
 
     # Status list credential operations
     path('api/status-list-credentials/', views.StatusListCredentialListView.as_view(), name='status-list-credentials'),
     path('api/status-list-credentials/upsert/', views.StatusListCredentialUpsertView.as_view(), name='status-list-credentials-upsert'),
+    path('api/status-list-credentials/batch-upsert/', views.StatusListCredentialBatchUpsertView.as_view(), name='status-list-credentials-batch-upsert'),
+    path('api/status-list-credentials/apply-operations/', views.StatusListIndexOperationsView.as_view(), name='status-list-credentials-apply-operations'),
     path('api/status-list-credentials/manifest/', views.StatusListCredentialManifestView.as_view(), name='status-list-credentials-manifest'),
+    path('api/status-list-credentials/download/', views.StatusListCredentialDownloadView.as_view(), name='status-list-credentials-download'),
+    path('api/status-list-credentials/stats/', views.StatusListCredentialStatsView.as_view(), name='status-list-credentials-stats'),
 ]
@@ -1,12 +1,30 @@
 # server/organization/views.py
 from django.shortcuts import render
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework.views import APIView
 from django.db import transaction
-from .models import Organization, OrganizationDID, PublicKey, StatusListCredential
+from django.db.models import F
+from .models import Organization, OrganizationDID, PublicKey, StatusListCredential, StatusListCredentialHistory
 from .permissions import IsOrganizationAdmin, IsOrganizationAdminFromMembership
-from .models import JsonLdContext
+from .change_stream import broadcaster as change_broadcaster
+from .context_closure import build_context_closure
+from .key_index import key_index
+from .key_material import InvalidKeyMaterial, normalize_key_material
+from .memberships import (
+    ADMIN_OR_OWNER_ROLES, admin_organization_id, default_organization_id, is_organization_admin, membership_role,
+)
+from .offline_bundle import (
+    ENCODED_BODIES as ENCODED_BUNDLE_BODIES, SECTION_KEYS as BUNDLE_SECTION_KEYS, SECTIONS as BUNDLE_SECTIONS,
+    brotli as bundle_brotli, build_offline_bundle, load_offline_bundle, section_items,
+)
+from .models import JsonLdContext, JsonLdDocument, OrganizationChange
 from .serializers import JsonLdContextSerializer
 
 from .serializers import (
@@ -18,15 +36,31 @@ from .serializers import (
     OrganizationLoginSerializer,
     StatusListCredentialSerializer,
     StatusListCredentialUpsertSerializer,
+    StatusListCredentialBatchUpsertSerializer,
+    StatusListIndexOperationsSerializer,
+    PublicKeyImportSerializer,
     StatusListCredentialListResponseSerializer,
 )
-from worker.models import OrganizationMember
+from api.tokens import JWTClaimsAuthentication
 from rest_framework.permissions import IsAuthenticated
 import re
-from datetime import datetime
+from datetime import datetime, timezone as dt_timezone
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
 from django.core.exceptions import ValidationError
 from urllib.parse import unquote
 import json
+import uuid
+
+
+# Hot read endpoints authorize from the token's membership claims, without loading the user
+CLAIMS_AUTHENTICATION = [JWTClaimsAuthentication, SessionAuthentication]
+
+
+def _split_csv(value):
+    return [part.strip() for part in (value or '').split(',') if part.strip()]
 
 
 class RegisterOrganizationView(APIView):
@@ -61,46 +95,122 @@ class ConfirmOrganizationRegistrationView(APIView):
 
 
 class OrganizationPublicKeysView(APIView):
-    """Return active public keys for the requesting user's organization."""
+    """Return active public keys for the requesting user's organization.
+    Clients pass the last seen ``keys_changed_at`` as ``since`` (ISO 8601), the
+    ETag as If-None-Match, or If-Modified-Since, and get 304 when the key set
+    has not changed.
+    """
+    authentication_classes = CLAIMS_AUTHENTICATION
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        requested_org_id = request.query_params.get('organization_id')
         did = request.query_params.get('did')
 
-        members = OrganizationMember.objects.select_related('organization').filter(user=request.user)
-        if not members.exists():
-            return Response({'detail': 'No organization membership found for user'}, status=status.HTTP_403_FORBIDDEN)
-
-        member_org_ids = {str(m.organization_id) for m in members}
-
-        if requested_org_id:
-            if requested_org_id not in member_org_ids:
-                return Response({'detail': 'You do not have access to this organization'}, status=status.HTTP_403_FORBIDDEN)
-            org_id = requested_org_id
-        else:
-            # Default to the first organization the user belongs to
-            org_id = next(iter(member_org_ids))
+        org_id, error = _member_organization_id(request)
+        if error:
+            return error
 
         try:
             org = Organization.objects.get(id=org_id)
         except Organization.DoesNotExist:
             return Response({'detail': 'Organization not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        qs = PublicKey.objects.filter(organization=org, is_active=True)
+        changed_at = org.keys_changed_at
+        # keys_changed_at to the microsecond, so two changes within one second get different tags
+        etag = f'"keys-{changed_at.timestamp():.6f}"' if changed_at else None
+        not_modified = False
+        since = request.query_params.get('since')
+        if_none_match = [t.strip().removeprefix('W/') for t in request.headers.get('If-None-Match', '').split(',')]
+        if since:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                since = None
+            if since is None:
+                return Response({'detail': 'since must be an ISO 8601 timestamp'}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since, dt_timezone.utc)
+            not_modified = changed_at is not None and changed_at <= since
+        elif any(if_none_match):
+            not_modified = etag is not None and etag in if_none_match
+        elif request.headers.get('If-Modified-Since'):
+            ims = parse_http_date_safe(request.headers['If-Modified-Since'])
+            # HTTP dates drop the sub-second part, so a change later in the same
+            # second as If-Modified-Since cannot be ruled out; only a change in an
+            # earlier second is known to be unmodified.
+            not_modified = ims is not None and changed_at is not None and changed_at.timestamp() < ims
+        if not_modified:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['Last-Modified'] = http_date(changed_at.timestamp())
+            response['ETag'] = etag
+            return response
+
+        qs = PublicKey.objects.usable().filter(organization=org)
         if did:
             qs = qs.filter(controller=did)
 
         keys = list(qs.values(
-            'id', 'key_id', 'key_type', 'public_key_multibase', 'public_key_hex', 'public_key_jwk',
+            'id', 'key_id', 'key_type', 'algorithm', 'public_key_multibase', 'public_key_hex', 'public_key_jwk',
             'controller', 'purpose', 'created_at', 'expires_at', 'revoked_at', 'revocation_reason', 'is_active'
         ))
         payload = {
             'organization_id': str(org.id),
             'did': did,
+            'keys_changed_at': changed_at,
             'keys': keys,
         }
-        return Response(payload, status=status.HTTP_200_OK)
+        response = Response(payload, status=status.HTTP_200_OK)
+        if changed_at:
+            response['Last-Modified'] = http_date(changed_at.timestamp())
+            response['ETag'] = etag
+        return response
+
+
+class OrganizationPublicKeyLookupView(APIView):
+    """Exact-match key lookup served from the per-process key index.
+    Query params:
+      - organization_id: UUID (must be one of the user's organizations)
+      - key_id: verificationMethod URL, or
+      - controller: DID whose active keys to return
+    With a claims-bearing token this is served without any database query.
+    """
+    authentication_classes = CLAIMS_AUTHENTICATION
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        org_id = request.query_params.get('organization_id')
+        key_id = request.query_params.get('key_id')
+        controller = request.query_params.get('controller')
+        if not org_id:
+            return Response({'detail': 'organization_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if bool(key_id) == bool(controller):
+            return Response({'detail': 'Provide exactly one of key_id or controller'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            uuid.UUID(org_id)
+        except ValueError:
+            return Response({'detail': 'Invalid organization_id'}, status=status.HTTP_400_BAD_REQUEST)
+        org_id, error = _member_organization_id(request)
+        if error:
+            return error
+
+        if key_id:
+            key = key_index.get_by_key_id(org_id, key_id)
+            if key is None:
+                return Response({'detail': 'Public key not found'}, status=status.HTTP_404_NOT_FOUND)
+            return Response({'organization_id': org_id, 'key': key}, status=status.HTTP_200_OK)
+        return Response({
+            'organization_id': org_id,
+            'controller': controller,
+            'keys': key_index.get_by_controller(org_id, controller),
+        }, status=status.HTTP_200_OK)
+
+
+class PublicKeyIndexStatsView(APIView):
+    """Hit/miss counters of this process's key index (staff only)."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(key_index.stats(), status=status.HTTP_200_OK)
 
 
 class StatusListCredentialUpsertView(APIView):
@@ -117,9 +227,72 @@ class StatusListCredentialUpsertView(APIView):
         return Response(out, status=status.HTTP_201_CREATED if obj.version == 1 else status.HTTP_200_OK)
 
 
+class StatusListCredentialBatchUpsertView(APIView):
+    """Upsert many StatusList credentials in one transaction.
+    Body:
+      - organization_id: UUID
+      - status_list_credentials: list of BitstringStatusListCredential JSON objects
+    """
+    permission_classes = [permissions.IsAuthenticated, IsOrganizationAdmin]
+
+    def post(self, request, *args, **kwargs):
+        serializer = StatusListCredentialBatchUpsertSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        results = serializer.save()
+        summary = {'created': 0, 'unchanged': 0, 'bumped': 0}
+        for item in results:
+            summary[item['result']] += 1
+        return Response({
+            'organization_id': str(serializer.validated_data['organization'].id),
+            'results': results,
+            'summary': summary,
+        }, status=status.HTTP_200_OK)
+
+
+class StatusListIndexOperationsView(APIView):
+    """Set/clear indices of a stored status list and return the re-encoded list for re-signing.
+    Body:
+      - organization_id: UUID
+      - status_list_id: stable id of an existing status list
+      - purpose: one of the list's status purposes
+      - set / clear: lists of bit indices
+    The signed credential stays current. The result is kept as an unsigned
+    pending draft (``pending_credential`` in the response); uploading the
+    issuer-signed list through the upsert endpoints makes it the next version.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsOrganizationAdmin]
+
+    def post(self, request, *args, **kwargs):
+        serializer = StatusListIndexOperationsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        obj, stats = serializer.save()
+        return Response({
+            'status_list_id': obj.status_list_id,
+            'result': 'pending' if stats else 'unchanged',
+            'version': obj.version,
+            'encoded_list_hash': obj.encoded_list_hash,
+            'pending_encoded_list_hash': obj.pending_encoded_list_hash,
+            'pending_credential': obj.pending_credential,
+            'bit_length': stats['bit_length'] if stats else obj.bit_length,
+            'set_bit_count': stats['set_bit_count'] if stats else None,
+            'changed_bit_count': stats['changed_bit_count'] if stats else 0,
+        }, status=status.HTTP_200_OK)
+
+
 class StatusListCredentialListView(APIView):
-    """List latest status list credentials for an organization."""
+    """List latest status list credentials for an organization.
+
+    The (potentially multi-megabyte) ``full_credential`` payload is omitted
+    unless requested with ``include=full_credential``; ``fields=a,b`` selects a
+    sparse fieldset. Only the selected columns are read from the database.
+    """
+    authentication_classes = CLAIMS_AUTHENTICATION
     permission_classes = [permissions.IsAuthenticated]
+    default_fields = [
+        f for f in StatusListCredentialSerializer.Meta.fields if f != 'full_credential'
+    ]
 
     def get(self, request, *args, **kwargs):
         org_id = request.query_params.get('organization_id')
@@ -129,13 +302,61 @@ class StatusListCredentialListView(APIView):
             org = Organization.objects.get(id=org_id)
         except Organization.DoesNotExist:
             return Response({'detail': 'Organization not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        fields = _split_csv(request.query_params.get('fields')) or list(self.default_fields)
+        for extra in _split_csv(request.query_params.get('include')):
+            if extra not in fields:
+                fields.append(extra)
+        unknown = [f for f in fields if f not in StatusListCredentialSerializer.Meta.fields]
+        if unknown:
+            return Response({'detail': f"Unknown field(s): {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+
         qs = StatusListCredential.objects.filter(organization=org).order_by('status_list_id')
-        data = StatusListCredentialSerializer(qs, many=True).data
+        data = list(qs.values(*fields))
         return Response({'organization_id': org_id, 'status_list_credentials': data}, status=status.HTTP_200_OK)
 
 
+class StatusListCredentialDownloadView(APIView):
+    """Stream a single status list credential document.
+    Query params: organization_id, status_list_id
+    A matching If-None-Match is answered with 304.
+    """
+    authentication_classes = CLAIMS_AUTHENTICATION
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        org_id = request.query_params.get('organization_id')
+        status_list_id = request.query_params.get('status_list_id')
+        if not org_id or not status_list_id:
+            return Response({'detail': 'organization_id and status_list_id are required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            uuid.UUID(org_id)
+        except ValueError:
+            return Response({'detail': 'Invalid organization_id'}, status=status.HTTP_400_BAD_REQUEST)
+        rows = StatusListCredential.objects.filter(organization_id=org_id, status_list_id=status_list_id)
+        if_none_match = [t.strip().removeprefix('W/') for t in request.headers.get('If-None-Match', '').split(',')]
+        if any(if_none_match):
+            # Revalidation: compare versions without loading the credential payload
+            row = rows.values('version', 'encoded_list_hash').first()
+            if row is not None:
+                etag = f'"{row["encoded_list_hash"]}-v{row["version"]}"'
+                if etag in if_none_match or '*' in if_none_match:
+                    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                    response['ETag'] = etag
+                    return response
+        row = rows.values('full_credential', 'version', 'encoded_list_hash').first()
+        if row is None:
+            return Response({'detail': 'StatusList credential not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        chunks = json.JSONEncoder(separators=(',', ':')).iterencode(row['full_credential'])
+        response = StreamingHttpResponse((chunk.encode('utf-8') for chunk in chunks), content_type='application/json')
+        response['ETag'] = f'"{row["encoded_list_hash"]}-v{row["version"]}"'
+        return response
+
+
 class StatusListCredentialManifestView(APIView):
     """Lightweight manifest for sync (id, purposes, version, hash, updated)."""
+    authentication_classes = CLAIMS_AUTHENTICATION
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
@@ -147,11 +368,68 @@ class StatusListCredentialManifestView(APIView):
         except Organization.DoesNotExist:
             return Response({'detail': 'Organization not found'}, status=status.HTTP_404_NOT_FOUND)
         manifest = list(StatusListCredential.objects.filter(organization=org).values(
-            'status_list_id', 'purposes', 'version', 'encoded_list_hash', 'updated_at'
+            'status_list_id', 'purposes', 'version', 'encoded_list_hash',
+            'bit_length', 'set_bit_count', 'changed_bit_count', 'updated_at'
         ))
         return Response({'organization_id': org_id, 'manifest': manifest}, status=status.HTTP_200_OK)
 
 
+class StatusListCredentialStatsView(APIView):
+    """Dashboard statistics from counts precomputed at upsert time (no list decoding).
+    Query params: organization_id, optional status_list_id for per-version history.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    stat_fields = ('bit_length', 'set_bit_count', 'changed_bit_count')
+
+    def get(self, request, *args, **kwargs):
+        org_id = request.query_params.get('organization_id')
+        if not org_id:
+            return Response({'detail': 'organization_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            uuid.UUID(org_id)
+        except ValueError:
+            return Response({'detail': 'Invalid organization_id'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            org = Organization.objects.get(id=org_id)
+        except Organization.DoesNotExist:
+            return Response({'detail': 'Organization not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        qs = StatusListCredential.objects.filter(organization=org).order_by('status_list_id')
+        status_list_id = request.query_params.get('status_list_id')
+        if status_list_id:
+            qs = qs.filter(status_list_id=status_list_id)
+        rows = list(qs.values('id', 'status_list_id', 'purposes', 'version', 'updated_at', *self.stat_fields))
+
+        totals = {'lists': 0, 'bit_length': 0, 'set_bit_count': 0, 'by_purpose': {}}
+        for row in rows:
+            totals['lists'] += 1
+            totals['bit_length'] += row['bit_length'] or 0
+            totals['set_bit_count'] += row['set_bit_count'] or 0
+            for purpose in row['purposes'] or []:
+                bucket = totals['by_purpose'].setdefault(purpose, {'lists': 0, 'bit_length': 0, 'set_bit_count': 0})
+                bucket['lists'] += 1
+                bucket['bit_length'] += row['bit_length'] or 0
+                bucket['set_bit_count'] += row['set_bit_count'] or 0
+
+        payload = {'organization_id': org_id, 'totals': totals, 'status_lists': rows}
+        if status_list_id:
+            if not rows:
+                return Response({'detail': 'StatusList credential not found'}, status=status.HTTP_404_NOT_FOUND)
+            current = rows[0]
+            history = list(StatusListCredentialHistory.objects.filter(
+                status_list_current_id=current['id']
+            ).order_by('version').values('version', 'archived_at', *self.stat_fields))
+            history.append({
+                'version': current['version'],
+                'archived_at': None,
+                **{f: current[f] for f in self.stat_fields},
+            })
+            payload['versions'] = history
+        for row in rows:
+            row.pop('id')
+        return Response(payload, status=status.HTTP_200_OK)
+
+
 class OrganizationPublicKeyDetailView(APIView):
     """Delete a specific public key by key_id."""
     permission_classes = [permissions.IsAuthenticated, IsOrganizationAdminFromMembership]
@@ -162,59 +440,22 @@ class OrganizationPublicKeyDetailView(APIView):
             decoded_key_id = unquote(key_id)
             
             # Get the user's organization from their membership
-            org_member = OrganizationMember.objects.select_related('organization').get(
-                user=request.user, 
-                role__in=['ADMIN', 'OWNER']
-            )
-            org = org_member.organization
+            org_id = admin_organization_id(request, roles=ADMIN_OR_OWNER_ROLES)
+            if org_id is None:
+                return Response({'detail': 'You do not have permission to delete public keys'}, status=status.HTTP_403_FORBIDDEN)
             
             # Find the public key using the decoded key_id
-            public_key = PublicKey.objects.get(key_id=decoded_key_id, organization=org)
+            public_key = PublicKey.objects.get(key_id=decoded_key_id, organization_id=org_id)
             
             # Delete the public key
             public_key.delete()
             
             return Response({'message': 'Public key deleted successfully'}, status=status.HTTP_200_OK)
             
-        except OrganizationMember.DoesNotExist:
-            return Response({'detail': 'You do not have permission to delete public keys'}, status=status.HTTP_403_FORBIDDEN)
         except PublicKey.DoesNotExist:
             return Response({'detail': 'Public key not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'detail': f'Failed to delete public key: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-#                         key_id=k['key_id'],
-#                         defaults={
-#                             'organization': org,
-#                             'key_type': k.get('key_type', ''),
-#                             'public_key_multibase': k.get('public_key_multibase', ''),
-#                             'public_key_hex': k.get('public_key_hex'),
-#                             'public_key_jwk': k.get('public_key_jwk'),
-#                             'controller': k.get('controller', ''),
-#                             'purpose': k.get('purpose', 'assertion'),
-#                             'expires_at': k.get('expires_at'),
-#                             'revoked_at': k.get('revoked_at'),
-#                             'revocation_reason': k.get('revocation_reason'),
-#                             'is_active': k.get('is_active', True),
-#                         }
-#                     )
-#                 org_did.status = 'RESOLVED'
-#                 org_did.save(update_fields=['status'])
-#         except Exception as e:
-#             # Keep DID as submitted; client can retry resolve later
-#             return Response({
-#                 'id': str(org_did.id),
-#                 'organization_id': str(org.id),
-#                 'did': org_did.did,
-#                 'status': org_did.status,
-#                 'message': f'DID stored but resolution failed: {e}'
-#             }, status=status.HTTP_202_ACCEPTED)
-
-#         return Response({
-#             'id': str(org_did.id),
-#             'organization_id': str(org.id),
-#             'did': org_did.did,
-#             'status': org_did.status,
-#         }, status=status.HTTP_201_CREATED)
 
 
 # class OrganizationPublicKeysView(APIView):
@@ -261,8 +502,272 @@ class OrganizationLoginView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _member_organization_id(request):
+    """(organization id, None) for the requested organization_id (or the user's first), else (None, 403 response).
+
+    Membership comes from the shared resolver: token claims, the membership
+    cache, or one query.
+    """
+    org_id = request.query_params.get('organization_id')
+    if org_id:
+        if membership_role(request, org_id) is None:
+            return None, Response({'detail': 'You do not have access to this organization'}, status=status.HTTP_403_FORBIDDEN)
+        return str(uuid.UUID(org_id)), None
+    org_id = default_organization_id(request)
+    if org_id is None:
+        return None, Response({'detail': 'No organization membership found for user'}, status=status.HTTP_403_FORBIDDEN)
+    return org_id, None
+
+
+def _accepted_encodings(header):
+    """Content codings a client accepts (q > 0) from an Accept-Encoding header."""
+    accepted = set()
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class OrganizationOfflineBundleView(APIView):
+    """Contexts, valid public keys and status list credentials for one organization in one response.
+
+    Query params: organization_id (defaults to the user's first organization),
+    ``manifest=contexts,status_list_credentials`` to leave out those sections'
+    bodies. The response carries per-section ``hashes`` and a ``bundle_hash``
+    ETag; a matching If-None-Match gets 304.
+
+    The full bundle is served from its materialized copy, brotli or gzip
+    encoded per Accept-Encoding, with a strong ETag per encoding.
+    """
+    authentication_classes = CLAIMS_AUTHENTICATION
+    permission_classes = [permissions.IsAuthenticated]
+    cache_control = 'private, no-cache'
+
+    def get(self, request, *args, **kwargs):
+        manifest = _split_csv(request.query_params.get('manifest'))
+        unknown = [s for s in manifest if s not in BUNDLE_SECTIONS]
+        if unknown:
+            return Response({'detail': f"Unknown section(s): {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        org_id, error = _member_organization_id(request)
+        if error:
+            return error
+        try:
+            return self._respond(request, Organization(pk=org_id), manifest)
+        except Organization.DoesNotExist:
+            return Response({'detail': 'Organization not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    def _respond(self, request, org, manifest):
+        if_none_match = [t.strip() for t in request.headers.get('If-None-Match', '').split(',') if t.strip()]
+
+        if manifest:
+            bundle = build_offline_bundle(org, manifest)
+            etag = f'"{bundle["bundle_hash"]}"'
+            if etag in if_none_match:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = Response(bundle, status=status.HTTP_200_OK)
+            response['ETag'] = etag
+            response['Cache-Control'] = self.cache_control
+            return response
+
+        accepted = _accepted_encodings(request.headers.get('Accept-Encoding'))
+        encoding = 'br' if 'br' in accepted and bundle_brotli is not None else 'gzip' if 'gzip' in accepted else None
+        # Any encoding's ETag identifies the same bundle, so revalidation skips loading a body
+        obj = load_offline_bundle(org, encoding, with_body=not if_none_match)
+        if any(tag.strip('"').split('-')[0] == obj.bundle_hash for tag in if_none_match):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            if if_none_match:
+                obj = load_offline_bundle(org, encoding)
+            body = getattr(obj, ENCODED_BUNDLE_BODIES[encoding])
+            if body is None:  # built before brotli was installed
+                encoding = 'gzip' if 'gzip' in accepted else None
+                obj = load_offline_bundle(org, encoding)
+                body = getattr(obj, ENCODED_BUNDLE_BODIES[encoding])
+            response = HttpResponse(bytes(body), content_type='application/json')
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = f'"{obj.bundle_hash}-{encoding}"' if encoding else f'"{obj.bundle_hash}"'
+        response['Cache-Control'] = self.cache_control
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+
+class OrganizationChangesView(APIView):
+    """Items of the offline bundle that changed after sequence number ``since``.
+
+    Query params: organization_id, since (the bundle's or previous response's
+    ``change_seq``), limit. Changed items are returned in their bundle shape
+    under ``changes``; items that no longer belong in the bundle (deleted,
+    deactivated, expired) are listed by key under ``deleted``. Clients resume
+    from ``change_seq`` while ``has_more`` is true. 410 means the log cannot
+    serve ``since`` and a full bundle download is needed.
+    """
+    authentication_classes = CLAIMS_AUTHENTICATION
+    permission_classes = [permissions.IsAuthenticated]
+    DEFAULT_LIMIT = 1000
+    MAX_LIMIT = 5000
+
+    def get(self, request, *args, **kwargs):
+        try:
+            since = int(request.query_params.get('since', ''))
+            limit = int(request.query_params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'detail': 'since and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if since < 0 or limit < 1:
+            return Response({'detail': 'since must be >= 0 and limit >= 1'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, self.MAX_LIMIT)
+
+        org_id, error = _member_organization_id(request)
+        if error:
+            return error
+        org = Organization.objects.filter(pk=org_id).only('id', 'change_seq').first()
+        if org is None:
+            return Response({'detail': 'Organization not found'}, status=status.HTTP_404_NOT_FOUND)
+        log = OrganizationChange.objects.filter(organization=org)
+        oldest = log.order_by('seq').values_list('seq', flat=True).first()
+        if since > org.change_seq or (oldest is not None and since < oldest - 1):
+            return Response(
+                {'detail': 'Change log cannot serve this sequence; download the full offline bundle', 'reset': True},
+                status=status.HTTP_410_GONE,
+            )
+
+        rows = list(log.filter(seq__gt=since).order_by('seq').values_list('seq', 'section', 'item_key')[:limit])
+        changed_keys = {section: set() for section in BUNDLE_SECTIONS}
+        for _, section, item_key in rows:
+            changed_keys[section].add(item_key)
+        changes, deleted = {}, {}
+        for section, keys in changed_keys.items():
+            items = section_items(org, section, keys=keys) if keys else []
+            present = {item[BUNDLE_SECTION_KEYS[section]] for item in items}
+            changes[section] = items
+            deleted[section] = sorted(keys - present)
+        change_seq = rows[-1][0] if rows else since
+        return Response({
+            'organization_id': str(org.id),
+            'since': since,
+            'change_seq': change_seq,
+            'has_more': change_seq < org.change_seq,
+            'changes': changes,
+            'deleted': deleted,
+        }, status=status.HTTP_200_OK)
+
+
+@sync_to_async
+def _stream_member_organization(request):
+    """The member organization (id and change_seq only) for plain (async) Django views, authenticating like the hot API views do."""
+    drf_request = Request(request, authenticators=[auth() for auth in CLAIMS_AUTHENTICATION])
+    try:
+        authenticated = drf_request.user.is_authenticated
+    except APIException as e:
+        return None, JsonResponse({'detail': str(e.detail)}, status=e.status_code)
+    if not authenticated:
+        return None, JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+    org_id, error = _member_organization_id(drf_request)
+    if error:
+        return None, JsonResponse(error.data, status=error.status_code)
+    org = Organization.objects.filter(pk=org_id).only('id', 'change_seq').first()
+    if org is None:
+        return None, JsonResponse({'detail': 'Organization not found'}, status=status.HTTP_404_NOT_FOUND)
+    return org, None
+
+
+class OrganizationChangeStreamView(View):
+    """Tell connected workers the moment their organization's offline bundle changes.
+
+    With ``Accept: text/event-stream`` this is a Server-Sent Events stream: a
+    ``change`` event (id and data carry the new ``change_seq``) each time the
+    sequence advances, and a comment every HEARTBEAT_SECONDS to keep proxies
+    from closing the connection. It resumes from Last-Event-ID or ``since``.
+    Otherwise it is a long poll: given ``since``, it answers as soon as
+    change_seq is past it, or after ``timeout`` seconds with ``changed: false``.
+    Either way clients then sync through the change feed.
+    """
+    HEARTBEAT_SECONDS = 15
+    RETRY_MILLISECONDS = 5000
+    DEFAULT_TIMEOUT = 25
+    MAX_TIMEOUT = 60
+
+    async def get(self, request, *args, **kwargs):
+        streaming = 'text/event-stream' in request.headers.get('Accept', '')
+        since = (request.headers.get('Last-Event-ID') if streaming else None) or request.GET.get('since')
+        try:
+            since = int(since) if since not in (None, '') else None
+            timeout = min(int(request.GET.get('timeout', self.DEFAULT_TIMEOUT)), self.MAX_TIMEOUT)
+        except ValueError:
+            return JsonResponse({'detail': 'since and timeout must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if since is None and not streaming:
+            return JsonResponse({'detail': 'since is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if (since is not None and since < 0) or timeout < 0:
+            return JsonResponse({'detail': 'since and timeout must be >= 0'}, status=status.HTTP_400_BAD_REQUEST)
+
+        org, error = await _stream_member_organization(request)
+        if error:
+            return error
+        if since is not None and since > org.change_seq:
+            return JsonResponse(
+                {'detail': 'since is ahead of the organization; download the full offline bundle', 'reset': True},
+                status=status.HTTP_410_GONE,
+            )
+        if since is None:
+            since = org.change_seq
+
+        if streaming:
+            response = StreamingHttpResponse(self._events(org, since), content_type='text/event-stream')
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'
+            return response
+
+        # Sync-only middleware runs around the view in a worker thread, so the
+        # waiting happens in the response body, on the event loop, not in the view
+        response = StreamingHttpResponse(self._poll(org, since, timeout), content_type='application/json')
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    async def _poll(self, org, since, timeout):
+        change_seq = org.change_seq
+        if change_seq <= since:
+            change_seq = await change_broadcaster.wait_for_change(org.pk, since, timeout) or since
+        yield json.dumps({
+            'organization_id': str(org.id),
+            'since': since,
+            'change_seq': change_seq,
+            'changed': change_seq > since,
+        })
+
+    async def _events(self, org, since):
+        yield f'retry: {self.RETRY_MILLISECONDS}\n\n'
+        change_seq = org.change_seq
+        while True:
+            if change_seq > since:
+                since = change_seq
+                data = json.dumps({'organization_id': str(org.id), 'change_seq': change_seq})
+                yield f'id: {change_seq}\nevent: change\ndata: {data}\n\n'
+            change_seq = await change_broadcaster.wait_for_change(org.pk, since, self.HEARTBEAT_SECONDS)
+            if change_seq is None:
+                change_seq = since
+                yield ': keepalive\n\n'
+
+
 class OrganizationContextsView(APIView):
-    """Return all JSON-LD contexts for a given organization."""
+    """Return all JSON-LD contexts for a given organization.
+
+    The list includes the DEPENDENCY contexts the uploaded ones import, so it
+    is the complete set a worker needs offline. Entries carry the
+    ``content_hash`` of their body; clients fetch bodies they do not already
+    have from ``contexts/documents/<hash>/``. Pass ``include=document`` to
+    inline the bodies instead.
+    """
+    authentication_classes = CLAIMS_AUTHENTICATION
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
@@ -274,9 +779,43 @@ class OrganizationContextsView(APIView):
         except Organization.DoesNotExist:
             return Response({'detail': 'Organization not found'}, status=status.HTTP_404_NOT_FOUND)
 
+        columns = {'content_hash': F('content_id'), 'size': F('content__size')}
+        if 'document' in _split_csv(request.query_params.get('include')):
+            columns['document'] = F('content__document')
         qs = JsonLdContext.objects.filter(organization=org).order_by('url')
-        serializer = JsonLdContextSerializer(qs, many=True)
-        return Response({'contexts': serializer.data}, status=status.HTTP_200_OK)
+        data = list(qs.values('id', 'organization', 'url', 'origin', 'created_at', 'updated_at', **columns))
+        return Response({
+            'contexts': data,
+            'missing_dependencies': org.missing_context_urls,
+        }, status=status.HTTP_200_OK)
+
+
+class OrganizationContextDocumentView(APIView):
+    """Serve a shared JSON-LD context body by content hash.
+
+    The body behind a hash never changes, so responses are cacheable forever
+    and revalidation with If-None-Match is answered with 304.
+    """
+    authentication_classes = CLAIMS_AUTHENTICATION
+    permission_classes = [permissions.IsAuthenticated]
+    cache_control = 'private, max-age=31536000, immutable'
+
+    def get(self, request, content_hash, *args, **kwargs):
+        etag = f'"{content_hash}"'
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in [t.strip().removeprefix('W/') for t in if_none_match.split(',')] or if_none_match.strip() == '*':
+            if JsonLdDocument.objects.filter(content_hash=content_hash).exists():
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = etag
+                response['Cache-Control'] = self.cache_control
+                return response
+        doc = JsonLdDocument.objects.filter(content_hash=content_hash).values_list('document', flat=True).first()
+        if doc is None:
+            return Response({'detail': 'Context document not found'}, status=status.HTTP_404_NOT_FOUND)
+        response = Response(doc, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        response['Cache-Control'] = self.cache_control
+        return response
 
 
 class OrganizationContextUpsertView(APIView):
@@ -320,18 +859,24 @@ class OrganizationContextUpsertView(APIView):
             return Response({'detail': 'Organization not found'}, status=status.HTTP_404_NOT_FOUND)
 
         try:
-            # Check if context already exists for this org+url
-            existing_context = JsonLdContext.objects.filter(organization=org, url=url).first()
-
-            if existing_context:
-                if existing_context.document != document:
-                    existing_context.document = document
-                    existing_context.save(update_fields=['document'])
-                obj = existing_context
-                created = False
-            else:
-                obj = JsonLdContext.objects.create(organization=org, url=url, document=document)
-                created = True
+            with transaction.atomic():
+                # Interned in the same transaction as the save, so the body cannot be collected in between
+                content = JsonLdDocument.objects.intern(document)
+                existing_context = JsonLdContext.objects.filter(organization=org, url=url).first()
+
+                if existing_context:
+                    if existing_context.content_id != content.content_hash or existing_context.origin != 'UPLOADED':
+                        existing_context.content = content
+                        existing_context.origin = 'UPLOADED'
+                        existing_context.save(update_fields=['content', 'origin', 'updated_at'])
+                    obj = existing_context
+                    created = False
+                else:
+                    obj = JsonLdContext.objects.create(organization=org, url=url, content=content)
+                    created = True
+            # Pull in imported contexts the server already holds. No fetcher: a write request never
+            # reaches out to admin-supplied URLs; build_context_closures fetches the rest
+            build_context_closure(org, fetcher=None)
 
             # Return the context data
             out = JsonLdContextSerializer(obj).data
@@ -350,7 +895,8 @@ class OrganizationPublicKeyUpsertView(APIView):
       - key_id: string (verification method or DID#fragment)
       - controller: string DID (without fragment)
       - key_type: string (e.g., Ed25519VerificationKey2020)
-      - public_key_multibase/public_key_hex/public_key_jwk: optional
+      - public_key_multibase/public_key_hex/public_key_jwk/public_key_pem: at least one; multibase,
+        hex and JWK are derived from it and stored, malformed keys are rejected with 400
       - purpose: default 'assertion'
       - is_active: default True
     """
@@ -365,6 +911,7 @@ class OrganizationPublicKeyUpsertView(APIView):
         public_key_multibase = data.get('public_key_multibase') or ''
         public_key_hex = data.get('public_key_hex')
         public_key_jwk = data.get('public_key_jwk')
+        public_key_pem = data.get('public_key_pem')
         purpose = data.get('purpose') or 'assertion'
         is_active = bool(data.get('is_active', True))
 
@@ -378,6 +925,11 @@ class OrganizationPublicKeyUpsertView(APIView):
         except Organization.DoesNotExist:
             return Response({'detail': 'Organization not found'}, status=status.HTTP_404_NOT_FOUND)
 
+        try:
+            material = normalize_key_material(key_type, public_key_multibase, public_key_hex, public_key_jwk, public_key_pem)
+        except InvalidKeyMaterial as e:
+            return Response({'detail': f'Invalid key material: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             with transaction.atomic():
                 pk_obj, created = PublicKey.objects.update_or_create(
@@ -385,9 +937,7 @@ class OrganizationPublicKeyUpsertView(APIView):
                     key_id=key_id,
                     defaults={
                         'key_type': key_type,
-                        'public_key_multibase': public_key_multibase,
-                        'public_key_hex': public_key_hex,
-                        'public_key_jwk': public_key_jwk,
+                        **material,
                         'controller': controller,
                         'purpose': purpose,
                         'is_active': is_active,
@@ -399,8 +949,10 @@ class OrganizationPublicKeyUpsertView(APIView):
                 'organization_id': str(org.id),
                 'key_id': pk_obj.key_id,
                 'key_type': pk_obj.key_type,
+                'algorithm': pk_obj.algorithm,
                 'public_key_multibase': pk_obj.public_key_multibase,
                 'public_key_hex': pk_obj.public_key_hex,
+                'public_key_jwk': pk_obj.public_key_jwk,
                 'controller': pk_obj.controller,
                 'purpose': pk_obj.purpose,
                 'is_active': pk_obj.is_active,
@@ -415,6 +967,31 @@ class OrganizationPublicKeyUpsertView(APIView):
             )
 
 
+class OrganizationPublicKeyImportView(APIView):
+    """
+    Import all keys of a DID document or JWKS in one transaction.
+    Body:
+      - organization_id: UUID
+      - did_document: DID document JSON, or
+      - jwks: {"keys": [...]} plus controller: DID owning the keys
+    """
+    permission_classes = [permissions.IsAuthenticated, IsOrganizationAdmin]
+
+    def post(self, request, *args, **kwargs):
+        serializer = PublicKeyImportSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        results = serializer.save()
+        summary = {'created': 0, 'updated': 0, 'unchanged': 0}
+        for item in results:
+            summary[item['result']] += 1
+        return Response({
+            'organization_id': str(serializer.validated_data['organization'].id),
+            'results': results,
+            'summary': summary,
+        }, status=status.HTTP_201_CREATED if summary['created'] else status.HTTP_200_OK)
+
+
 # class OrganizationPublicKeysView(APIView):
 #     """Return active public keys for a given organization_id."""
 #     permission_classes = [permissions.IsAuthenticated, IsOrganizationAdmin]
@@ -436,58 +1013,6 @@ class OrganizationPublicKeyUpsertView(APIView):
 #         return Response({'organization_id': str(org.id), 'keys': keys}, status=status.HTTP_200_OK)
 
 
-# # --- DID resolution helpers (minimal, can be replaced by robust resolver) ---
-# did_web_pattern = re.compile(r"^did:web:([a-zA-Z0-9.-]+)(?::(.+))?$")
-
-
-# def resolve_did_keys(did: str):
-#     """Resolve DID to verification keys. Supports did:web minimally.
-#     Returns list of dicts with keys: key_id, key_type, public_key_multibase/hex/jwk, controller, purpose, ...
-#     """
-#     if did.startswith('did:web:'):
-#         if not requests:
-#             raise RuntimeError('requests not available for resolution')
-#         m = did_web_pattern.match(did)
-#         if not m:
-#             raise ValueError('Invalid did:web format')
-#         domain, path = m.groups()
-#         did_cfg_url = f"https://{domain}/.well-known/did.json" if not path else f"https://{domain}/{path.replace(':', '/')}/did.json"
-#         resp = requests.get(did_cfg_url, timeout=10)
-#         resp.raise_for_status()
-#         doc = resp.json()
-#         vm = doc.get('verificationMethod', [])
-#         assertion = set(ref if isinstance(ref, str) else ref.get('id') for ref in doc.get('assertionMethod', []) )
-#         keys = []
-#         for mth in vm:
-#             kid = mth.get('id')
-#             if not kid:
-#                 continue
-#             entry = {
-#                 'key_id': kid,
-#                 'key_type': mth.get('type', ''),
-#                 'public_key_multibase': mth.get('publicKeyMultibase', ''),
-#                 'public_key_hex': mth.get('publicKeyHex'),
-#                 'public_key_jwk': mth.get('publicKeyJwk'),
-#                 'controller': mth.get('controller', did),
-#                 'purpose': 'assertion' if kid in assertion else 'authentication',
-#                 'is_active': True,
-#             }
-#             keys.append(entry)
-#         return keys
-#     elif did.startswith('did:key:'):
-#         # Basic parsing for did:key: multibase. Full support would parse method-specific identifier.
-#         return [{
-#             'key_id': did + '#key-1',
-#             'key_type': 'Ed25519VerificationKey2020',
-#             'public_key_multibase': did.split('did:key:')[-1],
-#             'controller': did,
-#             'purpose': 'assertion',
-#             'is_active': True,
-#         }]
-#     else:
-#         raise ValueError('Unsupported DID method')
-
-
 class OrganizationStatusListCredentialsView(APIView):
     """Return all StatusList credentials for a given organization."""
     permission_classes = [permissions.IsAuthenticated]
@@ -529,13 +1054,7 @@ class OrganizationStatusListCredentialUpsertView(APIView):
         organization = serializer.validated_data['organization']
 
         # Check user permission for this organization
-        try:
-            org_member = OrganizationMember.objects.select_related('organization').get(
-                user=request.user,
-                organization_id=organization_id,
-                role__in=['ADMIN', 'OWNER']
-            )
-        except OrganizationMember.DoesNotExist:
+        if not is_organization_admin(request, organization_id, roles=ADMIN_OR_OWNER_ROLES):
             return Response({'detail': 'You do not have permission to manage StatusList credentials for this organization'}, 
                           status=status.HTTP_403_FORBIDDEN)
         
@@ -574,16 +1093,14 @@ class OrganizationStatusListCredentialDetailView(APIView):
             decoded_status_list_id = unquote(status_list_id)
             
             # Get the user's organization from their membership
-            org_member = OrganizationMember.objects.select_related('organization').get(
-                user=request.user, 
-                role__in=['ADMIN', 'OWNER']
-            )
-            org = org_member.organization
+            org_id = admin_organization_id(request, roles=ADMIN_OR_OWNER_ROLES)
+            if org_id is None:
+                return Response({'detail': 'You do not have permission to delete StatusList credentials'}, status=status.HTTP_403_FORBIDDEN)
             
             # Find the StatusList credential
             status_list_credential = StatusListCredential.objects.get(
                 status_list_id=decoded_status_list_id, 
-                organization=org
+                organization_id=org_id
             )
             
             # Delete the StatusList credential
@@ -591,8 +1108,6 @@ class OrganizationStatusListCredentialDetailView(APIView):
             
             return Response({'message': 'StatusList credential removed successfully'}, status=status.HTTP_200_OK)
             
-        except OrganizationMember.DoesNotExist:
-            return Response({'detail': 'You do not have permission to delete StatusList credentials'}, status=status.HTTP_403_FORBIDDEN)
         except StatusListCredential.DoesNotExist:
             return Response({'detail': 'StatusList credential not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
@@ -0,0 +1,138 @@
+# server/worker/google_id_token.py
+"""Verify Google ID tokens locally against cached signing certificates.
+
+Google signs ID tokens with rotating RSA keys and publishes their
+certificates at GOOGLE_OAUTH_CERTS_URL with a ``Cache-Control: max-age``.
+The certificates are fetched once and kept in memory for that long. Within
+``REFRESH_MARGIN`` of expiry, a background thread fetches the next set while
+logins keep verifying against the current one, so logins after the first
+make no outbound request. A token signed with an unknown key id triggers one
+synchronous refresh, at most every ``MIN_REFRESH_INTERVAL`` seconds, in case
+Google rotated early.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from urllib.request import urlopen
+
+from django.conf import settings
+from google.auth import exceptions as google_exceptions
+from google.auth import jwt as google_jwt
+
+logger = logging.getLogger(__name__)
+
+ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+DEFAULT_MAX_AGE = 3600
+REFRESH_MARGIN = 300
+MIN_REFRESH_INTERVAL = 30
+FETCH_TIMEOUT = 10
+CLOCK_SKEW_SECONDS = 10
+
+
+class InvalidGoogleToken(Exception):
+    pass
+
+
+def _max_age(cache_control):
+    match = re.search(r'max-age=(\d+)', cache_control or '')
+    return int(match.group(1)) if match else DEFAULT_MAX_AGE
+
+
+class GoogleCertificates:
+    """key id -> PEM certificate, refreshed as Cache-Control allows."""
+
+    def __init__(self):
+        self._certs = {}
+        self._expires_at = 0.0
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._stats = {'fetches': 0, 'background_fetches': 0, 'fetch_errors': 0}
+
+    def _fetch(self):
+        try:
+            with urlopen(settings.GOOGLE_OAUTH_CERTS_URL, timeout=FETCH_TIMEOUT) as resp:  # nosec B310 (external call intended)
+                certs = json.loads(resp.read().decode('utf-8'))
+                max_age = _max_age(resp.headers.get('Cache-Control'))
+        except Exception:
+            self._stats['fetch_errors'] += 1
+            raise
+        now = time.monotonic()
+        self._certs, self._expires_at, self._fetched_at = certs, now + max_age, now
+        self._stats['fetches'] += 1
+
+    def _needs_fetch(self, kid, now):
+        if not self._certs or now >= self._expires_at:
+            return True
+        return kid not in self._certs and now - self._fetched_at >= MIN_REFRESH_INTERVAL
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                with self._lock:
+                    self._stats['background_fetches'] += 1
+                    self._fetch()
+            except Exception:
+                logger.warning('Refreshing Google signing certificates failed', exc_info=True)
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='google-certs-refresh', daemon=True).start()
+
+    def get(self, kid=None):
+        """Certificates to verify a token signed with ``kid``; fetches only when none are usable."""
+        if self._needs_fetch(kid, time.monotonic()):
+            with self._lock:
+                # Another request may have fetched while this one waited
+                if self._needs_fetch(kid, time.monotonic()):
+                    self._fetch()
+        elif time.monotonic() >= self._expires_at - REFRESH_MARGIN:
+            self._refresh_in_background()
+        return self._certs
+
+    def clear(self):
+        with self._lock:
+            self._certs, self._expires_at, self._fetched_at = {}, 0.0, None
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats['keys'] = len(self._certs)
+        stats['expires_in'] = round(self._expires_at - time.monotonic(), 1) if self._certs else None
+        return stats
+
+
+google_certificates = GoogleCertificates()
+
+
+def verify_google_id_token(token, audience=None):
+    """Claims of a valid Google ID token for one of our client ids with a verified email.
+
+    Raises InvalidGoogleToken otherwise.
+    """
+    audience = audience or settings.GOOGLE_OAUTH_CLIENT_IDS
+    if not audience:
+        raise InvalidGoogleToken('Google sign-in is not configured')
+    try:
+        kid = google_jwt.decode_header(token).get('kid')
+    except (ValueError, google_exceptions.GoogleAuthError) as e:
+        raise InvalidGoogleToken(f'Malformed Google ID token: {e}')
+    try:
+        certs = google_certificates.get(kid)
+    except (OSError, ValueError) as e:
+        raise InvalidGoogleToken(f'Could not fetch Google signing keys: {e}')
+    try:
+        claims = google_jwt.decode(token, certs=certs, audience=audience, clock_skew_in_seconds=CLOCK_SKEW_SECONDS)
+    except (ValueError, google_exceptions.GoogleAuthError) as e:
+        raise InvalidGoogleToken(f'Invalid Google ID token: {e}')
+    if claims.get('iss') not in ISSUERS:
+        raise InvalidGoogleToken('Invalid Google ID token: wrong issuer')
+    if not claims.get('email') or not claims.get('email_verified'):
+        raise InvalidGoogleToken('Google account email is not verified')
+    return claims
@@ -0,0 +1,92 @@
+# server/worker/member_listing.py
+"""
+Stats, indexed search and keyset cursors for the organization users listing.
+
+``member_stats`` counts an organization's members by role and activity in one
+conditional aggregate and caches the result for settings.MEMBERSHIP_CACHE_SECONDS;
+worker signals drop the entry when members are saved or deleted, or a member's
+user is saved. Only a shared cache (REDIS_URL) carries the drop to other
+processes; otherwise they show the old counts until their entry expires. Queryset ``update()``/``delete()`` send no signals and must call
+``invalidate_member_stats`` themselves.
+
+Search runs against ``OrganizationMember.search_text`` (lower-cased username,
+email, full name and phone). Worker migration 0003 indexes it with a pg_trgm
+GIN index on PostgreSQL, so ``LIKE '%term%'`` is served by the index, and with
+an FTS5 trigram table kept in sync by triggers on SQLite. Trigram indexes need
+at least three characters; shorter terms fall back to a scan of the
+organization's members.
+"""
+import base64
+import binascii
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.expressions import RawSQL
+
+SQLITE_SEARCH_TABLE = 'worker_member_search'
+MIN_INDEXED_TERM = 3
+
+
+def _stats_key(organization_id):
+    return f'worker:member-stats:{organization_id}'
+
+
+def member_stats(organization_id) -> dict:
+    """Member counts for an organization: total, admins, users and active accounts."""
+    from .models import OrganizationMember
+
+    key = _stats_key(organization_id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = OrganizationMember.objects.filter(organization_id=organization_id).aggregate(
+            total_members=Count('id'),
+            admin_count=Count('id', filter=Q(role='ADMIN')),
+            user_count=Count('id', filter=Q(role='USER')),
+            active_members=Count('id', filter=Q(user__is_active=True)),
+        )
+        cache.set(key, stats, settings.MEMBERSHIP_CACHE_SECONDS)
+    return stats
+
+
+def invalidate_member_stats(organization_id):
+    """Forget an organization's cached stats now and once the current transaction commits."""
+    key = _stats_key(organization_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def search_filter(term):
+    """Q matching members whose username, email, full name or phone contains ``term``."""
+    term = term.strip().lower()
+    if connection.vendor == 'sqlite' and len(term) >= MIN_INDEXED_TERM:
+        # A quoted FTS5 phrase over the trigram tokenizer is a substring match
+        phrase = '"' + term.replace('"', '""') + '"'
+        return Q(id__in=RawSQL(
+            f'SELECT member_id FROM {SQLITE_SEARCH_TABLE} WHERE {SQLITE_SEARCH_TABLE} MATCH %s', [phrase],
+        ))
+    return Q(search_text__contains=term)
+
+
+def encode_cursor(member):
+    raw = f'{member.created_at.isoformat()}|{member.id.hex}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the ``(created_at, id)`` position encoded in ``cursor``; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, member_id = raw.split('|')
+        return datetime.fromisoformat(created_at), uuid.UUID(member_id)
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def after_cursor(cursor):
+    """Q for members listed after ``cursor`` in ``-created_at, -id`` order."""
+    created_at, member_id = decode_cursor(cursor)
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=member_id)
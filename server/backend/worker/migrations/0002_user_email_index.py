@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_user_emails(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserEmail = apps.get_model('worker', 'UserEmail')
+    batch = []
+    for user_id, email in User.objects.values_list('pk', 'email').iterator(chunk_size=2000):
+        batch.append(UserEmail(user_id=user_id, email=(email or '').strip().lower()))
+        if len(batch) >= 2000:
+            UserEmail.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        UserEmail.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('worker', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserEmail',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='email_index', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('email', models.CharField(db_index=True, max_length=254)),
+            ],
+        ),
+        migrations.RunPython(backfill_user_emails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+from organization.migration_operations import AddIndexConcurrently
+
+SQLITE_FORWARDS = [
+    # Standalone trigram FTS5 table keyed by member id (implicit rowids can change on VACUUM)
+    "CREATE VIRTUAL TABLE IF NOT EXISTS worker_member_search"
+    " USING fts5(member_id UNINDEXED, search_text, tokenize='trigram')",
+    "DELETE FROM worker_member_search",
+    "INSERT INTO worker_member_search (member_id, search_text)"
+    " SELECT id, search_text FROM worker_organizationmember",
+    "CREATE TRIGGER IF NOT EXISTS worker_member_search_ai AFTER INSERT ON worker_organizationmember BEGIN"
+    " INSERT INTO worker_member_search (member_id, search_text) VALUES (new.id, new.search_text); END",
+    "CREATE TRIGGER IF NOT EXISTS worker_member_search_ad AFTER DELETE ON worker_organizationmember BEGIN"
+    " DELETE FROM worker_member_search WHERE member_id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS worker_member_search_au AFTER UPDATE OF search_text ON worker_organizationmember"
+    " WHEN old.search_text IS NOT new.search_text BEGIN"
+    " DELETE FROM worker_member_search WHERE member_id = old.id;"
+    " INSERT INTO worker_member_search (member_id, search_text) VALUES (new.id, new.search_text); END",
+]
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS worker_member_search_au",
+    "DROP TRIGGER IF EXISTS worker_member_search_ad",
+    "DROP TRIGGER IF EXISTS worker_member_search_ai",
+    "DROP TABLE IF EXISTS worker_member_search",
+]
+POSTGRES_FORWARDS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS worker_member_search_trgm"
+    " ON worker_organizationmember USING gin (search_text gin_trgm_ops)",
+]
+POSTGRES_BACKWARDS = [
+    "DROP INDEX CONCURRENTLY IF EXISTS worker_member_search_trgm",
+]
+
+
+def backfill_search_text(apps, schema_editor):
+    OrganizationMember = apps.get_model('worker', 'OrganizationMember')
+    rows = OrganizationMember.objects.values_list(
+        'pk', 'user__username', 'user__email', 'full_name', 'phone_number',
+    ).order_by('pk')
+    batch = []
+    for pk, *parts in rows.iterator(chunk_size=2000):
+        text = ' '.join(part.strip().lower() for part in parts if part and part.strip())
+        batch.append(OrganizationMember(pk=pk, search_text=text))
+        if len(batch) >= 2000:
+            OrganizationMember.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        OrganizationMember.objects.bulk_update(batch, ['search_text'])
+
+
+def _run(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_FORWARDS)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_FORWARDS)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_BACKWARDS)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_BACKWARDS)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('organization', '0016_organization_name_lower_index'),
+        ('worker', '0002_user_email_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organizationmember',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        AddIndexConcurrently(
+            model_name='organizationmember',
+            index=models.Index(fields=['organization', '-created_at', '-id'], name='member_org_created_idx'),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index, atomic=False),
+    ]
@@ -27,15 +27,36 @@ class OrganizationMember(models.Model):
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES, blank=True, null=True)
     dob = models.DateField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Lower-cased username, email, full name and phone, indexed for member search
+    # (see worker.member_listing). Rebuilt on save and when the user's username/email change.
+    search_text = models.TextField(blank=True, default="", editable=False)
+
+    SEARCH_SOURCE_FIELDS = {"user", "full_name", "phone_number"}
 
     class Meta:
         unique_together = ("user", "organization")
         verbose_name = "Organization Member"
         verbose_name_plural = "Organization Members"
+        indexes = [
+            # Member listing: newest first within an organization, keyset-paginated on (created_at, id)
+            models.Index(fields=["organization", "-created_at", "-id"], name="member_org_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} @ {self.organization} ({self.role})"
 
+    def build_search_text(self):
+        parts = (self.user.username, self.user.email, self.full_name, self.phone_number)
+        return " ".join(part.strip().lower() for part in parts if part and part.strip())
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or self.SEARCH_SOURCE_FIELDS & set(update_fields):
+            self.search_text = self.build_search_text()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "search_text"}
+        super().save(*args, **kwargs)
+
 
 class EmailLoginCode(models.Model):
     """One-time email-based login code for passwordless worker login."""
@@ -58,3 +79,26 @@ class EmailLoginCode(models.Model):
 
     def __str__(self):
         return f"Code for {self.user} (@ {'used' if self.consumed_at else 'active'})"
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+class UserEmail(models.Model):
+    """
+    Normalized (trimmed, lower-cased) email for each auth.User, indexed for
+    case-insensitive lookups that auth_user cannot serve without a scan.
+    Kept in sync by worker.signals on User save; queryset.update() of user
+    emails bypasses it.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='email_index')
+    email = models.CharField(max_length=254, db_index=True)
+
+    def __str__(self):
+        return f"{self.email} -> {self.user_id}"
+
+
+def users_with_email(email):
+    """Users whose email matches case-insensitively (an indexed replacement for ``email__iexact``)."""
+    return User.objects.filter(email_index__email=normalize_email(email))
@@ -1,7 +1,8 @@
 # server/worker/serializers.py
 from rest_framework import serializers
 from django.contrib.auth import authenticate, get_user_model
-from rest_framework_simplejwt.tokens import RefreshToken
+from api.tokens import OrganizationRefreshToken
+from .google_id_token import InvalidGoogleToken, verify_google_id_token
 from .models import OrganizationMember
 from organization.models import Organization
 from organization.serializers import OrganizationSerializer
@@ -33,7 +34,7 @@ class WorkerRegistrationSerializer(serializers.Serializer):
                 raise serializers.ValidationError({'organization_id': 'Organization not found'})
         elif org_name:
             try:
-                org = Organization.objects.get(name__iexact=org_name)
+                org = Organization.objects.named(org_name).get()
             except Organization.DoesNotExist:
                 raise serializers.ValidationError({'org_name': 'Organization not found'})
         else:
@@ -61,7 +62,7 @@ class WorkerRegistrationSerializer(serializers.Serializer):
             gender=validated_data['gender'],
             dob=validated_data['dob'],
         )
-        jwt = RefreshToken.for_user(user)
+        jwt = OrganizationRefreshToken.for_user(user)
         return {
             'user': user,
             'organization': org,
@@ -83,7 +84,7 @@ class WorkerLoginSerializer(serializers.Serializer):
             raise serializers.ValidationError('Invalid credentials')
 
         try:
-            org = Organization.objects.get(name__iexact=attrs['org_name'])
+            org = Organization.objects.named(attrs['org_name']).get()
         except Organization.DoesNotExist:
             raise serializers.ValidationError('Organization not found')
 
@@ -92,7 +93,7 @@ class WorkerLoginSerializer(serializers.Serializer):
         if not membership:
             raise serializers.ValidationError('User is not a member of this organization')
 
-        jwt = RefreshToken.for_user(user)
+        jwt = OrganizationRefreshToken.for_user(user)
         
         return {
             'access': str(jwt.access_token),
@@ -107,14 +108,17 @@ class WorkerLoginSerializer(serializers.Serializer):
 
 
 class GoogleWorkerLoginSerializer(serializers.Serializer):
-    """Google OAuth login serializer specifically for worker users."""
-    access_token = serializers.CharField()
+    """Google OAuth login serializer specifically for worker users.
+
+    Send ``id_token`` (the Google Identity Services credential); it is
+    verified locally against cached Google signing keys. ``access_token`` is
+    still accepted from older clients but costs a tokeninfo round trip.
+    """
+    id_token = serializers.CharField(required=False)
+    access_token = serializers.CharField(required=False)
     org_name = serializers.CharField()
 
-    def validate(self, attrs):
-        access_token = attrs['access_token']
-        org_name = attrs['org_name']
-
+    def _email_from_access_token(self, access_token):
         # Verify the Google access token without depending on 'requests'
         try:
             import json as _json
@@ -130,14 +134,28 @@ class GoogleWorkerLoginSerializer(serializers.Serializer):
                 email = token_info.get('email')
                 if not email:
                     raise serializers.ValidationError('Could not retrieve email from Google token')
+                return email
         except (HTTPError, URLError) as e:
             raise serializers.ValidationError(f'Failed to verify Google token: {str(e)}')
         except Exception as e:
             raise serializers.ValidationError(f'Failed to verify Google token: {str(e)}')
+
+    def validate(self, attrs):
+        org_name = attrs['org_name']
+
+        if attrs.get('id_token'):
+            try:
+                email = verify_google_id_token(attrs['id_token'])['email']
+            except InvalidGoogleToken as e:
+                raise serializers.ValidationError(str(e))
+        elif attrs.get('access_token'):
+            email = self._email_from_access_token(attrs['access_token'])
+        else:
+            raise serializers.ValidationError('id_token is required')
         
         # Check if organization exists
         try:
-            org = Organization.objects.get(name__iexact=org_name)
+            org = Organization.objects.named(org_name).get()
         except Organization.DoesNotExist:
             raise serializers.ValidationError('Organization not found')
         
@@ -152,7 +170,7 @@ class GoogleWorkerLoginSerializer(serializers.Serializer):
         if not membership:
             raise serializers.ValidationError('This email is not registered as a worker for this organization')
         
-        jwt = RefreshToken.for_user(user)
+        jwt = OrganizationRefreshToken.for_user(user)
         
         return {
             'access': str(jwt.access_token),
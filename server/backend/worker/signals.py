@@ -0,0 +1,41 @@
+# server/worker/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .member_listing import invalidate_member_stats
+from .models import OrganizationMember, User, UserEmail, normalize_email
+
+
+@receiver(post_save, sender=User)
+def sync_user_email(sender, instance, created, update_fields=None, **kwargs):
+    # Saves such as last_login updates pass update_fields without email
+    if update_fields is not None and 'email' not in update_fields:
+        return
+    UserEmail.objects.update_or_create(user_id=instance.pk, defaults={'email': normalize_email(instance.email)})
+
+
+
+@receiver(post_save, sender=User)
+def sync_member_listing(sender, instance, created, update_fields=None, **kwargs):
+    # A new user has no memberships yet
+    if created:
+        return
+    fields = set(update_fields) if update_fields is not None else None
+    search_changed = fields is None or bool({'username', 'email'} & fields)
+    activity_changed = fields is None or 'is_active' in fields
+    if not (search_changed or activity_changed):
+        return
+    for member in instance.memberships.all():
+        if activity_changed:
+            invalidate_member_stats(member.organization_id)
+        if search_changed:
+            member.user = instance
+            search_text = member.build_search_text()
+            if search_text != member.search_text:
+                OrganizationMember.objects.filter(pk=member.pk).update(search_text=search_text)
+
+
+@receiver(post_save, sender=OrganizationMember)
+@receiver(post_delete, sender=OrganizationMember)
+def member_changed(sender, instance, **kwargs):
+    invalidate_member_stats(instance.organization_id)
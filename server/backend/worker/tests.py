@@ -1,3 +1,218 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from google.auth import crypt, jwt as google_jwt
+from rest_framework.test import APIClient
+
+from organization.models import Organization
+
+from .google_id_token import google_certificates
+from .models import OrganizationMember, UserEmail, users_with_email
+
+CLIENT_ID = 'test-client.apps.googleusercontent.com'
+
+
+def make_rsa_key():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+    ).decode()
+    public_pem = key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+    return private_pem, public_pem
+
+
+class GoogleCertsHandler(BaseHTTPRequestHandler):
+    """Stand-in for Google's certificate endpoint: serves ``server.certs`` with ``server.max_age``."""
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        body = json.dumps(self.server.certs).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Cache-Control', f'public, max-age={self.server.max_age}, must-revalidate, no-transform')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class GoogleIdTokenLoginTests(TestCase):
+    """Google login verifies ID tokens locally against cached certificates."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), GoogleCertsHandler)
+        cls.server.requests = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.private_pem, public_pem = make_rsa_key()
+        cls.server.certs = {'test-kid': public_pem}
+        cls.settings_override = override_settings(
+            SECURE_SSL_REDIRECT=False,
+            GOOGLE_OAUTH_CLIENT_IDS=[CLIENT_ID],
+            GOOGLE_OAUTH_CERTS_URL=f'http://127.0.0.1:{cls.server.server_address[1]}/oauth2/v1/certs',
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        google_certificates.clear()
+        self.server.requests.clear()
+        self.server.max_age = 3600
+        self.org = Organization.objects.create(name='Google Org')
+        user = User.objects.create_user(username='google-worker', email='worker@example.org')
+        OrganizationMember.objects.create(user=user, organization=self.org, role='USER')
+
+    def _id_token(self, private_pem=None, **claims):
+        now = int(time.time())
+        payload = {
+            'iss': 'https://accounts.google.com', 'aud': CLIENT_ID, 'sub': '1234',
+            'email': 'worker@example.org', 'email_verified': True, 'iat': now, 'exp': now + 3600,
+            **claims,
+        }
+        signer = crypt.RSASigner.from_string(private_pem or self.private_pem, key_id='test-kid')
+        return google_jwt.encode(signer, payload).decode()
+
+    def _login(self, id_token):
+        return self.client.post('/worker/api/google-login/', {'id_token': id_token, 'org_name': 'Google Org'},
+                                content_type='application/json')
+
+    def test_logins_reuse_cached_certificates(self):
+        for _ in range(3):
+            response = self._login(self._id_token())
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(response.json()['login_type'], 'worker_google')
+        self.assertEqual(len(self.server.requests), 1)
+
+        forged_key, _ = make_rsa_key()
+        for token in (
+            self._id_token(private_pem=forged_key),
+            self._id_token(aud='someone-else.apps.googleusercontent.com'),
+            self._id_token(iss='https://evil.example'),
+            self._id_token(email_verified=False),
+        ):
+            self.assertEqual(self._login(token).status_code, 400)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_certificates_near_expiry_refresh_in_background(self):
+        self.server.max_age = 60  # inside the refresh margin from the start
+        self.assertEqual(self._login(self._id_token()).status_code, 200)
+        self.assertEqual(self._login(self._id_token()).status_code, 200)
+        deadline = time.monotonic() + 5
+        while len(self.server.requests) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.server.requests), 2)
+
+
+class NormalizedLookupTests(TestCase):
+    """Case-insensitive organization and email lookups go through the normalized indexes."""
+
+    def test_lookups_ignore_case_and_follow_email_changes(self):
+        org = Organization.objects.create(name='Acme Field Team')
+        self.assertEqual(Organization.objects.named('aCME field TEAM').get(), org)
+
+        user = User.objects.create_user(username='case-worker', email=' Case.Worker@Example.ORG')
+        self.assertEqual(list(users_with_email('case.worker@example.org')), [user])
+        user.email = 'moved@example.org'
+        user.save()
+        self.assertFalse(users_with_email('case.worker@example.org').exists())
+        self.assertEqual(users_with_email('MOVED@example.org').get(), user)
+
+        # Saves that do not touch email leave the index alone
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+        self.assertEqual(UserEmail.objects.get(user=user).email, 'moved@example.org')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class OrganizationUsersListingTests(TestCase):
+    """The members page reads cached stats and one page query, with indexed search."""
+
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name='Listing Org')
+        admin = User.objects.create_user(username='listing-admin', email='admin@listing.org')
+        OrganizationMember.objects.create(user=admin, organization=self.org, role='ADMIN', full_name='Ada Admin')
+        for i in range(12):
+            user = User.objects.create_user(username=f'worker-{i:02d}', email=f'w{i:02d}@Listing.org',
+                                            is_active=i % 4 != 0)
+            OrganizationMember.objects.create(user=user, organization=self.org, role='USER',
+                                              full_name=f'Worker Number {i:02d}', phone_number=f'+91 98000 0{i:04d}')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.url = f'/worker/api/organizations/{self.org.id}/users/'
+
+    def _get(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_unshared_stats_expire_quickly(self):
+        # Another process's change (no signal here) shows once the entry expires
+        self.assertEqual(self._get()['stats']['admin_count'], 1)
+        OrganizationMember.objects.filter(organization=self.org, role='USER').update(role='ADMIN')
+        self.assertEqual(self._get()['stats']['admin_count'], 1)
+        later = time.time() + settings.MEMBERSHIP_CACHE_SECONDS + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.assertEqual(self._get()['stats']['admin_count'], 13)
+
+    def test_stats_search_and_pagination(self):
+        with self.assertNumQueries(4):  # organization, membership, stats aggregate, page
+            self._get()
+        with self.assertNumQueries(2):  # organization, page
+            data = self._get(page=2, page_size=5)
+        self.assertEqual(data['stats'], {'total_members': 13, 'admin_count': 1, 'user_count': 12, 'active_members': 10})
+        self.assertEqual(data['pagination'], {
+            'current_page': 2, 'total_pages': 3, 'total_count': 13, 'page_size': 5,
+            'has_next': True, 'has_previous': True,
+        })
+
+        def usernames(**params):
+            return sorted(m['username'] for m in self._get(**params)['members'])
+
+        self.assertEqual(usernames(search='NUMBER 07'), ['worker-07'])
+        self.assertEqual(usernames(search='w03@listing'), ['worker-03'])
+        self.assertEqual(usernames(search='98000 00003'), ['worker-03'])
+        self.assertEqual(usernames(search='ad'), ['listing-admin'])  # too short for the trigram index
+        self.assertEqual(self._get(search='worker', role='USER')['pagination']['total_count'], 12)
+
+        # Search and stats follow user and membership changes
+        user = User.objects.get(username='worker-05')
+        user.email = 'renamed@elsewhere.org'
+        user.is_active = False
+        user.save()
+        self.assertEqual(usernames(search='elsewhere'), ['worker-05'])
+        self.assertEqual(usernames(search='w05@'), [])
+        OrganizationMember.objects.filter(user=user).get().delete()
+        self.assertEqual(self._get()['stats'], {'total_members': 12, 'admin_count': 1, 'user_count': 11, 'active_members': 9})
+
+        # Cursor pages cover every member exactly once, newest first
+        seen, cursor = [], ''
+        while cursor is not None:
+            data = self._get(cursor=cursor, page_size=5)
+            seen += [m['id'] for m in data['members']]
+            cursor = data['pagination']['next_cursor']
+        expected = OrganizationMember.objects.filter(organization=self.org).order_by('-created_at', '-id')
+        self.assertEqual(len(seen), 12)
+        self.assertEqual(seen, [str(pk) for pk in expected.values_list('id', flat=True)])
+        self.assertEqual(self.client.get(self.url, {'cursor': 'not-a-cursor'}).status_code, 400)
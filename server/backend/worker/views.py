@@ -6,6 +6,7 @@ from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes
 from django.core.paginator import Paginator
 from django.db import models
+import math
 from datetime import timedelta
 
 from django.db.models import Count
@@ -15,13 +16,15 @@ from .serializers import (
     GoogleWorkerLoginSerializer,
     OrganizationMemberSerializer,
 )
+from .member_listing import after_cursor, encode_cursor, member_stats, search_filter
 from .models import OrganizationMember
 from organization.models import Organization
+from organization.memberships import default_organization_id, is_organization_admin
 from organization.permissions import IsOrganizationAdmin
 from api.serializers import VerificationLogSerializer
 from api.models import VerificationLog
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from api.tokens import tokens_for_user
 from django.db import transaction
 from django.utils import timezone
 
@@ -121,7 +124,7 @@ class RegisterWorkerView(APIView):
         if worker_user is None:
             return Response({"detail": "Could not determine created user from serializer.save()"}, status=500)
 
-        tokens = get_tokens_for_user(worker_user)
+        tokens = tokens_for_user(worker_user)
 
         return Response(
             {
@@ -186,20 +189,14 @@ class SyncVerificationLogsView(APIView):
 def get_organization_users(request, org_id):
     """
     Get all users/members of a specific organization
-    Supports filtering by role, search, and pagination
+    Supports filtering by role, indexed search, and page-number or cursor pagination
     """
     try:
         # Get the organization
         organization = get_object_or_404(Organization, id=org_id)
         
         # Check if the requesting user has permission to view this org's data
-        user_membership = OrganizationMember.objects.filter(
-            user=request.user,
-            organization=organization,
-            role='ADMIN'
-        ).first()
-        
-        if not user_membership:
+        if not is_organization_admin(request, organization.id):
             return Response({
                 'success': False,
                 'error': 'You do not have permission to view this organization\'s members'
@@ -207,37 +204,67 @@ def get_organization_users(request, org_id):
         
         # Get query parameters for filtering and pagination
         role_filter = request.GET.get('role', None)  # 'ADMIN' or 'USER'
-        search = request.GET.get('search', None)
+        search = (request.GET.get('search') or '').strip()
         page = int(request.GET.get('page', 1))
-        page_size = int(request.GET.get('page_size', 20))
-        
-        # Build the queryset
-        queryset = OrganizationMember.objects.select_related('user').filter(
-            organization=organization
-        )
-        
+        page_size = max(int(request.GET.get('page_size', 20)), 1)
+        cursor = request.GET.get('cursor')  # keyset pagination; send an empty cursor for the first page
+
         # Apply filters
+        filters = models.Q()
         if role_filter and role_filter in ['ADMIN', 'USER']:
-            queryset = queryset.filter(role=role_filter)
-        
+            filters &= models.Q(role=role_filter)
         if search:
-            queryset = queryset.filter(
-                models.Q(user__username__icontains=search) |
-                models.Q(user__email__icontains=search) |
-                models.Q(full_name__icontains=search) |
-                models.Q(phone_number__icontains=search)
-            )
-        
-        # Order by creation date (newest first)
-        queryset = queryset.order_by('-created_at')
-        
-        # Pagination
-        paginator = Paginator(queryset, page_size)
-        page_obj = paginator.get_page(page)
-        
+            filters &= search_filter(search)
+        members = OrganizationMember.objects.filter(organization=organization).filter(filters)
+
+        # Cached stats; they already hold the count unless a search narrows it
+        stats = member_stats(organization.id)
+        if search:
+            total_count = members.count()
+        elif filters:
+            total_count = stats['admin_count' if role_filter == 'ADMIN' else 'user_count']
+        else:
+            total_count = stats['total_members']
+
+        # Order by creation date (newest first); id breaks ties for stable pages
+        queryset = members.select_related('user').order_by('-created_at', '-id')
+
+        if cursor is not None:
+            if cursor:
+                try:
+                    queryset = queryset.filter(after_cursor(cursor))
+                except ValueError:
+                    return Response({
+                        'success': False,
+                        'error': 'Invalid cursor'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+            rows = list(queryset[:page_size + 1])
+            page_members = rows[:page_size]
+            has_next = len(rows) > page_size
+            pagination = {
+                'page_size': page_size,
+                'total_count': total_count,
+                'has_next': has_next,
+                'has_previous': bool(cursor),
+                'next_cursor': encode_cursor(page_members[-1]) if has_next else None,
+            }
+        else:
+            total_pages = max(math.ceil(total_count / page_size), 1)
+            page = min(max(page, 1), total_pages)
+            offset = (page - 1) * page_size
+            page_members = queryset[offset:offset + page_size]
+            pagination = {
+                'current_page': page,
+                'total_pages': total_pages,
+                'total_count': total_count,
+                'page_size': page_size,
+                'has_next': page < total_pages,
+                'has_previous': page > 1,
+            }
+
         # Serialize the data
-        serializer = OrganizationMemberSerializer(page_obj, many=True)
-        
+        serializer = OrganizationMemberSerializer(page_members, many=True)
+
         # Response data
         response_data = {
             'success': True,
@@ -246,22 +273,10 @@ def get_organization_users(request, org_id):
                 'name': getattr(organization, 'name', 'Unknown'),
             },
             'members': serializer.data,
-            'pagination': {
-                'current_page': page,
-                'total_pages': paginator.num_pages,
-                'total_count': paginator.count,
-                'page_size': page_size,
-                'has_next': page_obj.has_next(),
-                'has_previous': page_obj.has_previous(),
-            },
-            'stats': {
-                'total_members': organization.members.count(),
-                'admin_count': organization.members.filter(role='ADMIN').count(),
-                'user_count': organization.members.filter(role='USER').count(),
-                'active_members': organization.members.filter(user__is_active=True).count(),
-            }
+            'pagination': pagination,
+            'stats': stats,
         }
-        
+
         return Response(response_data, status=status.HTTP_200_OK)
         
     except ValueError as e:
@@ -287,13 +302,7 @@ def get_organization_user_detail(request, org_id, member_id):
         organization = get_object_or_404(Organization, id=org_id)
         
         # Check permission
-        user_membership = OrganizationMember.objects.filter(
-            user=request.user,
-            organization=organization,
-            role='ADMIN'
-        ).first()
-        
-        if not user_membership:
+        if not is_organization_admin(request, organization.id):
             return Response({
                 'success': False,
                 'error': 'You do not have permission to view this organization\'s members'
@@ -329,13 +338,7 @@ def update_organization_user(request, org_id, member_id):
         organization = get_object_or_404(Organization, id=org_id)
         
         # Check permission
-        user_membership = OrganizationMember.objects.filter(
-            user=request.user,
-            organization=organization,
-            role='ADMIN'
-        ).first()
-        
-        if not user_membership:
+        if not is_organization_admin(request, organization.id):
             return Response({
                 'success': False,
                 'error': 'You do not have permission to modify this organization\'s members'
@@ -378,13 +381,7 @@ def delete_organization_user(request, org_id, member_id):
         organization = get_object_or_404(Organization, id=org_id)
         
         # Check permission
-        user_membership = OrganizationMember.objects.filter(
-            user=request.user,
-            organization=organization,
-            role='ADMIN'
-        ).first()
-        
-        if not user_membership:
+        if not is_organization_admin(request, organization.id):
             return Response({
                 'success': False,
                 'error': 'You do not have permission to modify this organization\'s members'
@@ -482,13 +479,7 @@ def get_organization_logs(request, org_id):
         organization = get_object_or_404(Organization, id=org_id)
         
         # Check if the requesting user has permission to view this org's data
-        user_membership = OrganizationMember.objects.filter(
-            user=request.user,
-            organization=organization,
-            role='ADMIN'
-        ).first()
-        
-        if not user_membership:
+        if not is_organization_admin(request, organization.id):
             return Response({
                 'success': False,
                 'error': 'You do not have permission to view this organization\'s logs'
@@ -553,8 +544,7 @@ def get_organization_logs(request, org_id):
         # Calculate stats based on the filtered queryset (not just organization logs)
         if user_id:
             # Stats for specific user only
-            user_member = OrganizationMember.objects.get(id=user_id, organization=organization)
-            user_logs_queryset = VerificationLog.objects.filter(organization=organization, verified_by=user_member.user)
+            user_logs_queryset = VerificationLog.objects.filter(organization=organization, verified_by=member.user)
             total_logs = user_logs_queryset.count()
             status_counts = _compute_status_counts(user_logs_queryset)
         else:
@@ -623,13 +613,7 @@ def get_organization_logs_stats(request, org_id):
 
         organization = get_object_or_404(Organization, id=org_id)
 
-        user_membership = OrganizationMember.objects.filter(
-            user=request.user,
-            organization=organization,
-            role='ADMIN',
-        ).first()
-
-        if not user_membership:
+        if not is_organization_admin(request, organization.id):
             return Response(
                 {
                     'success': False,
@@ -713,14 +697,8 @@ def get_log_detail(request, log_id):
         log = get_object_or_404(VerificationLog, id=log_id)
         
         # Check if the requesting user has permission to view this log
-        if log.organization:
-            user_membership = OrganizationMember.objects.filter(
-                user=request.user,
-                organization=log.organization,
-                role='ADMIN'
-            ).first()
-            
-            if not user_membership:
+        if log.organization_id:
+            if not is_organization_admin(request, log.organization_id):
                 return Response({
                     'success': False,
                     'error': 'You do not have permission to view this log'
@@ -756,11 +734,10 @@ def get_worker_historical_logs(request):
         user = request.user
 
         # Get user's organization membership to determine which logs they can access
-        membership = OrganizationMember.objects.select_related('organization').filter(
-            user=user
-        ).first()
+        org_id = default_organization_id(request)
+        organization = Organization.objects.filter(id=org_id).first() if org_id else None
 
-        if not membership:
+        if not organization:
             return Response({
                 'success': False,
                 'error': 'User is not associated with any organization'
@@ -782,7 +759,7 @@ def get_worker_historical_logs(request):
         # Build the queryset - get logs for this worker's organization within the date range
         # Only include logs verified by this specific user to maintain data privacy
         queryset = VerificationLog.objects.filter(
-            organization=membership.organization,
+            organization=organization,
             verified_by=user,  # Only this worker's own logs
             verified_at__gte=start_date,
             verified_at__lte=end_date
@@ -809,8 +786,8 @@ def get_worker_historical_logs(request):
         response_data = {
             'success': True,
             'organization': {
-                'id': str(membership.organization.id),
-                'name': getattr(membership.organization, 'name', 'Unknown'),
+                'id': str(organization.id),
+                'name': getattr(organization, 'name', 'Unknown'),
             },
             'user': {
                 'id': user.id,
@@ -855,8 +832,3 @@ def get_worker_historical_logs(request):
             'success': False,
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-
-def get_tokens_for_user(user):  # add helper if not already defined
-    refresh = RefreshToken.for_user(user)
-    return {"refresh": str(refresh), "access": str(refresh.access_token)}